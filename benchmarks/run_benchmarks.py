@@ -0,0 +1,262 @@
+"""
+Benchmarks for the CPU-bound pipeline stages, on synthetic exports.
+Times and memory-profiles phase 1 parsing, batch-file creation, the phase 5
+merge and the status scripts at each size in BENCH_SIZES, and reports
+regressions against benchmarks/baseline.json.
+
+    python benchmarks/run_benchmarks.py
+    BENCH_SIZES=10000,100000,1000000 python benchmarks/run_benchmarks.py
+    BENCH_UPDATE_BASELINE=1 python benchmarks/run_benchmarks.py
+
+Each size runs in its own process against a scratch copy of output/, so the
+real pipeline output is never touched. Peak memory is Python-level
+allocations (tracemalloc), which includes pandas/numpy buffers.
+"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import io
+import gc
+import os
+import json
+import time
+import runpy
+import shutil
+import platform
+import tempfile
+import subprocess
+import tracemalloc
+import contextlib
+from typing import Callable, Dict, List, Optional, Tuple
+import pandas as pd
+import config
+from benchmarks.synthetic_data import ensure_exports
+
+BENCH_DIR = Path(__file__).parent
+BASELINE_FILE = BENCH_DIR / 'baseline.json'
+SIZES = [int(s) for s in os.getenv('BENCH_SIZES', '10000,100000').split(',')]
+REPEAT = int(os.getenv('BENCH_REPEAT', 3))  # Timed runs per benchmark; the fastest one counts
+TOLERANCE = float(os.getenv('BENCH_TOLERANCE', 0.25))  # Allowed slowdown/growth over baseline
+UPDATE_BASELINE = os.getenv('BENCH_UPDATE_BASELINE', '').lower() in ('1', 'true')
+
+# Differences below these are noise, whatever the ratio
+MIN_SECONDS_DELTA = 0.05
+MIN_MB_DELTA = 1.0
+
+Run = Callable[[], object]
+
+def isolate_output(workdir: Path):
+    """Point every output path in config at workdir (call before importing scripts.*)."""
+    output = config.PROJECT_ROOT / 'output'
+    for name, value in list(vars(config).items()):
+        if isinstance(value, Path) and (value == output or output in value.parents):
+            setattr(config, name, workdir / 'output' / value.relative_to(output))
+    config.PROJECT_ROOT = workdir
+    config.ensure_dirs()
+
+def build_store(instagram: Path, tiktok: Path):
+    """Fill the store as if phases 1-4 had run: triaged videos, transcripts, classifications, ledger."""
+    from scripts.phase1_data_parser import create_initial_csv
+    from scripts.phase1b_caption_triage import triage_captions
+    from scripts.store import read_table, write_table, video_ids
+    from scripts.transcript_ledger import get_ledger
+
+    config.INSTAGRAM_JSON, config.TIKTOK_JSON = instagram, tiktok
+    with quiet():
+        create_initial_csv()
+        triage_captions()
+
+    # Benchmark full-table work, not an (empty) pending delta
+    videos = read_table('viral_database').drop(columns=['pending'])
+    write_table(videos, 'viral_database')
+
+    videos['video_id'] = video_ids(videos['source_url'])
+    audio = videos[videos['needs_audio']].drop_duplicates('video_id')
+    durations = audio['video_duration'].astype(float).fillna(0.0)
+    write_table(pd.DataFrame({
+        'video_id': audio['video_id'], 'source_url': audio['source_url'], 'platform': audio['platform'],
+        'video_downloaded': True, 'audio_extracted': True, 'audio_duration': durations,
+        'audio_path': 'output/extracted_audio/' + audio['video_id'] + '.mp3',
+    }), 'audio_results')
+
+    sentence = ("This {} is in perfect condition and the price is negotiable, "
+                "call us today or visit the showroom in Kampala. ")
+    success = audio.index.to_series().mod(20) != 0  # 5% failed transcriptions
+    write_table(pd.DataFrame({
+        'video_id': audio['video_id'], 'source_url': audio['source_url'], 'platform': audio['platform'],
+        'transcript_text': [sentence.format(c[:30]) * 6 for c in audio['caption'].fillna('')],
+        'detected_language': 'english', 'audio_duration': durations,
+        'transcription_cost': durations / 60 * 0.006,
+        'success': success, 'error': None,
+    }), 'transcriptions')
+    get_ledger().record_many(
+        (video_id, {'success': ok, 'duration': duration, 'language': 'english'}, 0.01)
+        for video_id, ok, duration in zip(audio['video_id'], success.tolist(), durations.tolist())
+    )
+
+    write_table(pd.DataFrame({
+        'video_id': videos['video_id'].drop_duplicates(), 'product_name': 'Toyota Land Cruiser',
+        'product_category': 'Cars', 'price_ugx': 250_000_000.0, 'intended_age_category': '30-45',
+        'intended_spending_category': 'High-end', 'product_type': 'SUV', 'brand': 'Toyota',
+        'marketing_angle': 'Luxury', 'niche': 'Automotive', 'classification_success': True, 'error': None,
+    }), 'classifications')
+
+def benchmarks(instagram: Path, tiktok: Path) -> List[Tuple[str, Run, Optional[Run]]]:
+    """(name, run, reset) for every benchmark; reset (untimed) runs before each run."""
+    from scripts.phase1_data_parser import (
+        parse_instagram_data, parse_tiktok_data, stream_json_file, INSTAGRAM_FIELDS, TIKTOK_FIELDS
+    )
+    from scripts.phase4_classifier import create_batch_files, load_classification_inputs
+    from scripts.phase5_final_csv import merge_all_data
+    from scripts.transcript_ledger import get_ledger
+
+    utils_dir = BENCH_DIR.parent / 'utils'
+    failed = get_ledger().failed_ids()
+
+    def restore_failed():
+        # retry_transcriptions.py deletes failed entries; put them back
+        get_ledger().record_many((video_id, {'success': False, 'error': 'benchmark'}, 0) for video_id in failed)
+
+    return [
+        ('parse_instagram', lambda: parse_instagram_data(stream_json_file(str(instagram), INSTAGRAM_FIELDS)), None),
+        ('parse_tiktok', lambda: parse_tiktok_data(stream_json_file(str(tiktok), TIKTOK_FIELDS)), None),
+        ('create_batch_files', lambda: create_batch_files(load_classification_inputs()), None),
+        ('phase5_merge', merge_all_data, None),
+        ('check_full_status', lambda: runpy.run_path(str(utils_dir / 'check_full_status.py')), None),
+        ('retry_transcriptions', lambda: runpy.run_path(str(utils_dir / 'retry_transcriptions.py')), restore_failed),
+    ]
+
+def quiet():
+    return contextlib.redirect_stdout(io.StringIO())
+
+def measure(run: Run, reset: Optional[Run] = None) -> Dict[str, float]:
+    """Fastest of REPEAT timed runs, then one traced run for peak memory."""
+    times = []
+    for _ in range(REPEAT):
+        if reset:
+            reset()
+        gc.collect()
+        start = time.perf_counter()
+        with quiet():
+            run()
+        times.append(time.perf_counter() - start)
+
+    if reset:
+        reset()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        with quiet():
+            run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {'seconds': round(min(times), 4), 'peak_mb': round(peak / 2**20, 2)}
+
+def run_size(size: int) -> Dict[str, Dict[str, float]]:
+    """Run every benchmark at one size (in this process)."""
+    instagram, tiktok = ensure_exports(size)
+    workdir = Path(tempfile.mkdtemp(prefix='bench_'))
+    try:
+        # Built in its own process: at 1M posts the heap it leaves behind
+        # would otherwise crowd out the benchmarks themselves
+        subprocess.run([sys.executable, __file__], env=dict(os.environ, BENCH_BUILD_DIR=str(workdir)), check=True)
+        isolate_output(workdir)
+        return {f"{name}@{size}": measure(run, reset) for name, run, reset in benchmarks(instagram, tiktok)}
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def run_size_isolated(size: int) -> Dict[str, Dict[str, float]]:
+    """Run one size in a fresh interpreter so sizes don't share caches or heap."""
+    with tempfile.NamedTemporaryFile(suffix='.json', delete=False) as f:
+        result_file = f.name
+    try:
+        env = dict(os.environ, BENCH_WORKER_SIZE=str(size), BENCH_RESULT_FILE=result_file)
+        subprocess.run([sys.executable, __file__], env=env, check=True)
+        with open(result_file, 'r') as f:
+            return json.load(f)
+    finally:
+        os.remove(result_file)
+
+def load_baseline() -> Dict[str, Dict[str, float]]:
+    if not BASELINE_FILE.exists():
+        return {}
+    with open(BASELINE_FILE, 'r') as f:
+        return json.load(f)['results']
+
+def save_baseline(results: Dict[str, Dict[str, float]]):
+    merged = dict(load_baseline(), **results)  # Keep sizes that weren't run this time
+    with open(BASELINE_FILE, 'w') as f:
+        json.dump({
+            'machine': f"{platform.machine()} / {os.cpu_count()} CPUs / Python {platform.python_version()}",
+            'updated_at': time.strftime('%Y-%m-%d'),
+            'results': dict(sorted(merged.items())),
+        }, f, indent=2)
+        f.write('\n')
+
+def is_regression(value: float, base: float, min_delta: float) -> bool:
+    return value > base * (1 + TOLERANCE) and value - base > min_delta
+
+def report(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]]) -> int:
+    """Print results next to the baseline; returns the number of regressions."""
+    def change(value, base):
+        return f"{(value / base - 1) * 100:+.0f}%" if base else ''
+
+    print(f"\n{'benchmark':<28}{'seconds':>10}{'baseline':>10}{'change':>8}"
+          f"{'peak MB':>10}{'baseline':>10}{'change':>8}")
+    regressions = 0
+    for key, result in results.items():
+        base = baseline.get(key, {})
+        flags = []
+        if base and is_regression(result['seconds'], base['seconds'], MIN_SECONDS_DELTA):
+            flags.append('slower')
+        if base and is_regression(result['peak_mb'], base['peak_mb'], MIN_MB_DELTA):
+            flags.append('more memory')
+        regressions += bool(flags)
+        print(f"{key:<28}{result['seconds']:>10.3f}{base.get('seconds', float('nan')):>10.3f}"
+              f"{change(result['seconds'], base.get('seconds')):>8}"
+              f"{result['peak_mb']:>10.1f}{base.get('peak_mb', float('nan')):>10.1f}"
+              f"{change(result['peak_mb'], base.get('peak_mb')):>8}"
+              f"{'  ⚠️  ' + ', '.join(flags) if flags else ''}")
+    return regressions
+
+def run_benchmarks() -> int:
+    """Main function: run every size, compare with the baseline."""
+    print("=" * 60)
+    print("BENCHMARKS: CPU-bound pipeline stages")
+    print("=" * 60)
+    print(f"\n📏 Sizes: {', '.join(f'{s:,}' for s in SIZES)} posts per platform")
+    print(f"   Repeats: {REPEAT}, tolerance: {TOLERANCE:.0%}")
+
+    results = {}
+    for size in SIZES:
+        print(f"\n⏱️  Running {size:,}...")
+        results.update(run_size_isolated(size))
+
+    baseline = load_baseline()
+    regressions = report(results, baseline)
+
+    print("\n" + "=" * 60)
+    if UPDATE_BASELINE:
+        save_baseline(results)
+        print(f"📝 Baseline updated: {BASELINE_FILE}")
+    elif not baseline:
+        print(f"⚠️  No baseline yet - run with BENCH_UPDATE_BASELINE=1 to store one")
+    elif regressions:
+        print(f"❌ {regressions} regressions beyond {TOLERANCE:.0%} of baseline")
+    else:
+        print(f"✅ No regressions against baseline")
+    print("=" * 60)
+    return 1 if regressions and not UPDATE_BASELINE else 0
+
+if __name__ == "__main__":
+    if os.getenv('BENCH_BUILD_DIR'):
+        isolate_output(Path(os.environ['BENCH_BUILD_DIR']))
+        build_store(*ensure_exports(int(os.environ['BENCH_WORKER_SIZE'])))
+    elif os.getenv('BENCH_WORKER_SIZE'):
+        with open(os.environ['BENCH_RESULT_FILE'], 'w') as f:
+            json.dump(run_size(int(os.environ['BENCH_WORKER_SIZE'])), f)
+    else:
+        sys.exit(run_benchmarks())
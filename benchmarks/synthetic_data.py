@@ -0,0 +1,190 @@
+"""
+Synthetic scraper exports for benchmarking.
+Writes Instagram and TikTok JSON arrays with the same shape as
+data/instagram.json and data/tiktok.json (Instagram posts carry nested
+latestComments with owners, TikTok posts use flattened dotted keys), at
+any size. Exports are written one post at a time, so 1M posts don't need
+1M posts' worth of memory. Output is deterministic for a given seed.
+"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import os
+import json
+import random
+import string
+from typing import Callable, Dict, Tuple
+
+DATA_DIR = Path(__file__).parent / 'data'
+SIZES = (10_000, 100_000, 1_000_000)
+
+ACCOUNTS = ['kydyuzhini', 'lemax__autos', 'autohub_ug', 'gadgetzone256', 'luxury_rides_ug',
+            'phonehub_kampala', 'ledsigns_ug', 'carbazaar', 'techdeals_ea', 'primemotors']
+CAPTIONS = [
+    '{model} {year} {fuel}\nUgx {price}m. 📞2567{phone}',
+    'Clean {brand} {model} {year} available now! Ugx {price}m #cars #uganda',
+    'KYD’s Trash or Gold Episode {episode}',
+    'Would you buy this? 😂😂 #fyp #viral',
+    'Brand new {product} in stock. Shs {small_price},000 only. Call 07{phone}',
+    '{brand} {model} walkaround 🔥 link in bio',
+    '',
+]
+BRANDS = [('Toyota', 'Land Cruiser'), ('Lexus', 'LX600'), ('Mercedes', 'GLE450'), ('BMW', 'X6M'),
+          ('Range Rover', 'Vogue'), ('Toyota', 'Prado'), ('Samsung', 'Galaxy S24'), ('Apple', 'iPhone 15')]
+PRODUCTS = ['LED sign board', 'smart watch', 'drone', 'projector', 'earbuds', 'neon sign']
+SOUNDS = ['original sound', 'Tshwala Bam', 'Water - Tyla', 'Calm Down', 'Sability']
+COMMENTS = ['', '😂😂😂', 'How much?', 'Price please', 'This is fire 🔥', 'Location?', 'Trash 😂',
+            'Gold!', 'DM sent', 'Where in Kampala?']
+
+def _token(rng: random.Random, length: int, alphabet: str = string.ascii_letters + string.digits + '_-') -> str:
+    return ''.join(rng.choices(alphabet, k=length))
+
+def _digits(rng: random.Random, length: int) -> str:
+    return ''.join(rng.choices(string.digits, k=length))
+
+def _cdn_url(rng: random.Random, kind: str) -> str:
+    return (f"https://scontent-lga3-{rng.randint(1, 3)}.cdninstagram.com/v/t51.2885-{kind}/"
+            f"{_digits(rng, 9)}_{_digits(rng, 17)}_n.jpg?stp=dst-jpg_s150x150_tt6&_nc_ht=scontent"
+            f"&_nc_ohc={_token(rng, 22)}&oh=00_{_token(rng, 40)}&oe={_token(rng, 8)}")
+
+def _caption(rng: random.Random) -> str:
+    brand, model = rng.choice(BRANDS)
+    return rng.choice(CAPTIONS).format(
+        brand=brand, model=model, year=rng.randint(2008, 2025), fuel=rng.choice(['petrol', 'diesel']),
+        price=rng.randint(20, 950), small_price=rng.randint(50, 900), phone=_digits(rng, 8),
+        episode=rng.randint(1, 400), product=rng.choice(PRODUCTS),
+    )
+
+def _timestamp(rng: random.Random) -> str:
+    return (f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T"
+            f"{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:00.000Z")
+
+def _comment(rng: random.Random) -> Dict:
+    username = _token(rng, rng.randint(6, 18), string.ascii_lowercase + string.digits + '_')
+    picture = _cdn_url(rng, '19')
+    return {
+        'id': _digits(rng, 17),
+        'text': rng.choice(COMMENTS),
+        'ownerUsername': username,
+        'ownerProfilePicUrl': picture,
+        'timestamp': _timestamp(rng),
+        'repliesCount': 0,
+        'replies': [],
+        'likesCount': rng.randint(0, 50),
+        'owner': {
+            'id': _digits(rng, 11),
+            'is_verified': rng.random() < 0.02,
+            'profile_pic_url': picture,
+            'username': username,
+        },
+    }
+
+POOL_SIZE = 5000  # Distinct comments/URLs generated per export; posts sample from these
+
+class PostFactory:
+    """Builds posts from pools of pre-generated comments and URLs (generation is the slow part)."""
+
+    def __init__(self, seed: int):
+        self.rng = random.Random(seed)
+        pool_rng = random.Random(seed ^ 0x5EED)
+        self.comments = [_comment(pool_rng) for _ in range(POOL_SIZE)]
+        self.cdn_urls = [_cdn_url(pool_rng, '15') for _ in range(POOL_SIZE)]
+        self.tokens = [_token(pool_rng, 120) for _ in range(POOL_SIZE)]
+
+def instagram_post(factory: PostFactory, index: int) -> Dict:
+    """One post shaped like an entry of data/instagram.json (~2% are images)."""
+    rng = factory.rng
+    is_video = rng.random() >= 0.02
+    account = rng.choice(ACCOUNTS)
+    short_code = f"D{index:010d}"
+    views = int(rng.paretovariate(1.2) * 20_000)
+    post = {
+        'id': f"37{index:017d}",
+        'type': 'Video' if is_video else 'Image',
+        'shortCode': short_code,
+        'caption': _caption(rng),
+        'mentions': [],
+        'url': f"https://www.instagram.com/p/{short_code}/",
+        'commentsCount': rng.randint(0, 5000),
+        'firstComment': rng.choice(COMMENTS),
+        'latestComments': rng.sample(factory.comments, rng.choice([3, 5, 6, 7, 8, 8, 9, 9, 10, 10])),
+        'displayUrl': rng.choice(factory.cdn_urls),
+        'images': [],
+        'likesCount': rng.randint(0, max(views // 10, 1)),
+        'timestamp': _timestamp(rng),
+        'childPosts': [],
+        'isCommentsDisabled': False,
+        'inputUrl': f"https://www.instagram.com/{account}/?hl=en",
+        'isSponsored': False,
+        'alt': None,
+    }
+    if is_video:
+        post.update({
+            'videoUrl': f"https://scontent-lga3-2.cdninstagram.com/o1/v/t16/f2/m86/{rng.choice(factory.tokens)}.mp4",
+            'videoViewCount': views,
+            'productType': 'clips',
+            'videoPlayCount': views * 2,
+            'videoDuration': round(rng.uniform(5, 600), 3),
+        })
+    else:
+        post['alt'] = f"Photo by {account} on July 08, 2025."
+    return post
+
+def tiktok_post(factory: PostFactory, index: int) -> Dict:
+    """One post shaped like an entry of data/tiktok.json."""
+    rng = factory.rng
+    account = rng.choice(ACCOUNTS)
+    plays = int(rng.paretovariate(1.1) * 5_000)
+    return {
+        'authorMeta.avatar': f"https://p16-common-sign.tiktokcdn-us.com/tos-maliva-avt-0068/"
+                             f"{rng.choice(factory.tokens)[:32]}~tplv-tiktokx-cropcenter:720:720.jpeg",
+        'authorMeta.name': account,
+        'text': _caption(rng),
+        'diggCount': rng.randint(0, max(plays // 10, 1)),
+        'shareCount': rng.randint(0, max(plays // 200, 1)),
+        'playCount': plays,
+        'commentCount': rng.randint(0, max(plays // 300, 1)),
+        'collectCount': rng.randint(0, max(plays // 150, 1)),
+        'videoMeta.duration': rng.randint(5, 900),
+        'musicMeta.musicName': rng.choice(SOUNDS),
+        'musicMeta.musicAuthor': account,
+        'musicMeta.musicOriginal': rng.random() < 0.7,
+        'webVideoUrl': f"https://www.tiktok.com/@{account}/video/74{index:017d}",
+    }
+
+def write_export(path: Path, count: int, make_post: Callable[[PostFactory, int], Dict], seed: int = 0) -> Path:
+    """Write `count` posts as a JSON array, streaming to disk."""
+    factory = PostFactory(seed)
+    os.makedirs(path.parent, exist_ok=True)
+    tmp_path = path.with_suffix('.json.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write('[')
+        for i in range(count):
+            if i:
+                f.write(',\n')
+            f.write(json.dumps(make_post(factory, i), ensure_ascii=False))
+        f.write(']\n')
+    os.replace(tmp_path, path)
+    return path
+
+def ensure_exports(count: int, data_dir: Path = DATA_DIR) -> Tuple[Path, Path]:
+    """
+    (instagram, tiktok) export paths for `count` posts each, generating them
+    the first time a size is asked for.
+    """
+    instagram = data_dir / f"instagram_{count}.json"
+    tiktok = data_dir / f"tiktok_{count}.json"
+    if not instagram.exists():
+        write_export(instagram, count, instagram_post, seed=count)
+    if not tiktok.exists():
+        write_export(tiktok, count, tiktok_post, seed=count + 1)
+    return instagram, tiktok
+
+if __name__ == "__main__":
+    sizes = [int(s) for s in os.getenv('BENCH_SIZES', ','.join(map(str, SIZES))).split(',')]
+    for size in sizes:
+        instagram, tiktok = ensure_exports(size)
+        print(f"{size:>9,} posts: {instagram} ({instagram.stat().st_size / 1e6:,.0f} MB), "
+              f"{tiktok} ({tiktok.stat().st_size / 1e6:,.0f} MB)")
@@ -1,15 +1,17 @@
 import os
 from pathlib import Path
-from dotenv import load_dotenv
-
-# Load .env from project root
-load_dotenv()
 
 # Project root directory
 PROJECT_ROOT = Path(__file__).parent.parent
 
+# Load .env from project root (python-dotenv is only imported when there is one)
+if (PROJECT_ROOT / '.env').exists():
+    from dotenv import load_dotenv
+    load_dotenv(PROJECT_ROOT / '.env')
+
 # OpenAI Configuration
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
+OPENAI_BASE_URL = os.getenv('OPENAI_BASE_URL') or None  # e.g. a local fake endpoint for testing
 
 # File paths (relative to project root)
 INSTAGRAM_JSON = PROJECT_ROOT / 'data' / 'instagram.json'
@@ -18,6 +20,15 @@ OUTPUT_CSV = PROJECT_ROOT / 'output' / 'viral_database.csv'
 TEMP_DIR = PROJECT_ROOT / 'output' / 'temp_media'
 AUDIO_DIR = PROJECT_ROOT / 'output' / 'extracted_audio'
 TRANSCRIPTS_DIR = PROJECT_ROOT / 'output' / 'transcripts'
+STORE_DIR = PROJECT_ROOT / 'output' / 'store'  # Typed Parquet tables shared between phases
+MEDIA_CACHE_DB = PROJECT_ROOT / 'output' / 'media_cache.sqlite'  # Durations/codec info by path+size+mtime
+TRANSCRIPT_LEDGER_DB = PROJECT_ROOT / 'output' / 'transcript_ledger.sqlite'  # video_id -> transcript status
+FINGERPRINT_DB = PROJECT_ROOT / 'output' / 'fingerprints.sqlite'  # Acoustic fingerprints for dedup
+CLASSIFICATION_CACHE_DB = PROJECT_ROOT / 'output' / 'classification_cache.sqlite'  # Prompt hash -> GPT answer
+METRICS_DIR = PROJECT_ROOT / 'output' / 'metrics'
+METRICS_EVENTS_FILE = METRICS_DIR / 'events.jsonl'  # One line per observation
+METRICS_TEXTFILE = METRICS_DIR / 'pipeline.prom'  # Prometheus textfile (point node_exporter here)
+TRACE_FILE = PROJECT_ROOT / 'output' / 'traces.jsonl'  # Per-video stage spans (utils/trace_report.py)
 
 # Luxury categorization thresholds (UGX)
 LOW_END_MAX = int(os.getenv('LOW_END_MAX', 150_000_000))
@@ -26,12 +37,78 @@ MEDIUM_END_MAX = int(os.getenv('MEDIUM_END_MAX', 400_000_000))
 # Processing settings
 BATCH_SIZE = int(os.getenv('BATCH_SIZE', 50))
 MAX_AUDIO_DURATION = int(os.getenv('MAX_AUDIO_DURATION', 7200))
+# Caption triage: rows whose caption scores at least this (0-1) are classified
+# from the caption alone, skipping download and transcription
+CAPTION_SCORE_THRESHOLD = float(os.getenv('CAPTION_SCORE_THRESHOLD', 0.5))
+# Pipe the audio-only stream from yt-dlp straight into ffmpeg (no temp video file)
+STREAM_AUDIO = os.getenv('STREAM_AUDIO', 'true').lower() == 'true'
+# Cut silent stretches before transcription (Whisper bills every minute sent)
+TRIM_SILENCE = os.getenv('TRIM_SILENCE', 'true').lower() == 'true'
+SILENCE_THRESHOLD_DB = float(os.getenv('SILENCE_THRESHOLD_DB', -40))  # Quieter than this is silence
+SILENCE_MIN_DURATION = float(os.getenv('SILENCE_MIN_DURATION', 1.0))  # Seconds before a gap is cut
+
+# Phase 2 concurrency - downloads are network-bound, transcoding is CPU-bound.
+# These are starting points; both stages adapt at runtime within their bounds.
+CPU_COUNT = os.cpu_count() or 4
+DOWNLOAD_WORKERS = int(os.getenv('DOWNLOAD_WORKERS', min(32, CPU_COUNT * 2)))
+DOWNLOAD_WORKERS_MAX = int(os.getenv('DOWNLOAD_WORKERS_MAX', max(DOWNLOAD_WORKERS, min(128, CPU_COUNT * 8))))
+TRANSCODE_WORKERS = int(os.getenv('TRANSCODE_WORKERS', max(1, CPU_COUNT // 2)))  # Room to grow towards the max
+TRANSCODE_WORKERS_MAX = int(os.getenv('TRANSCODE_WORKERS_MAX', max(TRANSCODE_WORKERS, CPU_COUNT)))
+
+# Whisper rate limits for the async transcriber (match your account tier)
+WHISPER_RPM = int(os.getenv('WHISPER_RPM', 500))  # Requests per minute
+WHISPER_AUDIO_MINUTES_PER_MINUTE = float(os.getenv('WHISPER_AUDIO_MINUTES_PER_MINUTE', 2000))
+WHISPER_MAX_IN_FLIGHT = int(os.getenv('WHISPER_MAX_IN_FLIGHT', 256))  # Concurrent uploads
+
+# Reuse transcripts across reposts of the same audio (see scripts/audio_fingerprint.py).
+# Max bit error rate for two fingerprints to count as the same audio; keep it
+# low so clips that merely share a trending sound aren't merged.
+DEDUP_AUDIO = os.getenv('DEDUP_AUDIO', 'true').lower() == 'true'
+FINGERPRINT_MAX_BER = float(os.getenv('FINGERPRINT_MAX_BER', 0.15))
+
+# Long audio is split into overlapping chunks that are transcribed concurrently
+CHUNK_THRESHOLD = float(os.getenv('CHUNK_THRESHOLD', 300))  # Seconds; longer files are chunked
+CHUNK_LENGTH = float(os.getenv('CHUNK_LENGTH', 120))  # Seconds per chunk
+CHUNK_OVERLAP = float(os.getenv('CHUNK_OVERLAP', 5))  # Seconds shared by neighbouring chunks
+CHUNK_WORKERS = int(os.getenv('CHUNK_WORKERS', 8))  # Concurrent chunk uploads (threaded transcriber)
+
+# Batch API limits per batch (requests per file, input file size)
+BATCH_MAX_REQUESTS = int(os.getenv('BATCH_MAX_REQUESTS', 50_000))
+BATCH_MAX_BYTES = int(os.getenv('BATCH_MAX_BYTES', 190 * 1024 * 1024))  # API limit is 200 MB
+
+# phase4_batch_watcher.py polling interval: starts at the minimum, doubles while
+# nothing changes, and drops back to the minimum when batches make progress
+BATCH_POLL_MIN = float(os.getenv('BATCH_POLL_MIN', 60))  # Seconds
+BATCH_POLL_MAX = float(os.getenv('BATCH_POLL_MAX', 1800))  # Seconds
+
+# Classification mode: 'batch' (half price, up to 24h), 'online' (concurrent chat
+# completions, minutes) or 'auto' (online when the run is small enough to finish
+# within the latency target under the rate limits below)
+CLASSIFY_MODE = os.getenv('CLASSIFY_MODE', 'auto').lower()
+CLASSIFY_LATENCY_TARGET = float(os.getenv('CLASSIFY_LATENCY_TARGET', 30))  # Minutes
+CLASSIFY_ONLINE_MAX_REQUESTS = int(os.getenv('CLASSIFY_ONLINE_MAX_REQUESTS', 2000))  # Larger runs use batch
+GPT_RPM = int(os.getenv('GPT_RPM', 500))  # Requests per minute
+GPT_TPM = int(os.getenv('GPT_TPM', 200_000))  # Tokens per minute
+GPT_MAX_IN_FLIGHT = int(os.getenv('GPT_MAX_IN_FLIGHT', 64))  # Concurrent requests
+
+# Metrics (scripts/metrics.py): event log and Prometheus textfile, rewritten this often
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+METRICS_FLUSH_SECONDS = float(os.getenv('METRICS_FLUSH_SECONDS', 15))
+TRACING_ENABLED = os.getenv('TRACING_ENABLED', 'true').lower() == 'true'
 
 # OpenAI Model settings
 WHISPER_MODEL = 'whisper-1'
 GPT_MODEL = 'gpt-4o-mini'  # Using mini version to avoid token limits
 
-# Ensure directories exist
-os.makedirs(TEMP_DIR, exist_ok=True)
-os.makedirs(AUDIO_DIR, exist_ok=True)
-os.makedirs(TRANSCRIPTS_DIR, exist_ok=True)
+# Classification prompt size and cost estimation
+CLASSIFY_TRANSCRIPT_TOKEN_BUDGET = int(os.getenv('CLASSIFY_TRANSCRIPT_TOKEN_BUDGET', 1000))  # Per transcript
+CLASSIFY_OUTPUT_TOKENS = int(os.getenv('CLASSIFY_OUTPUT_TOKENS', 250))  # Typical JSON answer, for estimates
+GPT_PRICING = {  # USD per 1M tokens (input, output), standard API prices
+    'gpt-4o-mini': (0.15, 0.60),
+    'gpt-4o': (2.50, 10.00),
+}
+
+def ensure_dirs():
+    """Create the output directories. Called by the phases that write to them, not at import."""
+    for directory in (TEMP_DIR, AUDIO_DIR, TRANSCRIPTS_DIR, STORE_DIR):
+        os.makedirs(directory, exist_ok=True)
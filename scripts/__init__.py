@@ -0,0 +1,3 @@
+"""
+Pipeline phase scripts and the shared modules they use.
+"""
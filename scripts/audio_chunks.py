@@ -0,0 +1,135 @@
+"""
+Split long audio into overlapping chunks for concurrent transcription, and
+stitch the chunk transcripts back into one transcript with corrected
+segment timestamps.
+"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import os
+import math
+import subprocess
+from collections import Counter
+from typing import Dict, List
+import config
+from scripts import metrics, tracing
+
+def plan_chunks(duration: float, chunk_length: float = config.CHUNK_LENGTH,
+                overlap: float = config.CHUNK_OVERLAP) -> List[Dict]:
+    """
+    Chunk boundaries covering `duration` seconds.
+
+    Consecutive chunks share `overlap` seconds so a word cut at one chunk's
+    edge is heard whole by its neighbour.
+    """
+    step = chunk_length - overlap
+    if duration <= chunk_length or step <= 0:
+        return [{'start': 0.0, 'length': duration}]
+
+    count = math.ceil((duration - overlap) / step)
+    return [
+        {'start': i * step, 'length': min(chunk_length, duration - i * step)}
+        for i in range(count)
+    ]
+
+def needs_chunking(duration: float) -> bool:
+    """True if a file is long enough to be worth splitting."""
+    return duration > config.CHUNK_THRESHOLD
+
+def split_audio(audio_path: str, duration: float) -> List[Dict]:
+    """
+    Cut an audio file into chunk files in config.TEMP_DIR.
+
+    Returns the chunk plan with a 'path' added to each entry; pass it to
+    remove_chunks() when done. Raises RuntimeError if ffmpeg fails.
+    """
+    stem = Path(audio_path).stem
+    chunks = plan_chunks(duration)
+    try:
+        for i, chunk in enumerate(chunks):
+            chunk['path'] = os.path.join(config.TEMP_DIR, f"{stem}.chunk{i:03d}.mp3")
+            with tracing.span('ffmpeg', operation='split'), metrics.timer('ffmpeg_seconds', operation='split'):
+                result = subprocess.run(
+                    ['ffmpeg',
+                     '-ss', f"{chunk['start']:.3f}",  # Seek before -i: fast, frame-accurate for MP3
+                     '-t', f"{chunk['length']:.3f}",
+                     '-i', audio_path,
+                     '-acodec', 'copy',  # Already 16kHz mono MP3 - no re-encode
+                     '-loglevel', 'error', '-y', chunk['path']],
+                    capture_output=True, text=True, timeout=60
+                )
+            if result.returncode != 0 or not os.path.exists(chunk['path']):
+                raise RuntimeError(f"Could not split chunk {i}: {result.stderr.strip()}")
+    except Exception:
+        remove_chunks(chunks)
+        raise
+    return chunks
+
+def remove_chunks(chunks: List[Dict]):
+    """Delete the chunk files written by split_audio()."""
+    for chunk in chunks:
+        if chunk.get('path') and os.path.exists(chunk['path']):
+            os.remove(chunk['path'])
+
+def stitch_transcripts(chunks: List[Dict], results: List[Dict]) -> Dict:
+    """
+    Merge per-chunk transcript results into one transcript JSON.
+
+    Segment times are shifted by their chunk's start. Inside an overlap, a
+    segment is kept by the chunk that has its start time on its own side of
+    the overlap's centre. The two chunks rarely split the overlap into the
+    same segments, but each segment starts on one side or the other, so
+    speech near the cut is kept rather than dropped by both. Fails as a
+    whole if any chunk failed.
+    """
+    for i, result in enumerate(results):
+        if not result['success']:
+            return {
+                'text': '',
+                'language': 'unknown',
+                'duration': 0,
+                'segments': [],
+                'success': False,
+                'error': f"Chunk {i + 1}/{len(results)}: {result.get('error')}"
+            }
+
+    segments = []
+    texts = []
+    for i, (chunk, result) in enumerate(zip(chunks, results)):
+        offset = chunk['start']
+        # Cut at the middle of the overlap with each neighbour
+        lower = -math.inf if i == 0 else \
+            (chunks[i - 1]['start'] + chunks[i - 1]['length'] + offset) / 2
+        upper = math.inf if i == len(chunks) - 1 else \
+            (chunk['start'] + chunk['length'] + chunks[i + 1]['start']) / 2
+
+        chunk_segments = result.get('segments') or []
+        if not chunk_segments:
+            texts.append(result['text'].strip())
+            continue
+
+        for seg in chunk_segments:
+            start = seg['start'] + offset
+            end = seg['end'] + offset
+            if not (lower <= start < upper):
+                continue
+            seg = dict(seg, start=start, end=end, id=len(segments))
+            if seg.get('seek') is not None:
+                seg['seek'] += int(round(offset * 100))  # Seek is in 10ms frames
+            segments.append(seg)
+            texts.append(seg['text'].strip())
+
+    languages = Counter(r.get('language') or 'unknown' for r in results)
+
+    return {
+        'text': ' '.join(t for t in texts if t),
+        'language': languages.most_common(1)[0][0],
+        'duration': chunks[-1]['start'] + chunks[-1]['length'],
+        'segments': segments,
+        'success': True,
+        'error': None,
+        'chunks': len(chunks),
+        'billed_duration': sum(c['length'] for c in chunks)  # Overlaps are uploaded twice
+    }
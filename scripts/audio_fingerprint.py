@@ -0,0 +1,249 @@
+"""
+Acoustic fingerprints for spotting the same audio under different URLs.
+Phase 2 fingerprints each extracted file from its decoded PCM; phase 3 looks
+up near-identical fingerprints and reuses their transcript instead of paying
+Whisper for every repost.
+
+Each fingerprint is a sequence of 16-bit sub-fingerprints, one per 64ms
+frame, encoding how band energies change across frequency and time. This
+survives re-encoding, bitrate changes and small level differences. Lookups
+go through an inverted index of sub-fingerprint words, and candidates are
+confirmed by bit error rate over the aligned frames.
+"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import os
+import sqlite3
+import subprocess
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import config
+from scripts import metrics, tracing
+from scripts.transcript_ledger import get_ledger, load_cached_transcript
+
+SAMPLE_RATE = 8000  # Hz - speech and music structure survive, decoding stays cheap
+FRAME_SIZE = 2048  # 256ms analysis window
+HOP_SIZE = 512  # 64ms between sub-fingerprints
+BANDS = np.geomspace(300, 2000, 18)  # 17 log-spaced bands -> 16 bits per frame
+MAX_SECONDS = 120  # Only the start of a file is fingerprinted
+
+INDEX_FRAMES = 256  # Frames at the start of a fingerprint that go into the word index
+INDEX_STRIDE = 4  # Index every 4th of those (lookups use all of them)
+MIN_FRAMES = 32  # Shorter audio (~2s) is not fingerprinted
+MAX_CANDIDATES = 20  # Candidates verified per lookup
+
+def decode_pcm(audio_path: str, max_seconds: float = MAX_SECONDS) -> np.ndarray:
+    """Decode audio to mono float samples at SAMPLE_RATE via an ffmpeg pipe."""
+    with tracing.span('ffmpeg', operation='decode'), metrics.timer('ffmpeg_seconds', operation='decode'):
+        result = subprocess.run(
+            ['ffmpeg', '-i', audio_path, '-t', str(max_seconds),
+             '-f', 's16le', '-acodec', 'pcm_s16le', '-ac', '1', '-ar', str(SAMPLE_RATE),
+             '-loglevel', 'error', 'pipe:1'],
+            capture_output=True, timeout=60
+        )
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg could not decode {audio_path}: {result.stderr.decode(errors='replace').strip()}")
+    return np.frombuffer(result.stdout, dtype='<i2').astype(np.float32) / 32768
+
+def compute_fingerprint(samples: np.ndarray) -> np.ndarray:
+    """Sub-fingerprints (uint16, one per frame) for a mono SAMPLE_RATE signal."""
+    if len(samples) < FRAME_SIZE:
+        return np.zeros(0, dtype=np.uint16)
+
+    frames = np.lib.stride_tricks.sliding_window_view(samples, FRAME_SIZE)[::HOP_SIZE]
+    spectrum = np.abs(np.fft.rfft(frames * np.hanning(FRAME_SIZE), axis=1)) ** 2
+
+    edges = np.searchsorted(np.fft.rfftfreq(FRAME_SIZE, 1 / SAMPLE_RATE), BANDS)
+    energy = np.add.reduceat(spectrum, edges[:-1], axis=1)[:, :len(BANDS) - 1]
+
+    # Bit m of frame n: did the energy difference between bands m and m+1 grow since frame n-1?
+    band_diff = energy[:, :-1] - energy[:, 1:]
+    bits = (band_diff[1:] - band_diff[:-1]) > 0
+    return (bits.astype(np.uint32) @ (1 << np.arange(bits.shape[1], dtype=np.uint32))).astype(np.uint16)
+
+def fingerprint_file(audio_path: str) -> np.ndarray:
+    return compute_fingerprint(decode_pcm(audio_path))
+
+def bit_error_rate(a: np.ndarray, b: np.ndarray, offset: int) -> Tuple[float, int]:
+    """
+    Fraction of differing bits when frame i of `a` lines up with frame
+    i - offset of `b`. Returns (rate, frames compared).
+    """
+    if offset >= 0:
+        a, b = a[offset:], b
+    else:
+        a, b = a, b[-offset:]
+    n = min(len(a), len(b))
+    if n == 0:
+        return 1.0, 0
+    diff = np.bitwise_xor(a[:n], b[:n])
+    return float(np.unpackbits(diff.view(np.uint8)).sum()) / (16 * n), n
+
+class FingerprintIndex:
+    """SQLite-backed fingerprint store with a word index, safe to share between threads."""
+
+    def __init__(self, db_path: str):
+        self.db_path = str(db_path)
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS fingerprints (
+                    video_id TEXT PRIMARY KEY,
+                    duration REAL,
+                    fingerprint BLOB NOT NULL
+                )
+            ''')
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS fingerprint_words (
+                    word INTEGER NOT NULL,
+                    video_id TEXT NOT NULL,
+                    pos INTEGER NOT NULL
+                )
+            ''')
+            self._conn.execute('CREATE INDEX IF NOT EXISTS idx_word ON fingerprint_words (word)')
+            self._conn.execute('CREATE INDEX IF NOT EXISTS idx_word_video ON fingerprint_words (video_id)')
+        return self._conn
+
+    def add(self, video_id: str, fingerprint: np.ndarray, duration: float):
+        """Store (or replace) the fingerprint for a video."""
+        # All-zero/all-one words come from silence and flat noise - useless for lookup
+        words = [(int(w), video_id, pos)
+                 for pos, w in enumerate(fingerprint[:INDEX_FRAMES])
+                 if pos % INDEX_STRIDE == 0 and w not in (0, 0xFFFF)]
+        with self._lock:
+            conn = self._connect()
+            conn.execute('DELETE FROM fingerprint_words WHERE video_id = ?', (video_id,))
+            conn.execute(
+                'INSERT OR REPLACE INTO fingerprints (video_id, duration, fingerprint) VALUES (?, ?, ?)',
+                (video_id, duration, fingerprint.astype('<u2').tobytes())
+            )
+            conn.executemany('INSERT INTO fingerprint_words (word, video_id, pos) VALUES (?, ?, ?)', words)
+            conn.commit()
+
+    def get(self, video_id: str) -> Optional[Dict]:
+        """Stored fingerprint and duration for a video, or None."""
+        with self._lock:
+            row = self._connect().execute(
+                'SELECT duration, fingerprint FROM fingerprints WHERE video_id = ?', (video_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {'duration': row[0], 'fingerprint': np.frombuffer(row[1], dtype='<u2')}
+
+    def has(self, video_id: str) -> bool:
+        with self._lock:
+            return self._connect().execute(
+                'SELECT 1 FROM fingerprints WHERE video_id = ?', (video_id,)
+            ).fetchone() is not None
+
+    def find_matches(self, video_id: str, max_ber: float = config.FINGERPRINT_MAX_BER) -> List[Tuple[str, float]]:
+        """
+        Other videos whose audio is near-identical to this one's, best first,
+        as (video_id, bit error rate) pairs.
+        """
+        entry = self.get(video_id)
+        if entry is None:
+            return []
+        fingerprint, duration = entry['fingerprint'], entry['duration'] or 0
+        query = {}
+        for pos, w in enumerate(fingerprint[:INDEX_FRAMES]):
+            if w not in (0, 0xFFFF):
+                query.setdefault(int(w), []).append(pos)
+        if not query:
+            return []
+
+        # Vote for (candidate, alignment) pairs that share exact words
+        with self._lock:
+            rows = self._connect().execute(
+                f'SELECT word, video_id, pos FROM fingerprint_words '
+                f'WHERE word IN ({",".join("?" * len(query))}) AND video_id != ?',
+                (*query, video_id)
+            ).fetchall()
+        votes = Counter()
+        for word, candidate, pos in rows:
+            for query_pos in query[word]:
+                votes[(candidate, query_pos - pos)] += 1
+
+        matches = {}
+        for (candidate, offset), _ in votes.most_common(MAX_CANDIDATES):
+            if candidate in matches:
+                continue
+            other = self.get(candidate)
+            # The same audio has (nearly) the same length
+            if other is None or abs((other['duration'] or 0) - duration) > max(2.0, 0.05 * duration):
+                continue
+            ber, frames = bit_error_rate(fingerprint, other['fingerprint'], offset)
+            if frames >= 0.8 * min(len(fingerprint), len(other['fingerprint'])) and ber <= max_ber:
+                matches[candidate] = ber
+
+        return sorted(matches.items(), key=lambda m: m[1])
+
+_index = FingerprintIndex(config.FINGERPRINT_DB)
+
+def get_index() -> FingerprintIndex:
+    return _index
+
+def fingerprint_audio(video_id: str, audio_path: str, duration: float) -> bool:
+    """
+    Fingerprint an extracted audio file into the index (phase 2).
+    Returns True if a fingerprint is stored, False if the audio was too short
+    or couldn't be decoded.
+    """
+    if _index.has(video_id):
+        return True
+    try:
+        fingerprint = fingerprint_file(audio_path)
+    except Exception as e:
+        print(f"   ⚠️  Could not fingerprint {video_id}: {e}")
+        return False
+    if len(fingerprint) < MIN_FRAMES:
+        return False
+    _index.add(video_id, fingerprint, duration)
+    return True
+
+def find_duplicate_transcript(video_id: str) -> Optional[Dict]:
+    """
+    A successful transcript of near-identical audio, copied for this video
+    with 'reused_from' set to the source video_id. None if this video's audio
+    has to be transcribed (or dedup is disabled).
+    """
+    if not config.DEDUP_AUDIO:
+        return None
+    for match_id, _ in _index.find_matches(video_id):
+        entry = get_ledger().lookup(match_id)
+        if entry is None or entry['status'] != 'success':
+            continue
+        result = load_cached_transcript(
+            match_id, os.path.join(config.TRANSCRIPTS_DIR, f"{match_id}.json")
+        )
+        if result is not None and result['success']:
+            # Point at the original, not at another copy of it
+            return dict(result, reused_from=result.get('reused_from') or match_id)
+    return None
+
+def defer_duplicates(items: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Split audio items into those to transcribe first and near-duplicates of
+    earlier items, which should run afterwards so they can reuse the first
+    copy's transcript instead of being sent in parallel with it.
+    """
+    if not config.DEDUP_AUDIO:
+        return list(items), []
+    first, later = [], []
+    seen = set()
+    for item in items:
+        matches = {match_id for match_id, _ in _index.find_matches(item['video_id'])}
+        (later if matches & seen else first).append(item)
+        seen.add(item['video_id'])
+    return first, later
@@ -0,0 +1,113 @@
+"""
+Classification cache: SQLite store of model answers keyed by a hash of the
+request that produced them (model, system prompt, user prompt, temperature).
+Phase 4 only sends requests whose exact prompt hasn't been answered before;
+a changed transcript, caption, prompt template or model is a new key.
+"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from typing import Dict, Iterable, Iterator, Optional
+import config
+
+def request_key(body: Dict) -> str:
+    """Content hash of a chat completion request body."""
+    messages = {m['role']: m['content'] for m in body['messages']}
+    payload = json.dumps(
+        [body['model'], messages.get('system'), messages.get('user'), body.get('temperature')],
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def result_content(result: Dict) -> Optional[str]:
+    """The answer in a batch result line if it is a successful, valid JSON answer."""
+    response = result.get('response') or {}
+    if result.get('error') or response.get('status_code', 200) != 200:
+        return None
+    try:
+        content = response['body']['choices'][0]['message']['content']
+        json.loads(content)
+    except (KeyError, IndexError, TypeError, json.JSONDecodeError):
+        return None
+    return content
+
+def cached_result(custom_id: str, content: str) -> Dict:
+    """A batch-format result line for an answer taken from the cache."""
+    return {
+        'custom_id': custom_id,
+        'response': {
+            'status_code': 200,
+            'body': {'choices': [{'message': {'role': 'assistant', 'content': content}}]}
+        },
+        'error': None,
+        'cached': True
+    }
+
+class ClassificationCache:
+    """SQLite-backed answer cache, safe to share between threads."""
+
+    def __init__(self, db_path: str):
+        self.db_path = str(db_path)
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS classifications (
+                    key TEXT PRIMARY KEY,
+                    content TEXT NOT NULL,
+                    created_at REAL
+                )
+            ''')
+        return self._conn
+
+    def get(self, key: str) -> Optional[str]:
+        """Cached answer for a request key, or None."""
+        with self._lock:
+            row = self._connect().execute(
+                'SELECT content FROM classifications WHERE key = ?', (key,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def put(self, key: str, content: str):
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                'INSERT OR REPLACE INTO classifications (key, content, created_at) VALUES (?, ?, ?)',
+                (key, content, time.time())
+            )
+            conn.commit()
+
+    def count(self) -> int:
+        with self._lock:
+            return self._connect().execute('SELECT COUNT(*) FROM classifications').fetchone()[0]
+
+_cache = ClassificationCache(config.CLASSIFICATION_CACHE_DB)
+
+def get_cache() -> ClassificationCache:
+    return _cache
+
+def remember_results(results: Iterable[Dict], keys: Dict[str, str]) -> Iterator[Dict]:
+    """
+    Pass result lines through, caching each successful answer under its
+    request's key (custom_id -> key). Failures aren't cached so they are
+    sent again next time.
+    """
+    for result in results:
+        key = keys.get(result['custom_id'])
+        content = result_content(result) if key else None
+        if content is not None:
+            _cache.put(key, content)
+        yield result
@@ -0,0 +1,169 @@
+"""
+Concurrency helpers shared by the pipeline phases.
+"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import asyncio
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+class AdaptiveLimiter:
+    """
+    Concurrency limit that tunes itself from measured throughput and errors.
+
+    After each measurement window (at least `window` completed tasks) the
+    limiter compares throughput with the previous window and keeps stepping
+    the limit in whichever direction helped (hill climbing), settling around
+    the point where more workers stop adding throughput. If the error rate in
+    a window exceeds `max_error_rate` the limit is halved instead, so a
+    struggling remote backs off quickly.
+    """
+
+    def __init__(self, name: str, initial: int, minimum: int = 1,
+                 maximum: Optional[int] = None, window: int = 20,
+                 max_error_rate: float = 0.2):
+        self.name = name
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum or initial)
+        self.limit = min(max(initial, self.minimum), self.maximum)
+        self.window = window
+        self.max_error_rate = max_error_rate
+
+        self._cond = threading.Condition()
+        self._active = 0
+        self._completed = 0
+        self._errors = 0
+        self._window_start = time.monotonic()
+        self._last_rate = None
+        self._direction = 1
+
+    def acquire(self):
+        """Block until a slot is free under the current limit."""
+        with self._cond:
+            while self._active >= self.limit:
+                self._cond.wait()
+            self._active += 1
+
+    def release(self, success: bool = True):
+        """Free a slot and record whether the task succeeded."""
+        with self._cond:
+            self._active -= 1
+            self._completed += 1
+            if not success:
+                self._errors += 1
+            # Scale the window with the limit so each measurement spans
+            # several rounds of work and isn't dominated by noise
+            if self._completed >= max(self.window, 2 * self.limit):
+                self._adjust()
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self):
+        """
+        Hold a slot for the duration of the block.
+
+        Yields a dict; set `['success'] = False` to count the task as an error.
+        Exceptions are counted as errors automatically.
+        """
+        self.acquire()
+        outcome = {'success': True}
+        try:
+            yield outcome
+        except Exception:
+            outcome['success'] = False
+            raise
+        finally:
+            self.release(outcome['success'])
+
+    def _adjust(self):
+        """Recompute the limit at the end of a measurement window (lock held)."""
+        elapsed = max(time.monotonic() - self._window_start, 1e-6)
+        rate = (self._completed - self._errors) / elapsed
+        error_rate = self._errors / self._completed
+
+        if error_rate > self.max_error_rate:
+            self.limit = max(self.minimum, self.limit // 2)
+            self._direction = 1
+        elif self._last_rate is not None:
+            if rate < self._last_rate * 0.95:
+                # The last step hurt - go back the other way
+                self._direction = -self._direction
+            elif rate < self._last_rate * 1.05 and self._direction > 0:
+                # Adding workers no longer helps - give the slot back
+                self._direction = -1
+            self.limit = min(self.maximum, max(self.minimum, self.limit + self._direction))
+        else:
+            self.limit = min(self.maximum, self.limit + self._direction)
+
+        self._last_rate = rate
+        self._completed = 0
+        self._errors = 0
+        self._window_start = time.monotonic()
+
+
+class AsyncTokenBucket:
+    """
+    Token bucket for asyncio callers.
+
+    Refills continuously at `rate_per_minute` up to `capacity` (one minute's
+    worth by default). acquire() waits until enough tokens are available.
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate = rate_per_minute / 60.0  # Tokens per second
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, amount: float = 1.0):
+        """Take `amount` tokens, waiting for them to refill if necessary."""
+        # A single request bigger than the bucket can never fit - let it
+        # through once the bucket is full rather than waiting forever
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return
+                await asyncio.sleep((amount - self._tokens) / self.rate)
+
+class AsyncRateLimiter:
+    """
+    Request-rate and work-rate limits for an API, plus a shared cooldown.
+
+    Each call takes one request token and `cost` work tokens (e.g. audio
+    minutes). pause() makes every caller wait, used when the server sends
+    Retry-After.
+    """
+
+    def __init__(self, requests_per_minute: float, units_per_minute: Optional[float] = None):
+        self.requests = AsyncTokenBucket(requests_per_minute)
+        self.units = AsyncTokenBucket(units_per_minute) if units_per_minute else None
+        self._resume_at = 0.0
+
+    def pause(self, seconds: float):
+        """Hold all callers for at least `seconds` from now."""
+        self._resume_at = max(self._resume_at, time.monotonic() + seconds)
+
+    async def acquire(self, cost: float = 0.0):
+        """Wait for the cooldown, a request slot and `cost` units."""
+        while True:
+            delay = self._resume_at - time.monotonic()
+            if delay <= 0:
+                break
+            await asyncio.sleep(delay)
+        await self.requests.acquire(1)
+        if self.units is not None and cost > 0:
+            await self.units.acquire(cost)
@@ -0,0 +1,289 @@
+"""
+Persistent media metadata cache.
+Durations, sizes and codec info are stored in SQLite keyed by path, size and
+mtime, so resumed runs don't start an ffprobe process per cached file. MP3
+durations are read in-process from the frame headers; ffprobe is only used
+for other formats or files the header parser can't make sense of.
+"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import os
+import json
+import sqlite3
+import struct
+import subprocess
+import threading
+from typing import Dict, Optional
+import config
+from scripts import metrics
+
+# MPEG audio header tables
+_BITRATES = {  # (version is MPEG1, layer) -> kbps by index
+    (True, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (True, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (True, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (False, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (False, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (False, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+_SAMPLE_RATES = {3: [44100, 48000, 32000], 2: [22050, 24000, 16000], 0: [11025, 12000, 8000]}
+
+def _parse_frame_header(header: bytes) -> Optional[Dict]:
+    """Decode a 4-byte MPEG audio frame header, or None if it isn't one."""
+    if len(header) < 4:
+        return None
+    b1, b2, b3, b4 = header[:4]
+    if b1 != 0xFF or (b2 & 0xE0) != 0xE0:
+        return None
+
+    version_bits = (b2 >> 3) & 0x3  # 3 = MPEG1, 2 = MPEG2, 0 = MPEG2.5
+    layer = 4 - ((b2 >> 1) & 0x3)
+    bitrate_index = (b3 >> 4) & 0xF
+    sample_rate_index = (b3 >> 2) & 0x3
+    if version_bits == 1 or layer == 4 or bitrate_index in (0, 15) or sample_rate_index == 3:
+        return None
+
+    mpeg1 = version_bits == 3
+    bitrate = _BITRATES[(mpeg1, layer)][bitrate_index] * 1000
+    sample_rate = _SAMPLE_RATES[version_bits][sample_rate_index]
+    padding = (b3 >> 1) & 0x1
+    channels = 1 if (b4 >> 6) == 3 else 2
+
+    if layer == 1:
+        samples = 384
+        frame_length = (12 * bitrate // sample_rate + padding) * 4
+    else:
+        samples = 1152 if (layer == 2 or mpeg1) else 576
+        frame_length = samples // 8 * bitrate // sample_rate + padding
+
+    return {
+        'mpeg1': mpeg1, 'layer': layer, 'bitrate': bitrate,
+        'sample_rate': sample_rate, 'channels': channels,
+        'samples_per_frame': samples, 'frame_length': frame_length,
+    }
+
+def read_mp3_info(path: str) -> Optional[Dict]:
+    """
+    Read duration and stream info from MP3 headers without decoding.
+
+    Uses the Xing/Info or VBRI frame count when present (what libmp3lame
+    writes), otherwise assumes constant bitrate. Returns None if no valid
+    MPEG audio frame is found.
+    """
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        head = f.read(10)
+        offset = 0
+        # Skip an ID3v2 tag (size is a 28-bit syncsafe integer)
+        if head[:3] == b'ID3' and len(head) == 10:
+            offset = 10 + ((head[6] << 21) | (head[7] << 14) | (head[8] << 7) | head[9])
+            if head[5] & 0x10:
+                offset += 10  # Footer present
+
+        f.seek(offset)
+        data = f.read(64 * 1024)
+
+        # Find the first frame whose successor also starts with a valid header
+        frame = None
+        pos = 0
+        while pos < len(data) - 4:
+            pos = data.find(b'\xff', pos)
+            if pos < 0 or pos >= len(data) - 4:
+                break
+            frame = _parse_frame_header(data[pos:pos + 4])
+            if frame and frame['frame_length'] > 0:
+                nxt = pos + frame['frame_length']
+                if nxt + 4 > len(data) or _parse_frame_header(data[nxt:nxt + 4]):
+                    break
+            frame = None
+            pos += 1
+        if frame is None:
+            return None
+
+        audio_start = offset + pos
+        f.seek(max(size - 128, 0))
+        has_id3v1 = f.read(3) == b'TAG'
+
+    audio_bytes = size - audio_start - (128 if has_id3v1 else 0)
+    info = {
+        'codec': 'mp3',
+        'sample_rate': frame['sample_rate'],
+        'channels': frame['channels'],
+        'bit_rate': frame['bitrate'],
+    }
+
+    # Xing/Info header lives right after the side information
+    if frame['mpeg1']:
+        side_info = 17 if frame['channels'] == 1 else 32
+    else:
+        side_info = 9 if frame['channels'] == 1 else 17
+    xing_pos = pos + 4 + side_info
+    frames = None
+    if data[xing_pos:xing_pos + 4] in (b'Xing', b'Info'):
+        flags = struct.unpack('>I', data[xing_pos + 4:xing_pos + 8])[0]
+        if flags & 0x1:
+            frames = struct.unpack('>I', data[xing_pos + 8:xing_pos + 12])[0]
+            # LAME tag: encoder delay and padding, 12 bits each
+            lame_pos = xing_pos + 8 + 4 * bool(flags & 0x1) + 4 * bool(flags & 0x2) \
+                + 100 * bool(flags & 0x4) + 4 * bool(flags & 0x8)
+            trim = 0
+            if data[lame_pos:lame_pos + 4] in (b'LAME', b'Lavc', b'Lavf') and len(data) >= lame_pos + 24:
+                d = data[lame_pos + 21:lame_pos + 24]
+                trim = ((d[0] << 4) | (d[1] >> 4)) + (((d[1] & 0x0F) << 8) | d[2])
+            samples = max(frames * frame['samples_per_frame'] - trim, 0)
+            info['duration'] = samples / frame['sample_rate']
+            audio_bytes -= frame['frame_length']  # The Info frame carries no audio
+    elif data[pos + 36:pos + 40] == b'VBRI':
+        frames = struct.unpack('>I', data[pos + 50:pos + 54])[0]
+        info['duration'] = frames * frame['samples_per_frame'] / frame['sample_rate']
+
+    if frames is None:
+        info['duration'] = audio_bytes * 8 / frame['bitrate']
+    elif info['duration'] > 0:
+        info['bit_rate'] = int(audio_bytes * 8 / info['duration'])
+
+    return info
+
+def ffprobe_info(path: str) -> Optional[Dict]:
+    """Read duration and stream info with an ffprobe subprocess."""
+    metrics.inc('ffprobe_calls_total')
+    try:
+        result = subprocess.run(
+            ['ffprobe', '-v', 'error', '-select_streams', 'a:0',
+             '-show_entries', 'format=duration,bit_rate:stream=codec_name,sample_rate,channels',
+             '-of', 'json', path],
+            capture_output=True, text=True, timeout=10
+        )
+        if result.returncode != 0:
+            return None
+        probe = json.loads(result.stdout)
+        fmt = probe.get('format', {})
+        stream = (probe.get('streams') or [{}])[0]
+        return {
+            'duration': float(fmt.get('duration', 0) or 0),
+            'codec': stream.get('codec_name'),
+            'sample_rate': int(stream.get('sample_rate', 0) or 0),
+            'channels': int(stream.get('channels', 0) or 0),
+            'bit_rate': int(fmt.get('bit_rate', 0) or 0),
+        }
+    except Exception:
+        return None
+
+class MediaCache:
+    """SQLite-backed metadata cache, safe to share between threads."""
+
+    def __init__(self, db_path: str):
+        self.db_path = str(db_path)
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS media (
+                    path TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    duration REAL,
+                    codec TEXT,
+                    sample_rate INTEGER,
+                    channels INTEGER,
+                    bit_rate INTEGER
+                )
+            ''')
+            columns = {r[1] for r in self._conn.execute('PRAGMA table_info(media)')}
+            if 'source_duration' not in columns:
+                # Added for silence trimming; older caches just get the column
+                self._conn.execute('ALTER TABLE media ADD COLUMN source_duration REAL')
+        return self._conn
+
+    def get(self, path: str, size: int, mtime_ns: int) -> Optional[Dict]:
+        """Return cached info if the file hasn't changed since it was probed."""
+        with self._lock:
+            row = self._connect().execute(
+                'SELECT duration, codec, sample_rate, channels, bit_rate, source_duration '
+                'FROM media WHERE path = ? AND size = ? AND mtime_ns = ?',
+                (path, size, mtime_ns)
+            ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(('duration', 'codec', 'sample_rate', 'channels', 'bit_rate',
+                         'source_duration'), row), size=size)
+
+    def put(self, path: str, size: int, mtime_ns: int, info: Dict):
+        """Store info for a file, replacing any stale entry."""
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                'INSERT OR REPLACE INTO media '
+                '(path, size, mtime_ns, duration, codec, sample_rate, channels, bit_rate, '
+                'source_duration) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (path, size, mtime_ns, info.get('duration'), info.get('codec'),
+                 info.get('sample_rate'), info.get('channels'), info.get('bit_rate'),
+                 info.get('source_duration'))
+            )
+            conn.commit()
+
+    def set_source_duration(self, path: str, source_duration: float):
+        """Remember how long a file was before it was trimmed."""
+        info = self.probe(path)
+        if info is None:
+            return
+        st = os.stat(os.path.abspath(path))
+        info['source_duration'] = source_duration
+        self.put(os.path.abspath(path), st.st_size, st.st_mtime_ns, info)
+
+    def probe(self, path: str) -> Optional[Dict]:
+        """Get media info for a file, probing it only on a cache miss."""
+        path = os.path.abspath(path)
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+
+        info = self.get(path, st.st_size, st.st_mtime_ns)
+        if info is not None:
+            metrics.inc('media_probes_total', source='cache')
+            return info
+
+        info = None
+        source = 'mp3_header'
+        if path.lower().endswith('.mp3'):
+            try:
+                info = read_mp3_info(path)
+            except Exception:
+                info = None
+        if info is None:
+            source = 'ffprobe'
+            info = ffprobe_info(path)
+        metrics.inc('media_probes_total', source=source)
+        if info is None:
+            return None
+
+        self.put(path, st.st_size, st.st_mtime_ns, info)
+        info['size'] = st.st_size
+        return info
+
+_cache = MediaCache(config.MEDIA_CACHE_DB)
+
+def probe_media(path: str) -> Optional[Dict]:
+    """
+    Cached media info (duration, size, codec, sample_rate, channels, bit_rate,
+    and source_duration if the file was trimmed).
+    """
+    return _cache.probe(path)
+
+def set_source_duration(path: str, source_duration: float):
+    """Record the pre-trim duration of a file that was trimmed in place."""
+    _cache.set_source_duration(path, source_duration)
+
+def get_duration(path: str) -> float:
+    """Cached audio duration in seconds (0 if the file can't be read)."""
+    info = probe_media(path)
+    return float(info['duration'] or 0) if info else 0.0
@@ -0,0 +1,198 @@
+"""
+Pipeline metrics: counters, latency histograms and gauges shared by all phases.
+Every observation is appended to a JSONL event log, and current totals are
+written as a Prometheus textfile (node_exporter textfile collector format)
+every config.METRICS_FLUSH_SECONDS, so a long run can be watched while it works.
+"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import os
+import json
+import time
+import atexit
+import bisect
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Tuple
+import config
+
+PREFIX = 'socialmedia_'
+
+# name -> (type, help). Recording an undeclared name raises KeyError.
+METRICS = {
+    'downloads_total': ('counter', 'Downloads by mode (stream/video) and status'),
+    'download_bytes_total': ('counter', 'Bytes written by downloads (video files, or encoded audio when streaming)'),
+    'download_seconds': ('histogram', 'Time to download or stream one video'),
+    'ffmpeg_seconds': ('histogram', 'ffmpeg run time by operation'),
+    'ffprobe_calls_total': ('counter', 'ffprobe subprocesses started'),
+    'media_probes_total': ('counter', 'Media info lookups by source (cache, mp3_header, ffprobe)'),
+    'whisper_request_seconds': ('histogram', 'Whisper API request latency'),
+    'whisper_requests_total': ('counter', 'Whisper API requests by status code'),
+    'gpt_request_seconds': ('histogram', 'Online chat completion latency'),
+    'gpt_requests_total': ('counter', 'Classification requests by mode and status code'),
+    'batch_queue_depth': ('gauge', 'Classification requests still waiting in submitted batches'),
+    'batches': ('gauge', 'Submitted batches by status'),
+    'cost_dollars_total': ('counter', 'Estimated API spend by service'),
+    'items_total': ('counter', 'Items finished per stage and status'),
+}
+
+# Upper bounds in seconds; covers probe calls through multi-minute downloads
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+def status_code(error: Optional[Exception]) -> str:
+    """Label for a request outcome: 200, the HTTP status of an API error, or the exception type."""
+    if error is None:
+        return '200'
+    code = getattr(error, 'status_code', None)
+    return str(code) if code is not None else type(error).__name__
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', ' ')
+
+def _format_labels(labels: Labels, extra: str = '') -> str:
+    parts = [f'{k}="{_escape(v)}"' for k, v in labels]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+def _format_value(value: float) -> str:
+    return f"{value:.6g}" if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+class MetricsRegistry:
+    """In-memory metric values plus the event log and textfile, safe to share between threads."""
+
+    def __init__(self, events_path: str, textfile_path: str, flush_seconds: float = 15):
+        self.events_path = str(events_path)
+        self.textfile_path = str(textfile_path)
+        self.flush_seconds = flush_seconds
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, Labels], float] = {}
+        self._histograms: Dict[Tuple[str, Labels], list] = {}  # bucket counts..., sum, count
+        self._events = None
+        self._last_flush = time.monotonic()
+
+    def _record(self, name: str, kind: str, value: float, labels: Dict):
+        declared = METRICS[name][0]
+        if declared != kind:
+            raise ValueError(f"{name} is a {declared}, not a {kind}")
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        event = json.dumps({'ts': round(time.time(), 3), 'metric': name, 'value': value, **labels})
+        with self._lock:
+            if kind == 'counter':
+                self._values[key] = self._values.get(key, 0.0) + value
+            elif kind == 'gauge':
+                self._values[key] = value
+            else:
+                histogram = self._histograms.setdefault(key, [0] * len(BUCKETS) + [0.0, 0])
+                index = bisect.bisect_left(BUCKETS, value)
+                if index < len(BUCKETS):
+                    histogram[index] += 1
+                histogram[-2] += value
+                histogram[-1] += 1
+            if self._events is None:
+                os.makedirs(os.path.dirname(self.events_path), exist_ok=True)
+                self._events = open(self.events_path, 'a', encoding='utf-8')
+            self._events.write(event + '\n')
+            due = time.monotonic() - self._last_flush >= self.flush_seconds
+        if due:
+            self.flush()
+
+    def inc(self, name: str, value: float = 1.0, **labels):
+        self._record(name, 'counter', value, labels)
+
+    def set(self, name: str, value: float, **labels):
+        self._record(name, 'gauge', value, labels)
+
+    def observe(self, name: str, value: float, **labels):
+        self._record(name, 'histogram', value, labels)
+
+    def render(self) -> str:
+        """Current values in the Prometheus text exposition format."""
+        with self._lock:
+            values = dict(self._values)
+            histograms = {key: list(h) for key, h in self._histograms.items()}
+
+        lines = []
+        for name, (kind, help_text) in METRICS.items():
+            series = sorted((labels, v) for (n, labels), v in values.items() if n == name)
+            hist_series = sorted((labels, h) for (n, labels), h in histograms.items() if n == name)
+            if not series and not hist_series:
+                continue
+            full_name = PREFIX + name
+            lines.append(f"# HELP {full_name} {help_text}")
+            lines.append(f"# TYPE {full_name} {kind}")
+            for labels, value in series:
+                lines.append(f"{full_name}{_format_labels(labels)} {_format_value(value)}")
+            for labels, histogram in hist_series:
+                cumulative = 0
+                for bound, count in zip(BUCKETS, histogram):
+                    cumulative += count
+                    le = 'le="%g"' % bound
+                    lines.append(f"{full_name}_bucket{_format_labels(labels, le)} {cumulative}")
+                le = 'le="+Inf"'
+                lines.append(f"{full_name}_bucket{_format_labels(labels, le)} {histogram[-1]}")
+                lines.append(f"{full_name}_sum{_format_labels(labels)} {_format_value(histogram[-2])}")
+                lines.append(f"{full_name}_count{_format_labels(labels)} {histogram[-1]}")
+        return '\n'.join(lines) + '\n'
+
+    def flush(self):
+        """Flush the event log and rewrite the textfile (atomically, so scrapers never see half a file)."""
+        with self._lock:
+            self._last_flush = time.monotonic()
+            if self._events is None:
+                return  # Nothing recorded in this process
+            self._events.flush()
+        text = self.render()
+        os.makedirs(os.path.dirname(self.textfile_path), exist_ok=True)
+        tmp_path = f"{self.textfile_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp_path, self.textfile_path)
+
+_registry = MetricsRegistry(config.METRICS_EVENTS_FILE, config.METRICS_TEXTFILE, config.METRICS_FLUSH_SECONDS)
+
+def get_metrics() -> MetricsRegistry:
+    return _registry
+
+def inc(name: str, value: float = 1.0, **labels):
+    """Add to a counter."""
+    if config.METRICS_ENABLED:
+        _registry.inc(name, value, **labels)
+
+def set_gauge(name: str, value: float, **labels):
+    if config.METRICS_ENABLED:
+        _registry.set(name, value, **labels)
+
+def observe(name: str, value: float, **labels):
+    """Add an observation (seconds) to a histogram."""
+    if config.METRICS_ENABLED:
+        _registry.observe(name, value, **labels)
+
+@contextmanager
+def timer(name: str, **labels) -> Iterator[Dict]:
+    """
+    Time a block into a histogram. Yields the labels dict so the block can
+    add labels it only knows at the end (e.g. a status).
+    """
+    start = time.perf_counter()
+    try:
+        yield labels
+    finally:
+        observe(name, time.perf_counter() - start, **labels)
+
+def record_request(service: str, seconds: float, error: Optional[Exception] = None, **labels):
+    """Latency and status code of one API request ('whisper' or 'gpt')."""
+    code = status_code(error)
+    observe(f'{service}_request_seconds', seconds, status_code=code)
+    inc(f'{service}_requests_total', status_code=code, **labels)
+
+def flush():
+    if config.METRICS_ENABLED:
+        _registry.flush()
+
+atexit.register(flush)
@@ -0,0 +1,25 @@
+"""
+Shared synchronous OpenAI client, created on first use. Importing a phase
+(or running `socialmedia.py --help`) doesn't load the openai package or
+need an API key until a request is actually made.
+"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import threading
+import config
+
+_client = None
+_lock = threading.Lock()
+
+def get_client():
+    """The OpenAI client for config.OPENAI_API_KEY (and OPENAI_BASE_URL, if set)."""
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                from openai import OpenAI
+                _client = OpenAI(api_key=config.OPENAI_API_KEY, base_url=config.OPENAI_BASE_URL)
+    return _client
@@ -1,6 +1,8 @@
 """
-Phase 1: Data Parser - Extract initial data from JSON files to CSV
-Creates a basic CSV with available fields from Instagram and TikTok data.
+Phase 1: Data Parser - Extract initial data from JSON files into the pipeline store
+Creates the base viral_database table with available fields from Instagram and TikTok data.
+Later exports are upserted: new posts are appended and marked pending for phases
+2-4, posts already in the table only get their metrics refreshed.
 """
 
 import sys
@@ -9,8 +11,121 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 import json
 import pandas as pd
-from typing import List, Dict
+from typing import List, Dict, Iterable, Iterator, Optional, Sequence
 import config
+from scripts.store import read_table, write_table, upsert_table, table_exists, table_columns, apply_schema
+
+# Read size for the streaming parser. The buffer grows past this when a single
+# post is larger than one chunk.
+STREAM_CHUNK_SIZE = 1 << 20  # 1 MiB
+
+# Fields each parser actually uses - everything else (latestComments, owner,
+# profile pic URLs, ...) is dropped as soon as a post has been decoded.
+INSTAGRAM_FIELDS = (
+    'id', 'shortCode', 'type', 'inputUrl', 'caption', 'videoViewCount', 'url', 'videoUrl',
+    'likesCount', 'commentsCount', 'timestamp',
+)
+TIKTOK_FIELDS = (
+    'text', 'authorMeta.name', 'playCount', 'webVideoUrl', 'diggCount',
+    'commentCount', 'shareCount', 'videoMeta.duration', 'musicMeta.musicName',
+)
+
+# Engagement numbers that change between scrapes of the same post
+METRIC_COLUMNS = ['view_count', 'likes_count', 'comments_count', 'share_count']
+
+# Fields to be filled in later phases
+PLACEHOLDER_COLUMNS = [
+    'product_category', 'product_name', 'transcript', 'intended_age_category', 'intended_spending_category'
+]
+
+# Column order of each platform's rows
+INSTAGRAM_COLUMNS = [
+    'post_key', 'caption', 'account_name', 'view_count', 'source_url', 'video_url', 'platform',
+    'likes_count', 'comments_count', 'timestamp',
+] + PLACEHOLDER_COLUMNS
+TIKTOK_COLUMNS = [
+    'post_key', 'caption', 'account_name', 'view_count', 'source_url', 'video_url', 'platform',
+    'likes_count', 'comments_count', 'share_count', 'video_duration', 'music_name', 'timestamp',
+] + PLACEHOLDER_COLUMNS
+
+def iter_json_array(filepath: str, fields: Optional[Sequence[str]] = None,
+                    chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[Dict]:
+    """
+    Incrementally parse a top-level JSON array, yielding one element at a time.
+    
+    Only one post is held in memory at once, so peak memory stays flat no matter
+    how large the export is. If `fields` is given, each post is projected down to
+    those keys before it is yielded.
+    """
+    decoder = json.JSONDecoder()
+    with open(filepath, 'r', encoding='utf-8') as f:
+        buf = f.read(chunk_size)
+        pos = 0
+        eof = not buf
+        
+        # Skip to the opening bracket
+        while True:
+            while pos < len(buf) and buf[pos].isspace():
+                pos += 1
+            if pos < len(buf) or eof:
+                break
+            buf, pos = f.read(chunk_size), 0
+            eof = not buf
+        if pos >= len(buf) or buf[pos] != '[':
+            raise json.JSONDecodeError("Expected a top-level JSON array", buf, pos)
+        pos += 1
+        
+        while True:
+            # Skip whitespace and separators between elements
+            while pos < len(buf) and (buf[pos].isspace() or buf[pos] == ','):
+                pos += 1
+            if pos < len(buf) and buf[pos] == ']':
+                return
+            
+            if pos >= len(buf):
+                if eof:
+                    raise json.JSONDecodeError("Unterminated JSON array", buf, pos)
+                buf, pos = f.read(chunk_size), 0
+                eof = not buf
+                continue
+            
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                # Most likely the element spans past the end of the buffer
+                if eof:
+                    raise
+                more = f.read(max(chunk_size, len(buf) - pos))
+                eof = not more
+                buf, pos = buf[pos:] + more, 0
+                continue
+            
+            # A number cut short by the buffer still decodes ('1.5e3' as '1.5'),
+            # so a scalar only counts once the separator after it is in the buffer
+            if not eof and not isinstance(item, (dict, list, str)) and \
+                    (end == len(buf) or buf[end] not in ' \t\r\n,]'):
+                more = f.read(chunk_size)
+                eof = not more
+                buf, pos = buf[pos:] + more, 0
+                continue
+            
+            pos = end
+            if fields is not None and isinstance(item, dict):
+                item = {key: item[key] for key in fields if key in item}
+            yield item
+            
+            # Drop the consumed prefix so the buffer doesn't grow with the file
+            if pos >= chunk_size:
+                buf, pos = buf[pos:], 0
+
+def stream_json_file(filepath: str, fields: Optional[Sequence[str]] = None) -> Iterator[Dict]:
+    """Stream posts from a JSON export, reporting errors like load_json_file."""
+    try:
+        yield from iter_json_array(filepath, fields)
+    except FileNotFoundError:
+        print(f"Error: {filepath} not found")
+    except json.JSONDecodeError as e:
+        print(f"Error parsing {filepath}: {e}")
 
 def load_json_file(filepath: str) -> List[Dict]:
     """Load JSON file and return data."""
@@ -24,9 +139,22 @@ def load_json_file(filepath: str) -> List[Dict]:
         print(f"Error parsing {filepath}: {e}")
         return []
 
-def parse_instagram_data(data: List[Dict]) -> pd.DataFrame:
+def build_frame(columns: Dict[str, list], order: List[str], **constants) -> pd.DataFrame:
+    """
+    One platform's rows from per-column value lists plus constant columns,
+    cast to the viral_database schema (categoricals, 32-bit counts).
+    """
+    df = pd.DataFrame(columns)
+    for col, value in constants.items():
+        df[col] = value
+    for col in PLACEHOLDER_COLUMNS:
+        df[col] = ''
+    return apply_schema(df[order], 'viral_database')
+
+def parse_instagram_data(data: Iterable[Dict]) -> pd.DataFrame:
     """Parse Instagram JSON data into DataFrame."""
-    records = []
+    columns = {col: [] for col in INSTAGRAM_COLUMNS if col not in ('platform', *PLACEHOLDER_COLUMNS)}
+    post_keys, captions, accounts, views, urls, video_urls, likes, comments, timestamps = columns.values()
     
     for item in data:
         # Only process video content
@@ -41,105 +169,105 @@ def parse_instagram_data(data: List[Dict]) -> pd.DataFrame:
             parts = input_url.split('/')
             if len(parts) >= 4:
                 account_name = parts[3].split('?')[0]  # Get username, remove query params
-            
-        record = {
-            'caption': item.get('caption', ''),
-            'account_name': account_name,
-            'view_count': item.get('videoViewCount', 0),
-            'source_url': item.get('url', ''),
-            'video_url': item.get('videoUrl', ''),  # Direct video URL for download
-            'platform': 'Instagram',
-            'likes_count': item.get('likesCount', 0),
-            'comments_count': item.get('commentsCount', 0),
-            'timestamp': item.get('timestamp', ''),
-            # Fields to be filled in later phases
-            'product_category': '',
-            'product_name': '',
-            'transcript': '',
-            'intended_age_category': '',
-            'intended_spending_category': '',
-        }
-        records.append(record)
+        
+        post_keys.append(f"ig:{item.get('shortCode') or item.get('id') or item.get('url', '')}")
+        captions.append(item.get('caption', ''))
+        accounts.append(account_name)
+        views.append(item.get('videoViewCount', 0))
+        urls.append(item.get('url', ''))
+        video_urls.append(item.get('videoUrl', ''))  # Direct video URL for download
+        likes.append(item.get('likesCount', 0))
+        comments.append(item.get('commentsCount', 0))
+        timestamps.append(item.get('timestamp', ''))
     
-    return pd.DataFrame(records)
+    return build_frame(columns, INSTAGRAM_COLUMNS, platform='Instagram')
 
-def parse_tiktok_data(data: List[Dict]) -> pd.DataFrame:
+def parse_tiktok_data(data: Iterable[Dict]) -> pd.DataFrame:
     """Parse TikTok JSON data into DataFrame."""
-    records = []
+    columns = {col: [] for col in TIKTOK_COLUMNS if col not in ('platform', 'timestamp', *PLACEHOLDER_COLUMNS)}
+    post_keys, captions, accounts, views, urls, video_urls, likes, comments, shares, durations, music = columns.values()
     
     for item in data:
-        record = {
-            'caption': item.get('text', ''),
-            'account_name': item.get('authorMeta.name', 'Unknown'),
-            'view_count': item.get('playCount', 0),
-            'source_url': item.get('webVideoUrl', ''),
-            'video_url': item.get('webVideoUrl', ''),  # TikTok uses web URL
-            'platform': 'TikTok',
-            'likes_count': item.get('diggCount', 0),
-            'comments_count': item.get('commentCount', 0),
-            'share_count': item.get('shareCount', 0),
-            'video_duration': item.get('videoMeta.duration', 0),
-            'music_name': item.get('musicMeta.musicName', ''),
-            'timestamp': '',  # TikTok data doesn't have timestamp in this format
-            # Fields to be filled in later phases
-            'product_category': '',
-            'product_name': '',
-            'transcript': '',
-            'intended_age_category': '',
-            'intended_spending_category': '',
-        }
-        records.append(record)
+        url = item.get('webVideoUrl', '')
+        post_keys.append(f"tt:{url}")
+        captions.append(item.get('text', ''))
+        accounts.append(item.get('authorMeta.name', 'Unknown'))
+        views.append(item.get('playCount', 0))
+        urls.append(url)
+        video_urls.append(url)  # TikTok uses web URL
+        likes.append(item.get('diggCount', 0))
+        comments.append(item.get('commentCount', 0))
+        shares.append(item.get('shareCount', 0))
+        durations.append(item.get('videoMeta.duration', 0))
+        music.append(item.get('musicMeta.musicName', ''))
     
-    return pd.DataFrame(records)
+    # TikTok data doesn't have timestamp in this format
+    return build_frame(columns, TIKTOK_COLUMNS, platform='TikTok', timestamp='')
+
+def legacy_post_keys(df: pd.DataFrame) -> pd.Series:
+    """
+    post_key for rows written before keys were stored: Instagram post URLs
+    end in the shortCode, TikTok rows are keyed by their URL.
+    """
+    shortcodes = df['source_url'].str.extract(r'instagram\.com/(?:p|reel)/([^/?#]+)', expand=False)
+    return ('ig:' + shortcodes).where(df['platform'] == 'Instagram', 'tt:' + df['source_url'])
+
+def backfill_post_keys():
+    """Add post_key and pending to a viral_database written before upserts (one-off)."""
+    if not table_exists('viral_database') or 'post_key' in table_columns('viral_database'):
+        return
+    df = read_table('viral_database')
+    df['post_key'] = legacy_post_keys(df)
+    # Rows that have been through phase 5 are done; otherwise let phases 2-4 resume them
+    df['pending'] = not table_exists('viral_database_final')
+    write_table(df, 'viral_database')
 
 def create_initial_csv():
-    """Main function to create initial CSV from JSON files."""
+    """Main function to create the initial viral_database table from JSON files."""
+    config.ensure_dirs()
     print("=" * 60)
-    print("PHASE 1: Data Parsing - Creating Initial CSV")
+    print("PHASE 1: Data Parsing - Creating Initial Database")
     print("=" * 60)
     
-    # Load data
-    print(f"\n📂 Loading {config.INSTAGRAM_JSON}...")
-    instagram_data = load_json_file(config.INSTAGRAM_JSON)
-    print(f"   Found {len(instagram_data)} Instagram posts")
-    
-    print(f"\n📂 Loading {config.TIKTOK_JSON}...")
-    tiktok_data = load_json_file(config.TIKTOK_JSON)
-    print(f"   Found {len(tiktok_data)} TikTok videos")
-    
-    # Parse data
-    print("\n🔄 Parsing Instagram data...")
-    instagram_df = parse_instagram_data(instagram_data)
+    # Stream and parse data one post at a time
+    print(f"\n📂 Streaming {config.INSTAGRAM_JSON}...")
+    instagram_df = parse_instagram_data(stream_json_file(config.INSTAGRAM_JSON, INSTAGRAM_FIELDS))
     print(f"   Parsed {len(instagram_df)} Instagram videos")
     
-    print("\n🔄 Parsing TikTok data...")
-    tiktok_df = parse_tiktok_data(tiktok_data)
+    print(f"\n📂 Streaming {config.TIKTOK_JSON}...")
+    tiktok_df = parse_tiktok_data(stream_json_file(config.TIKTOK_JSON, TIKTOK_FIELDS))
     print(f"   Parsed {len(tiktok_df)} TikTok videos")
     
     # Combine dataframes
     print("\n🔗 Combining data from both platforms...")
-    combined_df = pd.concat([instagram_df, tiktok_df], ignore_index=True)
+    combined_df = apply_schema(pd.concat([instagram_df, tiktok_df], ignore_index=True), 'viral_database')
     
-    # Sort by view count (descending)
+    # Sort by view count (descending); new posts are appended in this order
     combined_df = combined_df.sort_values('view_count', ascending=False)
+    combined_df['pending'] = True
     
-    # Save to CSV
-    print(f"\n💾 Saving to {config.OUTPUT_CSV}...")
-    combined_df.to_csv(config.OUTPUT_CSV, index=False, encoding='utf-8')
+    # Upsert into the typed store
+    print(f"\n💾 Upserting into viral_database table...")
+    backfill_post_keys()
+    output_path, inserted, updated = upsert_table(
+        combined_df, 'viral_database', key='post_key', update_columns=METRIC_COLUMNS
+    )
     
     # Print statistics
     print("\n" + "=" * 60)
-    print("✅ PHASE 1 COMPLETE - Initial CSV Created")
+    print("✅ PHASE 1 COMPLETE - Initial Database Created")
     print("=" * 60)
     print(f"\n📊 Statistics:")
-    print(f"   Total videos: {len(combined_df)}")
+    print(f"   Videos in export: {len(combined_df)}")
     print(f"   Instagram: {len(instagram_df)}")
     print(f"   TikTok: {len(tiktok_df)}")
+    print(f"   New (pending for phases 2-4): {inserted}")
+    print(f"   Existing (metrics updated): {updated}")
     print(f"   Total views: {combined_df['view_count'].sum():,}")
     print(f"   Average views: {combined_df['view_count'].mean():,.0f}")
     print(f"   Top video views: {combined_df['view_count'].max():,}")
-    print(f"\n📝 Output saved to: {config.OUTPUT_CSV}")
-    print("\n🔜 Next: Run phase2_audio_extractor.py to download videos and extract audio")
+    print(f"\n📝 Output saved to: {output_path}")
+    print("\n🔜 Next: Run phase1b_caption_triage.py to skip audio for self-describing captions")
     print("=" * 60)
     
     return combined_df
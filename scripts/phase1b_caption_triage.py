@@ -0,0 +1,147 @@
+"""
+Phase 1b: Caption Triage - Decide which videos need their audio transcribed
+Scores each caption for product information (brand, model, year, price). Rows
+whose caption already identifies the product skip download and Whisper and
+go straight to classification.
+"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import re
+import pandas as pd
+from typing import List, Optional
+import config
+from scripts.store import read_table, write_table, table_exists, table_columns
+
+# Makes and model names that show up in the dataset (lowercase)
+BRANDS = [
+    'toyota', 'lexus', 'bmw', 'mercedes', 'mercedez', 'benz', 'range rover', 'rangerover',
+    'land rover', 'landrover', 'volkswagen', 'vw', 'porsche', 'audi', 'maserati', 'bentley',
+    'rolls royce', 'lamborghini', 'ferrari', 'jaguar', 'jeep', 'ford', 'nissan', 'subaru',
+    'mazda', 'honda', 'mitsubishi', 'hyundai', 'kia', 'tesla', 'volvo',
+    'samsung', 'apple', 'xiaomi', 'tecno', 'infinix', 'oppo', 'huawei', 'sony', 'lg', 'jbl',
+    'anker', 'dji',
+]
+MODEL_NAMES = [
+    'land cruiser', 'landcruiser', 'prado', 'harrier', 'hilux', 'fortuner', 'alphard', 'defender',
+    'discovery', 'evoque', 'velar', 'vogue', 'touareg', 'toaureg', 'tiguan', 'cayenne',
+    'macan', 'panamera', 'levante', 'ghibli', 'bentayga', 'patrol', 'forester', 'outback',
+    'iphone', 'ipad', 'macbook', 'airpods', 'galaxy',
+]
+BRAND_PATTERN = re.compile(r'\b(?:' + '|'.join(re.escape(b) for b in BRANDS) + r')\b')
+MODEL_NAME_PATTERN = re.compile(r'\b(?:' + '|'.join(re.escape(m) for m in MODEL_NAMES) + r')\b')
+
+# Product words that name what is being sold even without a brand
+PRODUCT_PATTERN = re.compile(
+    r'\b(?:led sign|light box|neon sign|signboard|sign board|earbuds|headphones|speaker|'
+    r'smart ?watch|drone|projector|massager|laptop|phone)s?\b'
+)
+
+# Prices like "Ugx 780m", "ugx 450million", "UGX 1.2b", "shs 350,000", "235m"
+PRICE_PATTERN = re.compile(
+    r'(?:\b(?:ugx|ushs|shs)\.?\s*\d[\d,.]*\s*(?:m|mn|million|k|b|bn|billion)?\b'
+    r'|\b\d+(?:\.\d+)?\s*(?:m|mn|million|bn|billion)\b)'
+)
+
+# Model years (1980-2039)
+YEAR_PATTERN = re.compile(r'\b(?:19[89]\d|20[0-3]\d)\b')
+
+# Model codes mix letters and digits: lx600, x6m, c200, gle450, rx450h, 523i, v8
+MODEL_PATTERN = re.compile(r'\b(?=[a-z]*\d)(?=\d*[a-z])[a-z\d]{2,10}\b')
+
+# Noise that would otherwise look like prices, years or model codes
+NOISE_PATTERN = re.compile(r'[#@]\w+|\+?\d[\d\s-]{8,}\d|\S+@\S+|https?://\S+')
+
+WEIGHTS = {'brand': 0.3, 'model': 0.3, 'year': 0.2, 'price': 0.35, 'product': 0.2}
+
+def clean_caption(caption: Optional[str]) -> str:
+    """Lowercase a caption and drop hashtags, mentions, phone numbers and links."""
+    if not isinstance(caption, str):
+        return ''
+    return NOISE_PATTERN.sub(' ', caption.lower())
+
+def caption_signals(caption: Optional[str]) -> dict:
+    """Which kinds of product information a caption contains."""
+    text = clean_caption(caption)
+    # Remove prices and years first so "350m" and "2018" don't count as model codes
+    without_prices = PRICE_PATTERN.sub(' ', text)
+    return {
+        'brand': bool(BRAND_PATTERN.search(text)),
+        'model': bool(MODEL_NAME_PATTERN.search(text)
+                      or MODEL_PATTERN.search(YEAR_PATTERN.sub(' ', without_prices))),
+        'year': bool(YEAR_PATTERN.search(without_prices)),
+        'price': bool(PRICE_PATTERN.search(text)),
+        'product': bool(PRODUCT_PATTERN.search(text)),
+    }
+
+def score_caption(caption: Optional[str]) -> float:
+    """How well a caption identifies the product, from 0 (nothing) to 1."""
+    signals = caption_signals(caption)
+    return min(1.0, sum(WEIGHTS[name] for name, found in signals.items() if found))
+
+def read_videos_needing_audio(columns: List[str]) -> pd.DataFrame:
+    """
+    Pending rows of viral_database that still need audio (every row if
+    triage hasn't been run / the table has no pending flag).
+    """
+    existing = table_columns('viral_database')
+    filters = []
+    if 'needs_audio' in existing:
+        filters.append(('needs_audio', '==', True))
+    if 'pending' in existing:
+        filters.append(('pending', '==', True))
+    return read_table('viral_database', columns=columns, filters=filters or None)
+
+def triage_captions():
+    """Main function to score captions and flag rows that need audio."""
+    print("=" * 60)
+    print("PHASE 1b: Caption Triage")
+    print("=" * 60)
+
+    if not table_exists('viral_database'):
+        print(f"\n❌ Error: viral_database table not found. Run phase1_data_parser.py first.")
+        return
+
+    print(f"\n📂 Loading viral_database table...")
+    df = read_table('viral_database')
+    print(f"   Found {len(df)} videos")
+
+    if 'caption_score' not in df.columns:
+        df['caption_score'] = pd.Series(pd.NA, index=df.index, dtype='Float64')
+        df['needs_audio'] = pd.Series(pd.NA, index=df.index, dtype='boolean')
+    
+    # Score new posts only; rows triaged by an earlier run keep their decision
+    todo = df['caption_score'].isna()
+    if 'pending' in df.columns:
+        todo |= df['pending'].fillna(False).astype(bool)
+    
+    print(f"\n🔎 Scoring {int(todo.sum())} captions...")
+    df.loc[todo, 'caption_score'] = [score_caption(c) for c in df.loc[todo, 'caption'].to_numpy(dtype=object)]
+    df.loc[todo, 'needs_audio'] = df.loc[todo, 'caption_score'] < config.CAPTION_SCORE_THRESHOLD
+
+    output_path = write_table(df, 'viral_database')
+
+    needs_audio = int(df['needs_audio'].sum())
+    caption_only = len(df) - needs_audio
+    saved_minutes = df.loc[~df['needs_audio'], 'video_duration'].sum() / 60
+
+    print("\n" + "=" * 60)
+    print("✅ PHASE 1b COMPLETE - Caption Triage")
+    print("=" * 60)
+    print(f"\n📊 Statistics:")
+    print(f"   Total videos: {len(df)}")
+    print(f"   Classify from caption: {caption_only} ({caption_only / max(len(df), 1) * 100:.0f}%)")
+    print(f"   Need audio: {needs_audio}")
+    print(f"   Threshold: {config.CAPTION_SCORE_THRESHOLD}")
+    print(f"   Whisper minutes avoided: ~{saved_minutes:.0f} (${saved_minutes * 0.006:.2f})")
+    print(f"\n📊 By platform (caption only / total):")
+    for platform, group in df.groupby('platform', observed=True):
+        print(f"   {platform}: {int((~group['needs_audio']).sum())} / {len(group)}")
+    print(f"\n📝 Saved to: {output_path}")
+    print("\n🔜 Next: Run phase2_audio_extractor.py to extract audio for the rest")
+    print("=" * 60)
+
+if __name__ == "__main__":
+    triage_captions()
@@ -8,22 +8,35 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 import os
+import time
 import subprocess
 import pandas as pd
 from tqdm import tqdm
 import config
+from scripts import media_cache, metrics, tracing
+from scripts.audio_fingerprint import fingerprint_audio, get_index
+from scripts.store import upsert_table, table_exists, get_video_id
+from scripts.phase1b_caption_triage import read_videos_needing_audio
 import json
-import hashlib
 
-def get_video_id(url: str) -> str:
-    """Generate a unique ID for a video URL."""
-    return hashlib.md5(url.encode()).hexdigest()[:12]
+def record_download(mode: str, start: float, ok: bool, path: str):
+    """Download metrics and span: outcome, time since start, and bytes written to path."""
+    status = 'ok' if ok else 'failed'
+    seconds = time.perf_counter() - start
+    size = os.path.getsize(path) if ok else 0
+    metrics.inc('downloads_total', mode=mode, status=status)
+    metrics.observe('download_seconds', seconds, mode=mode, status=status)
+    if ok:
+        metrics.inc('download_bytes_total', size, mode=mode)
+    tracing.record_span('download', seconds, status, mode=mode, bytes=size)
 
 def download_video_ytdlp(url: str, output_path: str, video_id: str) -> bool:
     """
     Download video using yt-dlp.
     Returns True if successful, False otherwise.
     """
+    start = time.perf_counter()
+    ok = False
     try:
         # yt-dlp command with options optimized for Instagram and TikTok
         cmd = [
@@ -38,7 +51,8 @@ def download_video_ytdlp(url: str, output_path: str, video_id: str) -> bool:
         ]
         
         result = subprocess.run(cmd, capture_output=True, text=True, timeout=300)
-        return result.returncode == 0
+        ok = result.returncode == 0
+        return ok
         
     except subprocess.TimeoutExpired:
         print(f"   ⚠️  Timeout downloading {video_id}")
@@ -46,6 +60,64 @@ def download_video_ytdlp(url: str, output_path: str, video_id: str) -> bool:
     except Exception as e:
         print(f"   ⚠️  Error downloading {video_id}: {e}")
         return False
+    finally:
+        record_download('video', start, ok and os.path.exists(output_path), output_path)
+
+def stream_audio_ytdlp(url: str, audio_path: str, video_id: str, bitrate: str = '32k') -> bool:
+    """
+    Stream the audio-only format from yt-dlp into ffmpeg's stdin.
+    Only the final 16kHz mono MP3 is written to disk - no temp video file.
+    Returns True if successful, False otherwise.
+    """
+    part_path = f"{audio_path}.part"
+    ytdlp = ffmpeg = None
+    start = time.perf_counter()
+    ok = False
+    try:
+        ytdlp = subprocess.Popen(
+            ['yt-dlp', '--no-playlist', '--no-warnings', '--quiet',
+             '-f', 'bestaudio/best',  # Audio-only when the platform offers it
+             '-o', '-',  # Write to stdout
+             url],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+        )
+        ffmpeg = subprocess.Popen(
+            ['ffmpeg', '-i', 'pipe:0',
+             '-vn',  # No video
+             '-acodec', 'libmp3lame',  # MP3 codec
+             '-ar', '16000',  # 16kHz sample rate (optimal for Whisper)
+             '-ac', '1',  # Mono
+             '-b:a', bitrate,
+             '-f', 'mp3',
+             '-loglevel', 'error',
+             '-y', part_path],
+            stdin=ytdlp.stdout, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        ytdlp.stdout.close()  # ffmpeg owns the read end now
+        
+        ffmpeg.wait(timeout=300)
+        ytdlp.wait(timeout=10)
+        
+        if ytdlp.returncode == 0 and ffmpeg.returncode == 0 and os.path.getsize(part_path) > 0:
+            os.replace(part_path, audio_path)
+            ok = True
+            return True
+        return False
+        
+    except subprocess.TimeoutExpired:
+        print(f"   ⚠️  Timeout streaming audio for {video_id}")
+        return False
+    except Exception as e:
+        print(f"   ⚠️  Error streaming audio for {video_id}: {e}")
+        return False
+    finally:
+        for proc in (ytdlp, ffmpeg):
+            if proc is not None and proc.poll() is None:
+                proc.kill()
+                proc.wait()
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        record_download('stream', start, ok, audio_path)
 
 def extract_audio_ffmpeg(video_path: str, audio_path: str) -> bool:
     """
@@ -65,7 +137,8 @@ def extract_audio_ffmpeg(video_path: str, audio_path: str) -> bool:
             audio_path
         ]
         
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=120)
+        with tracing.span('ffmpeg', operation='extract'), metrics.timer('ffmpeg_seconds', operation='extract'):
+            result = subprocess.run(cmd, capture_output=True, text=True, timeout=120)
         return result.returncode == 0 and os.path.exists(audio_path)
         
     except subprocess.TimeoutExpired:
@@ -75,25 +148,111 @@ def extract_audio_ffmpeg(video_path: str, audio_path: str) -> bool:
         print(f"   ⚠️  Error extracting audio: {e}")
         return False
 
-def get_audio_duration(audio_path: str) -> int:
-    """Get audio duration in seconds using ffprobe."""
+def trim_audio_ffmpeg(audio_path: str, max_duration: float, remove_silence: bool = True,
+                      bitrate: str = '32k') -> bool:
+    """
+    Cut silent stretches and cap the length of an audio file, in place.
+    Returns True if the file was rewritten, False if it was left as it was.
+    """
+    part_path = f"{audio_path}.trim.part"
     try:
-        cmd = [
-            'ffprobe',
-            '-v', 'error',
-            '-show_entries', 'format=duration',
-            '-of', 'default=noprint_wrappers=1:nokey=1',
-            audio_path
-        ]
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
-        if result.returncode == 0:
-            return int(float(result.stdout.strip()))
-        return 0
-    except:
-        return 0
+        cmd = ['ffmpeg', '-i', audio_path]
+        if remove_silence:
+            threshold = f"{config.SILENCE_THRESHOLD_DB:g}dB"
+            cmd += [
+                '-af', 'silenceremove='
+                       f'start_periods=1:start_threshold={threshold}:'  # Leading silence
+                       f'stop_periods=-1:stop_threshold={threshold}:'  # Every gap after that...
+                       f'stop_duration={config.SILENCE_MIN_DURATION:g}:'  # ...at least this long
+                       'stop_silence=0.25',  # Leave a short pause so words don't run together
+                '-acodec', 'libmp3lame', '-ar', '16000', '-ac', '1', '-b:a', bitrate
+            ]
+        else:
+            cmd += ['-acodec', 'copy']  # Only capping - no need to re-encode
+        cmd += ['-t', str(max_duration), '-f', 'mp3', '-loglevel', 'error', '-y', part_path]
+        
+        operation = 'trim' if remove_silence else 'cap'
+        with tracing.span('ffmpeg', operation=operation), metrics.timer('ffmpeg_seconds', operation=operation):
+            result = subprocess.run(cmd, capture_output=True, text=True, timeout=120)
+        if result.returncode != 0:
+            return False
+        
+        # Keep the original if trimming left (next to) nothing - e.g. a silent clip
+        info = media_cache.read_mp3_info(part_path)
+        if not info or info['duration'] < 1.0:
+            return False
+        
+        os.replace(part_path, audio_path)
+        return True
+        
+    except subprocess.TimeoutExpired:
+        print(f"   ⚠️  Timeout trimming audio")
+        return False
+    except Exception as e:
+        print(f"   ⚠️  Error trimming audio: {e}")
+        return False
+    finally:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+
+def trim_audio(audio_path: str, bitrate: str = '32k'):
+    """
+    Preprocess a freshly extracted file before transcription: remove silence
+    (config.TRIM_SILENCE) and cap it at config.MAX_AUDIO_DURATION. The original
+    duration is kept in the media cache so savings survive resumed runs.
+    """
+    original = media_cache.get_duration(audio_path)
+    if config.TRIM_SILENCE or original > config.MAX_AUDIO_DURATION:
+        trim_audio_ffmpeg(audio_path, config.MAX_AUDIO_DURATION, config.TRIM_SILENCE, bitrate)
+    media_cache.set_source_duration(audio_path, original)
+
+def is_trimmed(audio_path: str) -> bool:
+    """True if the file has been through trim_audio (audio cached by older runs hasn't)."""
+    info = media_cache.probe_media(audio_path)
+    return info is not None and info.get('source_duration') is not None
+
+def audio_fields(audio_path: str) -> dict:
+    """Result fields for an extracted audio file (durations in seconds)."""
+    info = media_cache.probe_media(audio_path) or {}
+    duration = float(info.get('duration') or 0)
+    original = float(info.get('source_duration') or duration)
+    return {
+        'audio_extracted': True,
+        'audio_duration': duration,
+        'original_duration': original,
+        'minutes_saved': (original - duration) / 60,
+        'audio_path': audio_path
+    }
+
+def prepare_audio(video_id: str, audio_path: str, bitrate: str = '32k') -> dict:
+    """
+    Get an extracted file ready for transcription: trim it (once) and add its
+    fingerprint to the dedup index. Returns the result fields for the file.
+    """
+    if not is_trimmed(audio_path):
+        trim_audio(audio_path, bitrate)
+    fields = audio_fields(audio_path)
+    if config.DEDUP_AUDIO:
+        with tracing.span('fingerprint'):
+            fingerprint_audio(video_id, audio_path, fields['audio_duration'])
+    return fields
+
+def is_prepared(video_id: str, audio_path: str) -> bool:
+    """True if prepare_audio has nothing left to do for this file."""
+    return is_trimmed(audio_path) and (not config.DEDUP_AUDIO or get_index().has(video_id))
+
+def get_audio_duration(audio_path: str) -> int:
+    """Get audio duration in seconds (from the media cache, probing on a miss)."""
+    return int(media_cache.get_duration(audio_path))
+
+def record_item(result: dict) -> dict:
+    """Count a finished audio_results row by outcome. Returns result."""
+    metrics.inc('items_total', stage='audio', status='ok' if result['audio_extracted'] else 'failed')
+    return result
 
 def process_videos():
     """Main function to download videos and extract audio."""
+    config.ensure_dirs()
     print("=" * 60)
     print("PHASE 2: Audio Extraction")
     print("=" * 60)
@@ -110,14 +269,17 @@ def process_videos():
             print(f"      Install with: brew install {tool}" if tool != 'yt-dlp' else "      Install with: pip install yt-dlp")
             return
     
-    # Load CSV
-    if not os.path.exists(config.OUTPUT_CSV):
-        print(f"\n❌ Error: {config.OUTPUT_CSV} not found. Run phase1_data_parser.py first.")
+    # Load base table
+    if not table_exists('viral_database'):
+        print(f"\n❌ Error: viral_database table not found. Run phase1_data_parser.py first.")
         return
     
-    print(f"\n📂 Loading {config.OUTPUT_CSV}...")
-    df = pd.read_csv(config.OUTPUT_CSV)
-    print(f"   Found {len(df)} videos to process")
+    print(f"\n📂 Loading viral_database table...")
+    df = read_videos_needing_audio(columns=['source_url', 'platform'])
+    print(f"   Found {len(df)} videos that need audio")
+    if df.empty:
+        print(f"\n✅ Nothing to do - every video already has audio")
+        return
     
     # Track processing results
     results = []
@@ -128,50 +290,58 @@ def process_videos():
         video_path = os.path.join(config.TEMP_DIR, f"{video_id}.mp4")
         audio_path = os.path.join(config.AUDIO_DIR, f"{video_id}.mp3")
         
-        result = {
-            'video_id': video_id,
-            'source_url': row['source_url'],
-            'platform': row['platform'],
-            'video_downloaded': False,
-            'audio_extracted': False,
-            'audio_duration': 0,
-            'audio_path': ''
-        }
-        
-        # Skip if audio already exists
-        if os.path.exists(audio_path):
-            result['audio_extracted'] = True
-            result['audio_duration'] = get_audio_duration(audio_path)
-            result['audio_path'] = audio_path
-            results.append(result)
-            continue
-        
-        # Download video
-        if download_video_ytdlp(row['source_url'], video_path, video_id):
-            result['video_downloaded'] = True
+        with tracing.span('audio', video_id=video_id):
+            result = {
+                'video_id': video_id,
+                'source_url': row['source_url'],
+                'platform': row['platform'],
+                'video_downloaded': False,
+                'audio_extracted': False,
+                'audio_duration': 0,
+                'original_duration': 0,
+                'minutes_saved': 0,
+                'audio_path': ''
+            }
+        
+            # Skip if audio already exists (older runs may not have trimmed or
+            # fingerprinted it)
+            if os.path.exists(audio_path):
+                result.update(prepare_audio(video_id, audio_path))
+                results.append(record_item(result))
+                continue
+        
+            # Stream audio straight to MP3; fall back to full download for
+            # formats ffmpeg can't read from a pipe
+            if config.STREAM_AUDIO and stream_audio_ytdlp(row['source_url'], audio_path, video_id):
+                result['video_downloaded'] = True
+                result.update(prepare_audio(video_id, audio_path))
+                results.append(record_item(result))
+                continue
+        
+            # Download video
+            if download_video_ytdlp(row['source_url'], video_path, video_id):
+                result['video_downloaded'] = True
             
-            # Extract audio
-            if extract_audio_ffmpeg(video_path, audio_path):
-                result['audio_extracted'] = True
-                result['audio_duration'] = get_audio_duration(audio_path)
-                result['audio_path'] = audio_path
+                # Extract audio, then trim and fingerprint it
+                if extract_audio_ffmpeg(video_path, audio_path):
+                    result.update(prepare_audio(video_id, audio_path))
                 
-                # Clean up video file to save space
-                try:
-                    os.remove(video_path)
-                except:
-                    pass
+                    # Clean up video file to save space
+                    try:
+                        os.remove(video_path)
+                    except:
+                        pass
         
-        results.append(result)
+            results.append(record_item(result))
     
     # Save processing results
     results_df = pd.DataFrame(results)
-    results_path = 'audio_extraction_results.json'
-    results_df.to_json(results_path, orient='records', indent=2)
+    results_path, _, _ = upsert_table(results_df, 'audio_results', key='video_id')
     
     # Print statistics
     successful = results_df['audio_extracted'].sum()
     total_duration = results_df['audio_duration'].sum()
+    minutes_saved = results_df['minutes_saved'].sum()
     
     print("\n" + "=" * 60)
     print("✅ PHASE 2 COMPLETE - Audio Extraction")
@@ -180,7 +350,8 @@ def process_videos():
     print(f"   Total videos: {len(results_df)}")
     print(f"   Successfully extracted: {successful}")
     print(f"   Failed: {len(results_df) - successful}")
-    print(f"   Total audio duration: {total_duration // 60} minutes")
+    print(f"   Total audio duration: {total_duration // 60:.0f} minutes (after trimming)")
+    print(f"   Trimmed: {minutes_saved:.0f} minutes (${minutes_saved * 0.006:.2f} saved)")
     print(f"   Estimated Whisper cost: ${(total_duration / 60) * 0.006:.2f}")
     print(f"\n📝 Results saved to: {results_path}")
     print(f"💾 Audio files in: {config.AUDIO_DIR}/")
@@ -1,7 +1,8 @@
 """
 Phase 2: Audio Extraction - PARALLEL VERSION
-Uses ThreadPoolExecutor for concurrent downloads and processing
-Optimized for M2 Pro with 8-12 cores
+Runs network-bound downloads and CPU-bound transcodes in separate pools.
+Each pool starts from a size derived from os.cpu_count() and adapts at
+runtime to measured throughput and error rates.
 """
 
 import sys
@@ -9,99 +10,141 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 import os
+import time
 import subprocess
-import hashlib
 import pandas as pd
 from tqdm import tqdm
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Optional, Tuple
 import config
+from scripts import media_cache, metrics, tracing
+from scripts.store import upsert_table, table_exists, get_video_id
+from scripts.phase1b_caption_triage import read_videos_needing_audio
+from scripts.phase2_audio_extractor import (
+    stream_audio_ytdlp, prepare_audio, is_prepared, audio_fields, record_download, record_item
+)
+from scripts.concurrency import AdaptiveLimiter
 
-# Number of parallel workers (adjust based on your M2 Pro)
-MAX_WORKERS = 10  # M2 Pro can handle 8-12
-
-def get_video_id(url: str) -> str:
-    """Generate unique ID from URL."""
-    return hashlib.md5(url.encode()).hexdigest()[:12]
+# Adaptive concurrency for each stage (see config for the bounds)
+download_limiter = AdaptiveLimiter(
+    'download', config.DOWNLOAD_WORKERS, maximum=config.DOWNLOAD_WORKERS_MAX
+)
+transcode_limiter = AdaptiveLimiter(
+    'transcode', config.TRANSCODE_WORKERS, maximum=config.TRANSCODE_WORKERS_MAX
+)
 
 def get_audio_duration(audio_path: str) -> float:
-    """Get audio duration using ffprobe."""
-    try:
-        result = subprocess.run(
-            ['ffprobe', '-v', 'error', '-show_entries', 'format=duration',
-             '-of', 'default=noprint_wrappers=1:nokey=1', audio_path],
-            capture_output=True, text=True, timeout=10
-        )
-        return float(result.stdout.strip())
-    except:
-        return 0
+    """Get audio duration (from the media cache, probing on a miss)."""
+    return media_cache.get_duration(audio_path)
 
 def download_video_ytdlp(url: str, output_path: str, video_id: str) -> bool:
     """Download video using yt-dlp."""
+    start = time.perf_counter()
+    ok = False
     try:
         subprocess.run(
             ['yt-dlp', '-f', 'best', '-o', output_path, url, '--quiet', '--no-warnings'],
             capture_output=True, timeout=120, check=True
         )
-        return os.path.exists(output_path)
+        ok = os.path.exists(output_path)
+        return ok
     except:
         return False
+    finally:
+        record_download('video', start, ok, output_path)
 
 def extract_audio_ffmpeg(video_path: str, audio_path: str) -> bool:
     """Extract audio from video using ffmpeg."""
     try:
-        subprocess.run(
-            ['ffmpeg', '-i', video_path, '-vn', '-acodec', 'libmp3lame',
-             '-ar', '16000', '-ac', '1', '-b:a', '64k', audio_path,
-             '-loglevel', 'error', '-y'],
-            capture_output=True, timeout=60, check=True
-        )
+        with tracing.span('ffmpeg', operation='extract'), metrics.timer('ffmpeg_seconds', operation='extract'):
+            subprocess.run(
+                ['ffmpeg', '-i', video_path, '-vn', '-acodec', 'libmp3lame',
+                 '-ar', '16000', '-ac', '1', '-b:a', '64k', audio_path,
+                 '-loglevel', 'error', '-y'],
+                capture_output=True, timeout=60, check=True
+            )
         return os.path.exists(audio_path)
     except:
         return False
 
-def process_single_video(row):
-    """Process a single video (download + extract audio)."""
+def download_stage(row) -> Tuple[dict, Optional[str]]:
+    """
+    Network stage: fetch audio for one video.
+    
+    Returns the result dict and, if the transcode stage still has work to do,
+    the file it should start from: a downloaded video to extract, or audio
+    that hasn't been trimmed and fingerprinted yet (None if the result is final).
+    """
     video_id = get_video_id(row['source_url'])
     video_path = os.path.join(config.TEMP_DIR, f"{video_id}.mp4")
     audio_path = os.path.join(config.AUDIO_DIR, f"{video_id}.mp3")
     
-    result = {
-        'video_id': video_id,
-        'source_url': row['source_url'],
-        'platform': row['platform'],
-        'video_downloaded': False,
-        'audio_extracted': False,
-        'audio_duration': 0,
-        'audio_path': ''
-    }
-    
-    # Skip if audio already exists
-    if os.path.exists(audio_path):
-        result['audio_extracted'] = True
-        result['audio_duration'] = get_audio_duration(audio_path)
-        result['audio_path'] = audio_path
-        return result
+    with tracing.span('audio.fetch', video_id=video_id):
+        result = {
+            'video_id': video_id,
+            'source_url': row['source_url'],
+            'platform': row['platform'],
+            'video_downloaded': False,
+            'audio_extracted': False,
+            'audio_duration': 0,
+            'original_duration': 0,
+            'minutes_saved': 0,
+            'audio_path': ''
+        }
+    
+        # Skip if audio already exists (older runs may not have prepared it)
+        if os.path.exists(audio_path):
+            if not is_prepared(video_id, audio_path):
+                return result, audio_path
+            result.update(audio_fields(audio_path))
+            return result, None
     
-    # Download video
-    if download_video_ytdlp(row['source_url'], video_path, video_id):
-        result['video_downloaded'] = True
+        with download_limiter.slot() as outcome:
+            # Stream audio straight to MP3, falling back to a full download
+            if config.STREAM_AUDIO and stream_audio_ytdlp(row['source_url'], audio_path, video_id, bitrate='64k'):
+                result['video_downloaded'] = True
+                return result, audio_path
         
-        # Extract audio
-        if extract_audio_ffmpeg(video_path, audio_path):
-            result['audio_extracted'] = True
-            result['audio_duration'] = get_audio_duration(audio_path)
-            result['audio_path'] = audio_path
-            
-            # Clean up video file
+            # Download video
+            if download_video_ytdlp(row['source_url'], video_path, video_id):
+                result['video_downloaded'] = True
+                return result, video_path
+        
+            outcome['success'] = False
+    
+        return result, None
+
+def transcode_stage(result: dict, source_path: str) -> dict:
+    """CPU stage: extract audio from a downloaded video if needed, then trim and fingerprint it."""
+    with tracing.span('audio.transcode', video_id=result['video_id']):
+        audio_path = os.path.join(config.AUDIO_DIR, f"{result['video_id']}.mp3")
+        from_video = source_path != audio_path
+    
+        with transcode_limiter.slot() as outcome:
+            if not from_video or extract_audio_ffmpeg(source_path, audio_path):
+                result.update(prepare_audio(result['video_id'], audio_path, bitrate='64k'))
+            else:
+                outcome['success'] = False
+    
+        # Clean up video file
+        if from_video:
             try:
-                os.remove(video_path)
+                os.remove(source_path)
             except:
                 pass
     
+        return result
+
+def process_single_video(row):
+    """Process a single video (download + extract audio)."""
+    result, source_path = download_stage(row)
+    if source_path:
+        result = transcode_stage(result, source_path)
     return result
 
 def process_videos_parallel():
     """Main function with parallel processing."""
+    config.ensure_dirs()
     print("=" * 60)
     print("PHASE 2: Audio Extraction (PARALLEL)")
     print("=" * 60)
@@ -117,41 +160,56 @@ def process_videos_parallel():
             print(f"   ❌ {tool} not found")
             return
     
-    # Load CSV
-    if not os.path.exists(config.OUTPUT_CSV):
-        print(f"\n❌ Error: {config.OUTPUT_CSV} not found")
+    # Load base table
+    if not table_exists('viral_database'):
+        print(f"\n❌ Error: viral_database table not found")
         return
     
-    print(f"\n📂 Loading {config.OUTPUT_CSV}...")
-    df = pd.read_csv(config.OUTPUT_CSV)
-    print(f"   Found {len(df)} videos to process")
-    print(f"   Using {MAX_WORKERS} parallel workers")
+    print(f"\n📂 Loading viral_database table...")
+    df = read_videos_needing_audio(columns=['source_url', 'platform'])
+    print(f"   Found {len(df)} videos that need audio")
+    if df.empty:
+        print(f"\n✅ Nothing to do - every video already has audio")
+        return
+    print(f"   Download workers: {download_limiter.limit} (adaptive, max {download_limiter.maximum})")
+    print(f"   Transcode workers: {transcode_limiter.limit} (adaptive, max {transcode_limiter.maximum})")
     
     # Process in parallel
     results = []
     
     print(f"\n🎬 Processing videos in parallel...")
-    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-        # Submit all tasks
-        futures = {executor.submit(process_single_video, row): idx 
-                  for idx, row in df.iterrows()}
+    with ThreadPoolExecutor(max_workers=download_limiter.maximum) as download_pool, \
+         ThreadPoolExecutor(max_workers=transcode_limiter.maximum) as transcode_pool:
+        # Submit all downloads; the limiters decide how many actually run
+        pending = {download_pool.submit(download_stage, row) for row in df.to_dict('records')}
         
-        # Collect results with progress bar
-        for future in tqdm(as_completed(futures), total=len(futures), desc="Processing"):
-            try:
-                result = future.result()
-                results.append(result)
-            except Exception as e:
-                print(f"\n⚠️  Error: {e}")
+        # Hand downloads to the transcode pool as they arrive
+        with tqdm(total=len(df), desc="Processing") as progress:
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    try:
+                        outcome = future.result()
+                    except Exception as e:
+                        print(f"\n⚠️  Error: {e}")
+                        progress.update(1)
+                        continue
+                    
+                    if isinstance(outcome, tuple) and outcome[1]:
+                        pending.add(transcode_pool.submit(transcode_stage, *outcome))
+                        continue
+                    
+                    results.append(record_item(outcome[0] if isinstance(outcome, tuple) else outcome))
+                    progress.update(1)
     
     # Save results
     results_df = pd.DataFrame(results)
-    results_path = 'audio_extraction_results.json'
-    results_df.to_json(results_path, orient='records', indent=2)
+    results_path, _, _ = upsert_table(results_df, 'audio_results', key='video_id')
     
     # Statistics
     successful = results_df['audio_extracted'].sum()
     total_duration = results_df['audio_duration'].sum()
+    minutes_saved = results_df['minutes_saved'].sum()
     
     print("\n" + "=" * 60)
     print("✅ PHASE 2 COMPLETE - Audio Extraction (PARALLEL)")
@@ -160,8 +218,11 @@ def process_videos_parallel():
     print(f"   Total videos: {len(results_df)}")
     print(f"   Successfully extracted: {successful}")
     print(f"   Failed: {len(results_df) - successful}")
-    print(f"   Total audio duration: {total_duration // 60} minutes")
+    print(f"   Total audio duration: {total_duration // 60:.0f} minutes (after trimming)")
+    print(f"   Trimmed: {minutes_saved:.0f} minutes (${minutes_saved * 0.006:.2f} saved)")
     print(f"   Estimated Whisper cost: ${(total_duration / 60) * 0.006:.2f}")
+    print(f"   Final download workers: {download_limiter.limit}")
+    print(f"   Final transcode workers: {transcode_limiter.limit}")
     print(f"\n📝 Results saved to: {results_path}")
     print("=" * 60)
 
@@ -15,10 +15,12 @@ from pathlib import Path
 from typing import Dict, Optional
 import pandas as pd
 from tqdm import tqdm
-from openai import OpenAI
 import config
-
-client = OpenAI(api_key=config.OPENAI_API_KEY)
+from scripts import metrics, tracing
+from scripts.store import read_table, upsert_table, table_exists, pending_filters
+from scripts.transcript_ledger import get_ledger, load_cached_transcript
+from scripts.audio_fingerprint import find_duplicate_transcript
+from scripts.openai_client import get_client
 
 def transcribe_audio_file(audio_path: str, language: Optional[str] = None) -> Dict:
     """
@@ -31,10 +33,11 @@ def transcribe_audio_file(audio_path: str, language: Optional[str] = None) -> Di
     Returns:
         Dictionary with transcript and metadata
     """
+    start = time.perf_counter()
     try:
         with open(audio_path, 'rb') as audio_file:
             # Whisper API call
-            transcript = client.audio.transcriptions.create(
+            transcript = get_client().audio.transcriptions.create(
                 model=config.WHISPER_MODEL,
                 file=audio_file,
                 language=language,  # None = auto-detect, 'en' = English, etc.
@@ -58,9 +61,16 @@ def transcribe_audio_file(audio_path: str, language: Optional[str] = None) -> Di
             'error': None
         }
         
+        seconds = time.perf_counter() - start
+        metrics.record_request('whisper', seconds)
+        metrics.inc('cost_dollars_total', (result['duration'] or 0) / 60 * 0.006, service='whisper')
+        tracing.record_span('whisper', seconds, audio_seconds=result['duration'])
         return result
         
     except Exception as e:
+        seconds = time.perf_counter() - start
+        metrics.record_request('whisper', seconds, e)
+        tracing.record_span('whisper', seconds, status='error', status_code=metrics.status_code(e), error=str(e))
         return {
             'text': '',
             'language': 'unknown',
@@ -99,6 +109,7 @@ def create_batch_request(audio_files: list) -> str:
 
 def process_transcriptions():
     """Main function to transcribe all audio files."""
+    config.ensure_dirs()
     print("=" * 60)
     print("PHASE 3: Audio Transcription with OpenAI Whisper")
     print("=" * 60)
@@ -110,17 +121,20 @@ def process_transcriptions():
         return
     
     # Load audio extraction results
-    results_path = 'audio_extraction_results.json'
-    if not os.path.exists(results_path):
-        print(f"\n❌ Error: {results_path} not found. Run phase2_audio_extractor.py first.")
+    if not table_exists('audio_results'):
+        print(f"\n❌ Error: audio_results table not found. Run phase2_audio_extractor.py first.")
         return
     
-    with open(results_path, 'r') as f:
-        audio_results = json.load(f)
-    
-    # Filter successful audio extractions
-    audio_files = [r for r in audio_results if r['audio_extracted']]
+    # Load only successful audio extractions
+    audio_files = read_table(
+        'audio_results',
+        columns=['video_id', 'source_url', 'platform', 'audio_duration', 'audio_path'],
+        filters=[('audio_extracted', '==', True)] + pending_filters()
+    ).to_dict('records')
     print(f"\n📂 Found {len(audio_files)} audio files to transcribe")
+    if not audio_files:
+        print(f"\n✅ Nothing to do - every extracted audio file is transcribed")
+        return
     
     # Check for Luganda content (Lemax videos)
     print("\n⚠️  Note: Luganda language detection:")
@@ -137,26 +151,32 @@ def process_transcriptions():
         video_id = item['video_id']
         audio_path = item['audio_path']
         
-        # Check if transcript already exists
-        transcript_path = os.path.join(config.TRANSCRIPTS_DIR, f"{video_id}.json")
-        if os.path.exists(transcript_path):
-            with open(transcript_path, 'r') as f:
-                result = json.load(f)
-        else:
-            # Transcribe with auto language detection
-            result = transcribe_audio_file(audio_path, language=None)
+        with tracing.span('transcribe', video_id=video_id) as span:
+            # Check if transcript already exists
+            transcript_path = os.path.join(config.TRANSCRIPTS_DIR, f"{video_id}.json")
+            result = load_cached_transcript(video_id, transcript_path)
+            is_new = result is None
+            if is_new:
+                # Reuse the transcript of a repost with the same audio, otherwise
+                # transcribe with auto language detection
+                result = find_duplicate_transcript(video_id) or transcribe_audio_file(audio_path, language=None)
             
-            # If Luganda was detected but quality seems poor, could retry with 'en' prompt
-            # This is an optional enhancement for later
+                # If Luganda was detected but quality seems poor, could retry with 'en' prompt
+                # This is an optional enhancement for later
             
-            # Save transcript
-            with open(transcript_path, 'w', encoding='utf-8') as f:
-                json.dump(result, f, ensure_ascii=False, indent=2)
+                # Save transcript
+                with open(transcript_path, 'w', encoding='utf-8') as f:
+                    json.dump(result, f, ensure_ascii=False, indent=2)
         
-        # Calculate cost (Whisper: $0.006 per minute)
-        duration_minutes = item['audio_duration'] / 60
-        cost = duration_minutes * 0.006
-        total_cost += cost
+            # Calculate cost (Whisper: $0.006 per minute; reposts are free)
+            duration_minutes = 0 if result.get('reused_from') else item['audio_duration'] / 60
+            cost = duration_minutes * 0.006
+            total_cost += cost
+            if is_new:
+                get_ledger().record(video_id, result, cost)
+            status = 'reused' if result.get('reused_from') else 'ok' if result['success'] else 'failed'
+            metrics.inc('items_total', stage='transcribe', status=status)
+            span['status'] = status if is_new else 'cached'
         
         transcripts.append({
             'video_id': video_id,
@@ -167,7 +187,8 @@ def process_transcriptions():
             'audio_duration': item['audio_duration'],
             'transcription_cost': cost,
             'success': result['success'],
-            'error': result.get('error')
+            'error': result.get('error'),
+            'reused_from': result.get('reused_from')
         })
         
         # Rate limiting - avoid hitting API limits (optional)
@@ -175,8 +196,7 @@ def process_transcriptions():
     
     # Save all transcripts
     transcripts_df = pd.DataFrame(transcripts)
-    transcripts_csv = config.PROJECT_ROOT / 'output' / 'transcriptions.csv'
-    transcripts_df.to_csv(transcripts_csv, index=False, encoding='utf-8')
+    transcripts_path, _, _ = upsert_table(transcripts_df, 'transcriptions', key='video_id')
     
     # Print statistics
     successful = transcripts_df['success'].sum()
@@ -194,7 +214,7 @@ def process_transcriptions():
     for lang, count in languages.items():
         print(f"   {lang}: {count}")
     print(f"\n📝 Transcripts saved to:")
-    print(f"   CSV: {transcripts_csv}")
+    print(f"   Table: {transcripts_path}")
     print(f"   JSON files: {config.TRANSCRIPTS_DIR}/")
     print("\n🔜 Next: Run phase4_classifier.py to classify products with GPT-4")
     print("=" * 60)
@@ -0,0 +1,261 @@
+"""
+Phase 3 (Async): asyncio Transcription with OpenAI Whisper
+Keeps hundreds of uploads in flight under token-bucket limits for both
+requests per minute and audio minutes per minute. Honours Retry-After and
+backs off with jitter on 429/5xx. Long files are uploaded as concurrent
+overlapping chunks. Point OPENAI_BASE_URL at a local fake
+endpoint to test without the live API.
+"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import os
+import json
+import time
+import random
+import asyncio
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+import pandas as pd
+import openai
+from openai import AsyncOpenAI
+from tqdm import tqdm
+import config
+from scripts.store import read_table, upsert_table, table_exists, pending_filters
+from scripts.concurrency import AsyncRateLimiter
+from scripts.transcript_ledger import get_ledger, load_cached_transcript
+from scripts.audio_chunks import needs_chunking, split_audio, remove_chunks, stitch_transcripts
+from scripts.audio_fingerprint import find_duplicate_transcript, defer_duplicates
+from scripts import tracing
+from scripts.phase3_transcriber_parallel import (
+    transcript_to_result, failed_result, transcript_row, record_transcription, record_failed_request,
+    record_item, row_status
+)
+
+MAX_ATTEMPTS = 6
+BACKOFF_BASE = 1.0  # Seconds
+BACKOFF_MAX = 60.0  # Seconds
+REQUEST_TIMEOUT = 600  # Seconds per upload
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Read Retry-After (seconds or HTTP date) from an API error's response."""
+    response = getattr(error, 'response', None)
+    if response is None:
+        return None
+    headers = response.headers
+
+    retry_ms = headers.get('retry-after-ms')
+    if retry_ms:
+        try:
+            return float(retry_ms) / 1000
+        except ValueError:
+            pass
+
+    retry_after = headers.get('retry-after')
+    if not retry_after:
+        return None
+    try:
+        return max(float(retry_after), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(retry_after).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+def is_retryable(error: Exception) -> bool:
+    """429s, 5xx, timeouts and connection errors are worth retrying."""
+    if isinstance(error, (openai.RateLimitError, openai.APIConnectionError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code == 408 or error.status_code >= 500
+    return False
+
+def backoff_delay(attempt: int) -> float:
+    """Exponential backoff with full jitter."""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+class AsyncTranscriber:
+    """Transcribes audio items concurrently under shared rate limits."""
+
+    def __init__(self, client: AsyncOpenAI, limiter: AsyncRateLimiter,
+                 max_in_flight: int = config.WHISPER_MAX_IN_FLIGHT):
+        self.client = client
+        self.limiter = limiter
+        self.in_flight = asyncio.Semaphore(max_in_flight)
+
+    async def transcribe(self, audio_path: str, audio_minutes: float,
+                         language: Optional[str] = None) -> Dict:
+        """Transcribe one file, retrying transient errors."""
+        last_error = None
+        for attempt in range(MAX_ATTEMPTS):
+            await self.limiter.acquire(audio_minutes)
+            start = time.perf_counter()
+            try:
+                async with self.in_flight:
+                    # Read inside the semaphore so only in-flight uploads are in memory
+                    audio_bytes = await asyncio.to_thread(Path(audio_path).read_bytes)
+                    start = time.perf_counter()
+                    transcript = await self.client.audio.transcriptions.create(
+                        model=config.WHISPER_MODEL,
+                        file=(os.path.basename(audio_path), audio_bytes),
+                        language=language,
+                        response_format='verbose_json',
+                        timestamp_granularities=['segment']
+                    )
+                return record_transcription(start, transcript_to_result(transcript), attempt)
+            except Exception as e:
+                record_failed_request(start, e, attempt)
+                last_error = e
+                if not is_retryable(e) or attempt == MAX_ATTEMPTS - 1:
+                    break
+
+                delay = retry_after_seconds(e)
+                if delay is not None:
+                    # The server told everyone to wait, not just this request
+                    self.limiter.pause(delay)
+                    delay += random.uniform(0, BACKOFF_BASE)
+                else:
+                    delay = backoff_delay(attempt)
+                await asyncio.sleep(delay)
+
+        return failed_result(last_error)
+
+    async def transcribe_file(self, audio_path: str, duration: float,
+                              language: Optional[str] = None) -> Dict:
+        """Transcribe a file, uploading the chunks of long files concurrently."""
+        if not needs_chunking(duration):
+            return await self.transcribe(audio_path, duration / 60, language)
+
+        try:
+            chunks = await asyncio.to_thread(split_audio, audio_path, duration)
+        except Exception as e:
+            return failed_result(e)
+        try:
+            results = await asyncio.gather(*[
+                self.transcribe(chunk['path'], chunk['length'] / 60, language)
+                for chunk in chunks
+            ])
+        finally:
+            await asyncio.to_thread(remove_chunks, chunks)
+        return stitch_transcripts(chunks, results)
+
+    async def process_item(self, item: Dict) -> Dict:
+        """Async counterpart of process_single_transcription."""
+        video_id = item['video_id']
+        transcript_path = os.path.join(config.TRANSCRIPTS_DIR, f"{video_id}.json")
+
+        with tracing.span('transcribe', video_id=video_id) as span:
+            result = await asyncio.to_thread(load_cached_transcript, video_id, transcript_path)
+            if result is not None:
+                span['status'] = 'cached'
+                return transcript_row(item, result)
+
+            # Reuse the transcript of a repost with the same audio, else transcribe
+            result = await asyncio.to_thread(find_duplicate_transcript, video_id)
+            if result is None:
+                result = await self.transcribe_file(item['audio_path'], item['audio_duration'])
+            await asyncio.to_thread(_save_json, transcript_path, result)
+            row = transcript_row(item, result)
+            await asyncio.to_thread(get_ledger().record, video_id, result, row['transcription_cost'])
+            span['status'] = row_status(row)
+            return row
+
+def _save_json(path: str, data: Dict):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+def make_client() -> AsyncOpenAI:
+    """Async client; retries are handled here, not by the SDK."""
+    return AsyncOpenAI(
+        api_key=config.OPENAI_API_KEY,
+        base_url=config.OPENAI_BASE_URL,
+        max_retries=0,
+        timeout=REQUEST_TIMEOUT
+    )
+
+async def transcribe_all(audio_files: list) -> list:
+    """Transcribe every item, returning transcriptions table rows."""
+    limiter = AsyncRateLimiter(config.WHISPER_RPM, config.WHISPER_AUDIO_MINUTES_PER_MINUTE)
+    transcripts = []
+
+    # Reposts wait for their original so they can reuse its transcript
+    waves = await asyncio.to_thread(defer_duplicates, audio_files)
+
+    async with make_client() as client:
+        transcriber = AsyncTranscriber(client, limiter)
+        with tqdm(total=len(audio_files), desc="Transcribing") as progress:
+            for wave in waves:
+                tasks = [asyncio.create_task(transcriber.process_item(item)) for item in wave]
+                for task in asyncio.as_completed(tasks):
+                    try:
+                        transcripts.append(record_item(await task))
+                    except Exception as e:
+                        print(f"\n⚠️  Error: {e}")
+                    progress.update(1)
+
+    return transcripts
+
+def process_transcriptions_async():
+    """Main function with asyncio processing."""
+    config.ensure_dirs()
+    print("=" * 60)
+    print("PHASE 3: Audio Transcription (ASYNC)")
+    print("=" * 60)
+
+    # Check API key
+    if not config.OPENAI_API_KEY or config.OPENAI_API_KEY == 'your_openai_api_key_here':
+        print("\n❌ Error: OpenAI API key not set!")
+        return
+
+    if not table_exists('audio_results'):
+        print(f"\n❌ Error: audio_results table not found")
+        return
+
+    audio_files = read_table(
+        'audio_results',
+        columns=['video_id', 'source_url', 'platform', 'audio_duration', 'audio_path'],
+        filters=[('audio_extracted', '==', True)] + pending_filters()
+    ).to_dict('records')
+    print(f"\n📂 Found {len(audio_files)} audio files to transcribe")
+    if not audio_files:
+        print(f"\n✅ Nothing to do - every extracted audio file is transcribed")
+        return
+    print(f"   Max in flight: {config.WHISPER_MAX_IN_FLIGHT}")
+    print(f"   Rate limits: {config.WHISPER_RPM} req/min, "
+          f"{config.WHISPER_AUDIO_MINUTES_PER_MINUTE:g} audio min/min")
+    if config.OPENAI_BASE_URL:
+        print(f"   Endpoint: {config.OPENAI_BASE_URL}")
+
+    print(f"\n🎙️  Transcribing audio files...")
+    transcripts = asyncio.run(transcribe_all(audio_files))
+
+    # Save results
+    transcripts_df = pd.DataFrame(transcripts)
+    transcripts_path, _, _ = upsert_table(transcripts_df, 'transcriptions', key='video_id')
+
+    # Statistics
+    successful = transcripts_df['success'].sum()
+    total_cost = transcripts_df['transcription_cost'].sum()
+    reused = transcripts_df['reused_from'].notna().sum()
+    languages = transcripts_df['detected_language'].value_counts()
+
+    print("\n" + "=" * 60)
+    print("✅ PHASE 3 COMPLETE - Transcription (ASYNC)")
+    print("=" * 60)
+    print(f"\n📊 Statistics:")
+    print(f"   Total transcriptions: {len(transcripts_df)}")
+    print(f"   Successful: {successful}")
+    print(f"   Failed: {len(transcripts_df) - successful}")
+    print(f"   Reused from reposts: {reused}")
+    print(f"   Total cost: ${total_cost:.2f}")
+    print(f"\n🌍 Detected languages:")
+    for lang, count in languages.head(10).items():
+        print(f"   {lang}: {count}")
+    print(f"\n📝 Transcripts saved to: {transcripts_path}")
+    print("=" * 60)
+
+if __name__ == "__main__":
+    process_transcriptions_async()
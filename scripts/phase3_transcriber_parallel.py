@@ -10,27 +10,67 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 import os
 import json
 import time
+import threading
 import pandas as pd
 from tqdm import tqdm
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from openai import OpenAI
 from typing import Dict, Optional
 import config
-
-client = OpenAI(api_key=config.OPENAI_API_KEY)
+from scripts import media_cache, metrics, tracing
+from scripts.store import read_table, upsert_table, table_exists, pending_filters
+from scripts.transcript_ledger import get_ledger, load_cached_transcript
+from scripts.audio_chunks import needs_chunking, split_audio, remove_chunks, stitch_transcripts
+from scripts.audio_fingerprint import find_duplicate_transcript, defer_duplicates
+from scripts.openai_client import get_client
 
 # Parallel settings
 MAX_WORKERS = 8  # For API calls, be conservative to avoid rate limits
 RATE_LIMIT_DELAY = 0.05  # Small delay between requests
 
+# Chunks of long files are uploaded from their own pool, so a worker waiting
+# on its chunks never starves the pool the chunks would need
+_chunk_pool = None
+_chunk_pool_lock = threading.Lock()
+
+def get_chunk_pool() -> ThreadPoolExecutor:
+    """The chunk upload pool, created the first time a file needs chunking."""
+    global _chunk_pool
+    if _chunk_pool is None:
+        with _chunk_pool_lock:
+            if _chunk_pool is None:
+                _chunk_pool = ThreadPoolExecutor(max_workers=config.CHUNK_WORKERS)
+    return _chunk_pool
+
 def transcribe_audio_file(audio_path: str, language: Optional[str] = None) -> Dict:
-    """Transcribe a single audio file using Whisper API."""
+    """Transcribe an audio file, splitting long files into concurrent chunks."""
+    duration = media_cache.get_duration(audio_path)
+    if needs_chunking(duration):
+        return transcribe_chunked(audio_path, duration, language)
+    return transcribe_request(audio_path, language)
+
+def transcribe_chunked(audio_path: str, duration: float, language: Optional[str] = None) -> Dict:
+    """Transcribe overlapping chunks concurrently and stitch the segments."""
+    try:
+        chunks = split_audio(audio_path, duration)
+    except Exception as e:
+        return failed_result(e)
+    try:
+        results = list(get_chunk_pool().map(
+            tracing.bind(lambda chunk: transcribe_request(chunk['path'], language)), chunks
+        ))
+    finally:
+        remove_chunks(chunks)
+    return stitch_transcripts(chunks, results)
+
+def transcribe_request(audio_path: str, language: Optional[str] = None) -> Dict:
+    """Transcribe a single audio file in one Whisper API request."""
+    # Small delay to respect rate limits
+    time.sleep(RATE_LIMIT_DELAY)
+    
+    start = time.perf_counter()
     try:
-        # Small delay to respect rate limits
-        time.sleep(RATE_LIMIT_DELAY)
-        
         with open(audio_path, 'rb') as audio_file:
-            transcript = client.audio.transcriptions.create(
+            transcript = get_client().audio.transcriptions.create(
                 model=config.WHISPER_MODEL,
                 file=audio_file,
                 language=language,
@@ -38,56 +78,75 @@ def transcribe_audio_file(audio_path: str, language: Optional[str] = None) -> Di
                 timestamp_granularities=['segment']
             )
         
-        # Convert segments
-        segments = getattr(transcript, 'segments', [])
-        if segments and hasattr(segments[0], 'model_dump'):
-            segments = [seg.model_dump() for seg in segments]
-        elif segments and hasattr(segments[0], 'dict'):
-            segments = [seg.dict() for seg in segments]
-        
-        return {
-            'text': transcript.text,
-            'language': getattr(transcript, 'language', 'unknown'),
-            'duration': getattr(transcript, 'duration', 0),
-            'segments': segments,
-            'success': True,
-            'error': None
-        }
+        return record_transcription(start, transcript_to_result(transcript))
         
     except Exception as e:
-        return {
-            'text': '',
-            'language': 'unknown',
-            'duration': 0,
-            'segments': [],
-            'success': False,
-            'error': str(e)
-        }
+        record_failed_request(start, e)
+        return failed_result(e)
 
-def process_single_transcription(item):
-    """Process a single audio file transcription."""
-    video_id = item['video_id']
-    audio_path = item['audio_path']
+def record_transcription(start: float, result: Dict, attempt: int = 0) -> Dict:
+    """Request metrics and trace span for a successful Whisper call, including its cost. Returns result."""
+    seconds = time.perf_counter() - start
+    metrics.record_request('whisper', seconds)
+    metrics.inc('cost_dollars_total', (result.get('duration') or 0) / 60 * 0.006, service='whisper')
+    tracing.record_span('whisper', seconds, attempt=attempt, audio_seconds=result.get('duration'))
+    return result
+
+def record_failed_request(start: float, error: Exception, attempt: int = 0):
+    """Request metrics and trace span for a failed Whisper call."""
+    seconds = time.perf_counter() - start
+    metrics.record_request('whisper', seconds, error)
+    tracing.record_span('whisper', seconds, status='error', attempt=attempt,
+                        status_code=metrics.status_code(error), error=str(error))
+
+def row_status(row: Dict) -> str:
+    """Outcome of a transcriptions row: reused, ok or failed."""
+    return 'reused' if row.get('reused_from') else 'ok' if row['success'] else 'failed'
+
+def record_item(row: Dict) -> Dict:
+    """Count a finished transcriptions row by outcome. Returns row."""
+    metrics.inc('items_total', stage='transcribe', status=row_status(row))
+    return row
+
+def transcript_to_result(transcript) -> Dict:
+    """Convert a verbose_json Whisper response into the transcript JSON shape."""
+    segments = getattr(transcript, 'segments', None) or []
+    if segments and hasattr(segments[0], 'model_dump'):
+        segments = [seg.model_dump() for seg in segments]
+    elif segments and hasattr(segments[0], 'dict'):
+        segments = [seg.dict() for seg in segments]
     
-    # Check if transcript already exists
-    transcript_path = os.path.join(config.TRANSCRIPTS_DIR, f"{video_id}.json")
-    if os.path.exists(transcript_path):
-        with open(transcript_path, 'r') as f:
-            result = json.load(f)
+    return {
+        'text': transcript.text,
+        'language': getattr(transcript, 'language', 'unknown'),
+        'duration': getattr(transcript, 'duration', 0),
+        'segments': segments,
+        'success': True,
+        'error': None
+    }
+
+def failed_result(error) -> Dict:
+    """Transcript JSON for a failed transcription."""
+    return {
+        'text': '',
+        'language': 'unknown',
+        'duration': 0,
+        'segments': [],
+        'success': False,
+        'error': str(error)
+    }
+
+def transcript_row(item: Dict, result: Dict) -> Dict:
+    """Build the transcriptions table row for an audio item and its transcript."""
+    if result.get('reused_from'):
+        duration_minutes = 0  # Copied from a repost of the same audio
     else:
-        # Transcribe
-        result = transcribe_audio_file(audio_path, language=None)
-        
-        # Save transcript
-        with open(transcript_path, 'w', encoding='utf-8') as f:
-            json.dump(result, f, ensure_ascii=False, indent=2)
-    
-    # Calculate cost
-    duration_minutes = item['audio_duration'] / 60
+        # Chunked transcripts are billed for the overlaps too
+        duration_minutes = (result.get('billed_duration') or item['audio_duration']) / 60
     cost = duration_minutes * 0.006
     
     return {
-        'video_id': video_id,
+        'video_id': item['video_id'],
         'source_url': item['source_url'],
         'platform': item['platform'],
         'transcript_text': result['text'],
@@ -95,11 +154,40 @@ def process_single_transcription(item):
         'audio_duration': item['audio_duration'],
         'transcription_cost': cost,
         'success': result['success'],
-        'error': result.get('error')
+        'error': result.get('error'),
+        'reused_from': result.get('reused_from')
     }
 
+def process_single_transcription(item):
+    """Process a single audio file transcription."""
+    video_id = item['video_id']
+    audio_path = item['audio_path']
+    
+    with tracing.span('transcribe', video_id=video_id) as span:
+        # Check if transcript already exists
+        transcript_path = os.path.join(config.TRANSCRIPTS_DIR, f"{video_id}.json")
+        result = load_cached_transcript(video_id, transcript_path)
+        if result is not None:
+            span['status'] = 'cached'
+            return transcript_row(item, result)
+        
+        # Reuse the transcript of a repost with the same audio, else transcribe
+        result = find_duplicate_transcript(video_id)
+        if result is None:
+            result = transcribe_audio_file(audio_path, language=None)
+        
+        # Save transcript and index it
+        with open(transcript_path, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        row = transcript_row(item, result)
+        get_ledger().record(video_id, result, row['transcription_cost'])
+        span['status'] = row_status(row)
+        
+        return row
+
 def process_transcriptions_parallel():
     """Main function with parallel processing."""
+    config.ensure_dirs()
     print("=" * 60)
     print("PHASE 3: Audio Transcription (PARALLEL)")
     print("=" * 60)
@@ -110,44 +198,58 @@ def process_transcriptions_parallel():
         return
     
     # Load audio results
-    results_path = 'audio_extraction_results.json'
-    if not os.path.exists(results_path):
-        print(f"\n❌ Error: {results_path} not found")
+    if not table_exists('audio_results'):
+        print(f"\n❌ Error: audio_results table not found")
         return
     
-    with open(results_path, 'r') as f:
-        audio_results = json.load(f)
-    
-    audio_files = [r for r in audio_results if r['audio_extracted']]
+    audio_files = read_table(
+        'audio_results',
+        columns=['video_id', 'source_url', 'platform', 'audio_duration', 'audio_path'],
+        filters=[('audio_extracted', '==', True)] + pending_filters()
+    ).to_dict('records')
     print(f"\n📂 Found {len(audio_files)} audio files to transcribe")
+    if not audio_files:
+        print(f"\n✅ Nothing to do - every extracted audio file is transcribed")
+        return
     print(f"   Using {MAX_WORKERS} parallel workers")
     print(f"   Rate limit delay: {RATE_LIMIT_DELAY}s per request")
     
+    # Reposts wait for their original so they can reuse its transcript
+    first, later = defer_duplicates(audio_files)
+    if later:
+        print(f"   Reposts of other videos' audio: {len(later)} (transcribed last)")
+    
     # Process in parallel
     transcripts = []
     
     print(f"\n🎙️  Transcribing audio files in parallel...")
-    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-        # Submit all tasks
-        futures = {executor.submit(process_single_transcription, item): idx 
-                  for idx, item in enumerate(audio_files)}
-        
-        # Collect results with progress bar
-        for future in tqdm(as_completed(futures), total=len(futures), desc="Transcribing"):
-            try:
-                result = future.result()
-                transcripts.append(result)
-            except Exception as e:
-                print(f"\n⚠️  Error: {e}")
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor, \
+         tqdm(total=len(audio_files), desc="Transcribing") as progress:
+        for wave in (first, later):
+            # Submit all tasks
+            futures = {executor.submit(process_single_transcription, item): idx 
+                      for idx, item in enumerate(wave)}
+            
+            # Collect results with progress bar
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                    transcripts.append(record_item(result))
+                except Exception as e:
+                    print(f"\n⚠️  Error: {e}")
+                progress.update(1)
     
     # Save results
     transcripts_df = pd.DataFrame(transcripts)
-    transcripts_csv = 'transcriptions.csv'
-    transcripts_df.to_csv(transcripts_csv, index=False, encoding='utf-8')
+    if transcripts_df.empty:
+        print(f"\n⚠️  No transcriptions finished - nothing to save")
+        return
+    transcripts_path, _, _ = upsert_table(transcripts_df, 'transcriptions', key='video_id')
     
     # Statistics
     successful = transcripts_df['success'].sum()
     total_cost = transcripts_df['transcription_cost'].sum()
+    reused = transcripts_df['reused_from'].notna().sum()
     languages = transcripts_df['detected_language'].value_counts()
     
     print("\n" + "=" * 60)
@@ -157,11 +259,12 @@ def process_transcriptions_parallel():
     print(f"   Total transcriptions: {len(transcripts_df)}")
     print(f"   Successful: {successful}")
     print(f"   Failed: {len(transcripts_df) - successful}")
+    print(f"   Reused from reposts: {reused}")
     print(f"   Total cost: ${total_cost:.2f}")
     print(f"\n🌍 Detected languages:")
     for lang, count in languages.head(10).items():
         print(f"   {lang}: {count}")
-    print(f"\n📝 Transcripts saved to: {transcripts_csv}")
+    print(f"\n📝 Transcripts saved to: {transcripts_path}")
     print("=" * 60)
 
 if __name__ == "__main__":
@@ -0,0 +1,114 @@
+"""
+Phase 4 (Watcher): Follow submitted classification batches until they finish
+Polls every tracked batch with exponential backoff, streams each batch's
+results as soon as it completes, then saves the classifications and runs
+phase 5 so the final database is updated without anyone re-running scripts.
+"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import time
+import random
+import pandas as pd
+from typing import Dict, List
+import config
+from scripts.phase4_classifier import (
+    load_batch_status, save_batch_status, submit_batches, poll_batches, collect_entry_results,
+    iter_cached_results, process_batch_results, save_classifications, archive_batch_status,
+    TERMINAL_STATUSES, BATCH_STATUS_FILE
+)
+from scripts.phase5_final_csv import merge_all_data
+
+def next_poll_delay(delay: float, progressed: bool) -> float:
+    """Back to the minimum after progress, otherwise double up to the maximum."""
+    if progressed:
+        return config.BATCH_POLL_MIN
+    return min(delay * 2, config.BATCH_POLL_MAX)
+
+def completed_requests(statuses: List[Dict]) -> int:
+    return sum(getattr(s['request_counts'], 'completed', 0) or 0 for s in statuses)
+
+def report_unsubmitted(entries: List[Dict]) -> int:
+    """Warn about shards that still have no batch; returns how many."""
+    unsubmitted = [e['input_file'] for e in entries if not e.get('batch_id')]
+    if unsubmitted:
+        print(f"   ⚠️  {len(unsubmitted)} batches could not be submitted: {', '.join(map(str, unsubmitted))}")
+    return len(unsubmitted)
+
+def watch_batches(run_phase5: bool = True):
+    """Main function: wait for every batch, collect results, then merge."""
+    print("=" * 60)
+    print("PHASE 4: Batch Watcher")
+    print("=" * 60)
+
+    batch_info = load_batch_status()
+    if batch_info is None:
+        print(f"\n❌ Error: No batches to watch ({BATCH_STATUS_FILE} not found). Run phase4_classifier.py first.")
+        return
+
+    entries = batch_info['batches']
+    unsubmitted = [e for e in entries if not e.get('batch_id')]
+    if unsubmitted:
+        print(f"\n🚀 {len(unsubmitted)} batches were never submitted - submitting them now...")
+        submit_batches(unsubmitted)
+        save_batch_status(batch_info)
+        report_unsubmitted(entries)
+
+    print(f"\n👀 Watching {sum(1 for e in entries if e.get('batch_id'))} batches")
+    print(f"   Poll interval: {config.BATCH_POLL_MIN:g}s - {config.BATCH_POLL_MAX:g}s")
+
+    frames = {}  # batch_id -> parsed results
+    delay = config.BATCH_POLL_MIN
+    last_progress = None
+    try:
+        while True:
+            try:
+                statuses = poll_batches(batch_info)
+            except Exception as e:
+                print(f"   ⚠️  Could not check batches: {e}")
+                statuses = None
+
+            submitted = [e for e in entries if e.get('batch_id')]  # poll_batches retries the others
+            if statuses is not None:
+                # Stream each batch's results as soon as it finishes
+                for entry, status in zip(submitted, statuses):
+                    if status['status'] not in TERMINAL_STATUSES or status['id'] in frames:
+                        continue
+                    print(f"\n✅ {status['id']} {status['status']} - streaming results...")
+                    try:
+                        frames[status['id']] = collect_entry_results(entry)
+                    except Exception as e:
+                        print(f"   ⚠️  Could not retrieve {status['id']}: {e}")
+
+                if len(frames) == len(submitted):
+                    break
+
+            progress = (completed_requests(statuses), len(frames)) if statuses is not None else last_progress
+            delay = next_poll_delay(delay, last_progress is not None and progress != last_progress)
+            last_progress = progress
+            wait = delay * random.uniform(0.9, 1.1)  # Jitter so several watchers don't poll in step
+            print(f"   {time.strftime('%H:%M:%S')} {len(frames)}/{len(submitted)} batches finished, "
+                  f"{completed_requests(statuses or [])} requests done - next check in {wait:.0f}s")
+            time.sleep(wait)
+    except KeyboardInterrupt:
+        print(f"\n⏹️  Stopped. Answers collected so far are cached; run again to resume.")
+        return
+
+    classifications_df = pd.concat(
+        list(frames.values()) + [process_batch_results(iter_cached_results(batch_info.get('cached_file')))],
+        ignore_index=True
+    )
+    save_classifications(classifications_df)
+    if report_unsubmitted(entries):
+        print(f"   Keeping {BATCH_STATUS_FILE} so the next run submits them")
+    else:
+        archive_batch_status(batch_info)
+
+    if run_phase5:
+        print()
+        merge_all_data()
+
+if __name__ == "__main__":
+    watch_batches()
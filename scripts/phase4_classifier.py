@@ -1,6 +1,10 @@
 """
 Phase 4: Product Classification - Use GPT-4 to classify products and demographics
-Uses Batch API for 50% cost savings.
+Uses Batch API for 50% cost savings, or concurrent chat completions for small
+runs that are wanted within minutes. Large batch runs are split into several
+batches that are submitted and tracked in parallel; results are streamed
+line by line. Answers are cached by prompt, so only new or changed requests
+are billed.
 """
 
 import sys
@@ -10,12 +14,22 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 import os
 import json
 import time
+import itertools
 import pandas as pd
-from openai import OpenAI
-from typing import Dict, List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 import config
+from scripts import metrics, tracing
+from scripts.token_budget import compact_transcript, count_message_tokens, estimate_cost, is_exact
+from scripts.classification_cache import get_cache, request_key, cached_result, remember_results
+from scripts.store import read_table, upsert_table, table_exists, table_columns, video_ids
+from scripts.openai_client import get_client
 
-client = OpenAI(api_key=config.OPENAI_API_KEY)
+BATCH_STATUS_FILE = config.PROJECT_ROOT / 'output' / 'batch_classification_status.json'
+CACHED_RESULTS_FILE = config.PROJECT_ROOT / 'output' / 'batch_classification_cached.jsonl'  # Answers reused from the cache
+BATCH_SUBMIT_WORKERS = 8  # Concurrent uploads / status checks / downloads
+TERMINAL_STATUSES = ('completed', 'failed', 'expired', 'cancelled')
+BATCH_STATUSES = ('validating', 'in_progress', 'finalizing', 'cancelling') + TERMINAL_STATUSES
 
 CLASSIFICATION_PROMPT = """You are an expert at analyzing social media product content. 
 Analyze the following social media post and identify the product being promoted.
@@ -50,8 +64,8 @@ def create_classification_request(video_id: str, row: pd.Series, custom_id: str)
     """Create a single classification request for batch processing."""
     prompt = CLASSIFICATION_PROMPT.format(
         platform=row['platform'],
-        caption=row.get('caption', 'N/A'),
-        transcript=row.get('transcript_text', 'N/A')
+        caption=row.get('caption') or 'N/A',
+        transcript=compact_transcript(row.get('transcript_text')) or 'N/A'
     )
     
     return {
@@ -69,25 +83,96 @@ def create_classification_request(video_id: str, row: pd.Series, custom_id: str)
         }
     }
 
-def create_batch_file(transcripts_df: pd.DataFrame) -> str:
-    """Create a .jsonl batch file for classification."""
-    batch_requests = []
+def create_batch_files(transcripts_df: pd.DataFrame) -> Tuple[List[Dict], int]:
+    """
+    Write classification requests as .jsonl batch files, starting a new file
+    whenever the next request would exceed the per-batch request count or
+    file size limit (config.BATCH_MAX_REQUESTS / BATCH_MAX_BYTES).
+
+    Requests answered before (same model and prompt) are not sent again:
+    their cached answers go to CACHED_RESULTS_FILE instead.
+
+    Returns one {'path', 'num_requests', 'input_tokens'} entry per file, and
+    the number of cached answers.
+    """
+    output_dir = config.PROJECT_ROOT / 'output'
+    for old_file in output_dir.glob('batch_classification_requests*.jsonl'):
+        old_file.unlink()  # Don't leave shards of an earlier, larger run behind
     
-    for idx, row in transcripts_df.iterrows():
-        if not row.get('transcript_text') or row.get('transcript_text') == '':
-            continue
+    cache = get_cache()
+    shards = []
+    cached = 0
+    f = None
+    size = 0
+    cached_file = open(CACHED_RESULTS_FILE, 'w')
+    try:
+        for row in transcripts_df.to_dict('records'):
+            if not row.get('transcript_text') and not row.get('caption'):
+                continue
+            
+            custom_id = f"classify-{row['video_id']}"
+            request = create_classification_request(row['video_id'], row, custom_id)
+            content = cache.get(request_key(request['body']))
+            if content is not None:
+                cached_file.write(json.dumps(cached_result(custom_id, content)) + '\n')
+                cached += 1
+                continue
             
-        custom_id = f"classify-{row['video_id']}"
-        request = create_classification_request(row['video_id'], row, custom_id)
-        batch_requests.append(request)
+            line = (json.dumps(request) + '\n').encode('utf-8')
+            
+            if f is None or shards[-1]['num_requests'] >= config.BATCH_MAX_REQUESTS \
+                    or size + len(line) > config.BATCH_MAX_BYTES:
+                if f is not None:
+                    f.close()
+                path = output_dir / f'batch_classification_requests_{len(shards) + 1:03d}.jsonl'
+                shards.append({'path': path, 'num_requests': 0, 'input_tokens': 0})
+                f = open(path, 'wb')
+                size = 0
+            
+            f.write(line)
+            size += len(line)
+            shards[-1]['num_requests'] += 1
+            shards[-1]['input_tokens'] += count_message_tokens(request['body']['messages'])
+    finally:
+        cached_file.close()
+        if f is not None:
+            f.close()
     
-    # Save to .jsonl file
-    batch_file_path = config.PROJECT_ROOT / 'output' / 'batch_classification_requests.jsonl'
-    with open(batch_file_path, 'w', encoding='utf-8') as f:
-        for req in batch_requests:
-            f.write(json.dumps(req) + '\n')
+    return shards, cached
+
+def load_classification_inputs() -> pd.DataFrame:
+    """
+    Rows to classify: videos with a successful transcript, plus videos that
+    caption triage sent straight to classification. Captions come from
+    viral_database so the prompt sees both. Only pending rows, if the
+    table has a pending flag.
+    """
+    existing = table_columns('viral_database')
+    triaged = 'needs_audio' in existing
+    incremental = 'pending' in existing
+    videos = read_table(
+        'viral_database',
+        columns=['source_url', 'platform', 'caption'] + (['needs_audio'] if triaged else []),
+        filters=[('pending', '==', True)] if incremental else None
+    )
+    videos['video_id'] = video_ids(videos['source_url'])
+    videos = videos.drop_duplicates('video_id')
+    
+    if table_exists('transcriptions'):
+        filters = [('success', '==', True)]
+        if incremental:
+            filters.append(('video_id', 'in', videos['video_id'].dropna().tolist()))
+        transcripts = read_table('transcriptions', columns=['video_id', 'transcript_text'], filters=filters)
+        df = videos.merge(transcripts, on='video_id', how='left')
+    else:
+        df = videos.assign(transcript_text=pd.NA)
     
-    return batch_file_path
+    df['caption'] = df['caption'].fillna('')
+    df['transcript_text'] = df['transcript_text'].fillna('')
+    keep = df['transcript_text'] != ''
+    if triaged:
+        keep |= df['needs_audio'] == False
+    return df[keep].reset_index(drop=True)
 
 def submit_batch_job(batch_file_path: str) -> str:
     """Upload batch file and create batch job."""
@@ -95,7 +180,7 @@ def submit_batch_job(batch_file_path: str) -> str:
     
     # Upload file
     with open(batch_file_path, 'rb') as f:
-        batch_input_file = client.files.create(
+        batch_input_file = get_client().files.create(
             file=f,
             purpose="batch"
         )
@@ -104,7 +189,7 @@ def submit_batch_job(batch_file_path: str) -> str:
     
     # Create batch job
     print(f"\n🚀 Creating batch job...")
-    batch = client.batches.create(
+    batch = get_client().batches.create(
         input_file_id=batch_input_file.id,
         endpoint="/v1/chat/completions",
         completion_window="24h"
@@ -117,7 +202,7 @@ def submit_batch_job(batch_file_path: str) -> str:
 
 def check_batch_status(batch_id: str) -> Dict:
     """Check the status of a batch job."""
-    batch = client.batches.retrieve(batch_id)
+    batch = get_client().batches.retrieve(batch_id)
     return {
         'id': batch.id,
         'status': batch.status,
@@ -129,41 +214,46 @@ def check_batch_status(batch_id: str) -> Dict:
         'error_file_id': getattr(batch, 'error_file_id', None)
     }
 
-def retrieve_batch_results(batch_id: str) -> List[Dict]:
-    """Retrieve results from a completed batch."""
-    batch = client.batches.retrieve(batch_id)
+def iter_file_lines(file_id: str) -> Iterator[Dict]:
+    """Stream a JSONL file from the Files API one parsed line at a time."""
+    with get_client().files.with_streaming_response.content(file_id) as response:
+        for line in response.iter_lines():
+            if line.strip():
+                yield json.loads(line)
+
+def retrieve_batch_results(batch_id: str) -> Iterator[Dict]:
+    """
+    Stream results from a finished batch: successful responses, then the
+    requests that failed (from the error file).
+    """
+    batch = get_client().batches.retrieve(batch_id)
     
-    if batch.status != "completed":
+    if batch.status not in TERMINAL_STATUSES:
         print(f"⚠️  Batch not completed yet. Status: {batch.status}")
-        return []
-    
-    # Download results
-    result_file_id = batch.output_file_id
-    result = client.files.content(result_file_id)
-    result_text = result.text
-    
-    # Parse JSONL results
-    results = []
-    for line in result_text.strip().split('\n'):
-        if line:
-            results.append(json.loads(line))
+        return
     
-    return results
+    for file_id in (batch.output_file_id, getattr(batch, 'error_file_id', None)):
+        if file_id:
+            yield from iter_file_lines(file_id)
 
-def process_batch_results(results: List[Dict]) -> pd.DataFrame:
-    """Process batch results into a DataFrame."""
+def process_batch_results(results: Iterable[Dict]) -> pd.DataFrame:
+    """Process batch result lines (any iterable, e.g. a stream) into a DataFrame."""
     processed = []
     
     for result in results:
         custom_id = result['custom_id']
         video_id = custom_id.replace('classify-', '')
         
-        if result.get('error'):
-            print(f"   ⚠️  Error for {video_id}: {result['error']}")
+        response = result.get('response') or {}
+        error = result.get('error')
+        if not error and response.get('status_code', 200) != 200:
+            error = (response.get('body') or {}).get('error') or f"HTTP {response['status_code']}"
+        if error:
+            print(f"   ⚠️  Error for {video_id}: {error}")
             processed.append({
                 'video_id': video_id,
                 'classification_success': False,
-                'error': str(result['error'])
+                'error': str(error)
             })
             continue
         
@@ -187,10 +277,179 @@ def process_batch_results(results: List[Dict]) -> pd.DataFrame:
     
     return pd.DataFrame(processed)
 
-def classify_with_batch():
-    """Main function to classify products using Batch API."""
+def load_batch_status() -> Optional[Dict]:
+    """Read the batch status file (None if there is none), upgrading the single-batch format."""
+    if not os.path.exists(BATCH_STATUS_FILE):
+        return None
+    with open(BATCH_STATUS_FILE, 'r') as f:
+        batch_info = json.load(f)
+    
+    if 'batches' not in batch_info:
+        batch_info = {
+            'created_at': batch_info.get('created_at'),
+            'num_requests': batch_info.get('num_requests'),
+            'batches': [{
+                'batch_id': batch_info['batch_id'],
+                'input_file': None,
+                'num_requests': batch_info.get('num_requests'),
+                'status': batch_info.get('status', 'submitted')
+            }]
+        }
+    return batch_info
+
+def save_batch_status(batch_info: Dict):
+    with open(BATCH_STATUS_FILE, 'w') as f:
+        json.dump(batch_info, f, indent=2)
+
+def archive_batch_status(batch_info: Dict):
+    """Retire a collected batch job so the next run submits new work instead of re-reading it."""
+    archive = BATCH_STATUS_FILE.with_name(
+        f"{BATCH_STATUS_FILE.stem}.{time.strftime('%Y%m%d_%H%M%S')}{BATCH_STATUS_FILE.suffix}"
+    )
+    os.replace(BATCH_STATUS_FILE, archive)
+    cached_file = batch_info.get('cached_file')
+    if cached_file and os.path.exists(cached_file):
+        os.remove(cached_file)
+    print(f"   📦 Batch status archived to: {archive}")
+
+def submit_batches(entries: List[Dict]):
+    """Submit batch files in parallel, filling in each entry's batch_id."""
+    def submit(entry):
+        try:
+            entry['batch_id'] = submit_batch_job(entry['input_file'])
+            entry['status'] = 'submitted'
+            entry['submitted_at'] = time.time()
+        except Exception as e:
+            print(f"   ⚠️  Could not submit {entry['input_file']}: {e}")
+            entry['status'] = 'submit_failed'  # Retried on the next run
+    
+    with ThreadPoolExecutor(max_workers=BATCH_SUBMIT_WORKERS) as pool:
+        list(pool.map(submit, entries))
+
+def poll_batches(batch_info: Dict) -> List[Dict]:
+    """Resubmit shards whose upload failed, then refresh and save every batch's status."""
+    entries = batch_info['batches']
+    unsubmitted = [e for e in entries if not e.get('batch_id')]
+    if unsubmitted:
+        print(f"\n🚀 Resubmitting {len(unsubmitted)} batches...")
+        submit_batches(unsubmitted)
+    
+    statuses = refresh_batch_statuses(entries)
+    save_batch_status(batch_info)
+    return statuses
+
+def refresh_batch_statuses(entries: List[Dict]) -> List[Dict]:
+    """Check every submitted batch in parallel, updating the entries' status."""
+    submitted = [e for e in entries if e.get('batch_id')]
+    with ThreadPoolExecutor(max_workers=BATCH_SUBMIT_WORKERS) as pool:
+        statuses = list(pool.map(lambda e: check_batch_status(e['batch_id']), submitted))
+    for entry, status in zip(submitted, statuses):
+        entry['status'] = status['status']
+        entry['completed_at'] = status['completed_at'] or status['failed_at']
+    record_batch_progress(statuses)
+    return statuses
+
+def record_batch_progress(statuses: List[Dict]):
+    """Gauges for batches by status and the requests they still have to answer."""
+    waiting = 0
+    for status in statuses:
+        if status['status'] not in TERMINAL_STATUSES:
+            counts = status['request_counts']
+            waiting += (getattr(counts, 'total', 0) or 0) - (getattr(counts, 'completed', 0) or 0) \
+                - (getattr(counts, 'failed', 0) or 0)
+    metrics.set_gauge('batch_queue_depth', waiting)
+    for name in BATCH_STATUSES:
+        metrics.set_gauge('batches', sum(s['status'] == name for s in statuses), status=name)
+
+def record_batch_results(results: Iterable[Dict], entry: Optional[Dict] = None) -> Iterator[Dict]:
+    """
+    Pass batch result lines through, counting them and their cost (at the
+    batch discount). With the batch's entry, also trace each request from
+    submission until the batch finished.
+    """
+    seconds = None
+    if entry and entry.get('submitted_at'):
+        seconds = max((entry.get('completed_at') or time.time()) - entry['submitted_at'], 0)
+    for result in results:
+        response = result.get('response') or {}
+        code = str(response.get('status_code', 'error')) if not result.get('error') else 'error'
+        metrics.inc('gpt_requests_total', mode='batch', status_code=code)
+        if seconds is not None:
+            tracing.record_span('classify', seconds, status='ok' if code == '200' else 'failed',
+                                video_id=result['custom_id'].replace('classify-', ''),
+                                start=entry['submitted_at'], mode='batch', batch_id=entry['batch_id'],
+                                status_code=code)
+        usage = (response.get('body') or {}).get('usage')
+        if usage:
+            metrics.inc('cost_dollars_total', estimate_cost(
+                usage.get('prompt_tokens', 0), usage.get('completion_tokens', 0), batch=True
+            ), service='gpt')
+        yield result
+
+def request_keys(batch_file_path: Optional[str]) -> Dict[str, str]:
+    """custom_id -> cache key for the requests in a batch input file."""
+    if not batch_file_path or not os.path.exists(batch_file_path):
+        return {}  # Batches submitted before the cache existed
+    keys = {}
+    with open(batch_file_path, 'r') as f:
+        for line in f:
+            request = json.loads(line)
+            keys[request['custom_id']] = request_key(request['body'])
+    return keys
+
+def iter_cached_results(cached_file: Optional[str]) -> Iterator[Dict]:
+    """Result lines for the requests that were answered from the cache."""
+    if not cached_file or not os.path.exists(cached_file):
+        return
+    with open(cached_file, 'r') as f:
+        for line in f:
+            yield json.loads(line)
+
+def collect_entry_results(entry: Dict) -> pd.DataFrame:
+    """Stream and parse one finished batch's results, caching new answers."""
+    results = remember_results(
+        record_batch_results(retrieve_batch_results(entry['batch_id']), entry), request_keys(entry['input_file'])
+    )
+    return process_batch_results(results)
+
+def collect_batch_results(entries: List[Dict], cached_file: Optional[str] = None) -> pd.DataFrame:
+    """
+    Stream and parse the results of several batches in parallel, caching
+    new answers, and add the answers that were taken from the cache.
+    """
+    with ThreadPoolExecutor(max_workers=BATCH_SUBMIT_WORKERS) as pool:
+        frames = list(pool.map(collect_entry_results, entries))
+    frames.append(process_batch_results(iter_cached_results(cached_file)))
+    return pd.concat(frames, ignore_index=True)
+
+def choose_mode(mode: str, num_requests: int, total_tokens: int) -> str:
+    """
+    'batch' or 'online' for a run. In 'auto' mode, small runs that can be
+    sent within config.CLASSIFY_LATENCY_TARGET minutes under the GPT rate
+    limits go online; everything else waits for the cheaper batch.
+    """
+    if mode in ('batch', 'online'):
+        return mode
+    online_minutes = max(num_requests / config.GPT_RPM, total_tokens / config.GPT_TPM)
+    if num_requests <= config.CLASSIFY_ONLINE_MAX_REQUESTS and online_minutes <= config.CLASSIFY_LATENCY_TARGET:
+        return 'online'
+    return 'batch'
+
+def save_classifications(classifications_df: pd.DataFrame):
+    if classifications_df.empty:
+        print(f"\n⚠️  No classifications came back - nothing to save")
+        return
+    output_path, _, _ = upsert_table(classifications_df, 'classifications', key='video_id')
+    
+    print(f"\n💾 Classifications saved to: {output_path}")
+    print(f"   Total classified: {len(classifications_df)}")
+    print(f"   Successful: {classifications_df['classification_success'].sum()}")
+    print("\n🔜 Next: Run phase5_final_csv.py to generate final database")
+
+def classify_products(mode: str = config.CLASSIFY_MODE):
+    """Main function to classify products, online or with the Batch API."""
     print("=" * 60)
-    print("PHASE 4: Product Classification with GPT-4 (Batch API)")
+    print("PHASE 4: Product Classification with GPT-4")
     print("=" * 60)
     
     # Check API key
@@ -198,91 +457,114 @@ def classify_with_batch():
         print("\n❌ Error: OpenAI API key not set!")
         return
     
-    # Load transcriptions
-    transcripts_path = config.PROJECT_ROOT / 'output' / 'transcriptions.csv'
-    if not os.path.exists(transcripts_path):
-        print(f"\n❌ Error: {transcripts_path} not found. Run phase3_transcriber.py first.")
+    # Load transcripts and captions
+    if not table_exists('viral_database'):
+        print(f"\n❌ Error: viral_database table not found. Run phase1_data_parser.py first.")
+        return
+    if not table_exists('transcriptions') and 'needs_audio' not in table_columns('viral_database'):
+        print(f"\n❌ Error: transcriptions table not found. Run phase3_transcriber.py first.")
         return
     
-    print(f"\n📂 Loading transcriptions...")
-    transcripts_df = pd.read_csv(transcripts_path)
-    successful = transcripts_df[transcripts_df['success'] == True]
-    print(f"   Found {len(successful)} successful transcriptions to classify")
+    print(f"\n📂 Loading transcripts and captions...")
+    successful = load_classification_inputs()
+    caption_only = int((successful['transcript_text'] == '').sum())
+    print(f"   Found {len(successful)} videos to classify")
+    print(f"   With transcripts: {len(successful) - caption_only}")
+    print(f"   Caption only (triaged): {caption_only}")
     
-    # Check if batch already exists
-    batch_status_file = config.PROJECT_ROOT / 'output' / 'batch_classification_status.json'
+    # Check if batches already exist
+    batch_info = load_batch_status()
     
-    if os.path.exists(batch_status_file):
-        print(f"\n📋 Found existing batch job...")
-        with open(batch_status_file, 'r') as f:
-            batch_info = json.load(f)
-        
-        batch_id = batch_info['batch_id']
-        print(f"   Batch ID: {batch_id}")
+    if batch_info is not None:
+        entries = batch_info['batches']
+        print(f"\n📋 Found existing batch job ({len(entries)} batches)...")
         
         # Check current status
-        status = check_batch_status(batch_id)
-        print(f"   Status: {status['status']}")
+        statuses = poll_batches(batch_info)
+        for status in statuses:
+            counts = status['request_counts']
+            print(f"   {status['id']}: {status['status']} "
+                  f"({getattr(counts, 'completed', 0)}/{getattr(counts, 'total', 0)} done)")
         
-        if status['status'] == 'completed':
-            print(f"\n✅ Batch completed! Retrieving results...")
-            results = retrieve_batch_results(batch_id)
-            classifications_df = process_batch_results(results)
-            
-            # Save results
-            output_path = config.PROJECT_ROOT / 'output' / 'classifications.csv'
-            classifications_df.to_csv(output_path, index=False, encoding='utf-8')
+        pending = [s for s in statuses if s['status'] not in TERMINAL_STATUSES]
+        if not pending and not any(not e.get('batch_id') for e in entries):
+            print(f"\n✅ All batches finished! Streaming results...")
+            classifications_df = collect_batch_results(entries, batch_info.get('cached_file'))
+            unfinished = [s['id'] for s in statuses if s['status'] != 'completed']
             
-            print(f"\n💾 Classifications saved to: {output_path}")
-            print(f"   Total classified: {len(classifications_df)}")
-            print(f"   Successful: {classifications_df['classification_success'].sum()}")
-            print("\n🔜 Next: Run phase5_final_csv.py to generate final database")
+            save_classifications(classifications_df)
+            archive_batch_status(batch_info)
+            if unfinished:
+                print(f"   ⚠️  Batches that did not complete: {', '.join(unfinished)}")
         else:
-            print(f"\n⏳ Batch still processing. Check back later.")
-            print(f"   Request counts: {status['request_counts']}")
-            print(f"   Started: {time.ctime(status['created_at'])}")
+            print(f"\n⏳ {len(pending)} of {len(entries)} batches still processing. Check back later,")
+            print(f"   or run phase4_batch_watcher.py to collect results as soon as they finish.")
+            if pending:
+                print(f"   Started: {time.ctime(min(s['created_at'] for s in pending))}")
         
         return
     
-    # Create new batch
+    if successful.empty:
+        print(f"\n⚠️  Nothing to classify yet")
+        return
+    
+    # Create new batches
     print(f"\n📝 Creating batch classification requests...")
-    batch_file = create_batch_file(successful)
-    print(f"   Created: {batch_file}")
+    shards, cached = create_batch_files(successful)
     
-    # Count requests
-    with open(batch_file, 'r') as f:
-        num_requests = sum(1 for _ in f)
+    entries = [{'batch_id': None, 'input_file': str(shard['path']),
+                'num_requests': shard['num_requests'], 'status': 'created'}
+               for shard in shards]
+    num_requests = sum(s['num_requests'] for s in shards)
+    print(f"   Created {len(shards)} batch files")
     print(f"   Total requests: {num_requests}")
+    print(f"   Answered from cache: {cached} (not sent again)")
+    
+    if not shards:
+        print(f"\n✅ Every request was answered before - nothing to submit")
+        save_classifications(process_batch_results(iter_cached_results(str(CACHED_RESULTS_FILE))))
+        return
     
-    # Estimate cost (50% discount)
-    est_input_tokens = num_requests * 500  # Rough estimate
-    est_output_tokens = num_requests * 300
-    cost_per_1m_input = 1.25  # GPT-4o batch input
-    cost_per_1m_output = 5.00  # GPT-4o batch output
-    estimated_cost = (est_input_tokens / 1_000_000 * cost_per_1m_input +
-                     est_output_tokens / 1_000_000 * cost_per_1m_output)
-    print(f"   Estimated cost: ${estimated_cost:.2f} (with 50% batch discount)")
+    # Estimate cost from the measured prompts
+    input_tokens = sum(s['input_tokens'] for s in shards)
+    output_tokens = num_requests * config.CLASSIFY_OUTPUT_TOKENS  # Answers can only be estimated
+    mode = choose_mode(mode, num_requests, input_tokens + output_tokens)
+    estimated_cost = estimate_cost(input_tokens, output_tokens, batch=(mode == 'batch'))
+    print(f"   Input tokens: {input_tokens:,}" + ("" if is_exact() else " (approximate - install tiktoken for exact counts)"))
+    print(f"   Estimated output tokens: {output_tokens:,}")
+    print(f"   Mode: {mode}")
+    print(f"   Estimated cost: ${estimated_cost:.2f} ({config.GPT_MODEL}"
+          f"{', with 50% batch discount' if mode == 'batch' else ''})")
     
-    # Submit batch
-    batch_id = submit_batch_job(batch_file)
+    if mode == 'online':
+        from scripts.phase4_classifier_online import classify_online
+        print(f"\n⚡ Classifying online ({config.GPT_RPM} req/min, {config.GPT_TPM:,} tokens/min)...")
+        online_df = classify_online([str(s['path']) for s in shards])
+        cached_df = process_batch_results(iter_cached_results(str(CACHED_RESULTS_FILE)))
+        save_classifications(pd.concat([online_df, cached_df], ignore_index=True))
+        return
+    
+    # Submit batches in parallel
+    submit_batches(entries)
     
     # Save batch info
     batch_info = {
-        'batch_id': batch_id,
         'created_at': time.time(),
         'num_requests': num_requests,
-        'status': 'submitted'
+        'cached_file': str(CACHED_RESULTS_FILE),
+        'batches': entries
     }
-    with open(batch_status_file, 'w') as f:
-        json.dump(batch_info, f, indent=2)
+    save_batch_status(batch_info)
     
+    submitted = sum(1 for e in entries if e['batch_id'])
     print("\n" + "=" * 60)
-    print("✅ PHASE 4 - Batch Job Submitted")
+    print("✅ PHASE 4 - Batch Jobs Submitted")
     print("=" * 60)
-    print(f"\n⏰ Processing will complete within 24 hours")
-    print(f"📝 Batch ID saved to: {batch_status_file}")
+    print(f"\n📦 Batches submitted: {submitted}/{len(entries)}")
+    print(f"⏰ Processing will complete within 24 hours")
+    print(f"📝 Batch IDs saved to: {BATCH_STATUS_FILE}")
     print(f"\n🔄 To check status, run this script again")
     print("=" * 60)
 
 if __name__ == "__main__":
-    classify_with_batch()
+    classify_products()
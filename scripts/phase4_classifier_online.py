@@ -0,0 +1,130 @@
+"""
+Phase 4 (Online): Concurrent chat completions instead of the Batch API
+Sends the same request bodies phase4_classifier.py writes for a batch, under
+token-bucket limits for requests and tokens per minute, and answers in the
+batch result format so results go through the same processing. Costs twice
+as much per token as batch but finishes in minutes.
+"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import json
+import time
+import random
+import asyncio
+from typing import Dict, Iterator, List
+import pandas as pd
+from openai import AsyncOpenAI
+from tqdm import tqdm
+import config
+from scripts.concurrency import AsyncRateLimiter
+from scripts import metrics, tracing
+from scripts.token_budget import count_message_tokens, estimate_cost
+from scripts.classification_cache import request_key, remember_results
+from scripts.phase3_transcriber_async import retry_after_seconds, is_retryable, backoff_delay, BACKOFF_BASE
+from scripts.phase4_classifier import process_batch_results
+
+MAX_ATTEMPTS = 6
+REQUEST_TIMEOUT = 120  # Seconds per completion
+
+def iter_requests(batch_files: List[str]) -> Iterator[Dict]:
+    """Requests from batch input files, one at a time."""
+    for path in batch_files:
+        with open(path, 'r') as f:
+            for line in f:
+                yield json.loads(line)
+
+class AsyncClassifier:
+    """Runs classification requests concurrently under shared rate limits."""
+
+    def __init__(self, client: AsyncOpenAI, limiter: AsyncRateLimiter,
+                 max_in_flight: int = config.GPT_MAX_IN_FLIGHT):
+        self.client = client
+        self.limiter = limiter
+        self.in_flight = asyncio.Semaphore(max_in_flight)
+
+    async def classify(self, request: Dict) -> Dict:
+        """Send one request, retrying transient errors. Returns a batch result line."""
+        body = request['body']
+        tokens = count_message_tokens(body['messages']) + config.CLASSIFY_OUTPUT_TOKENS
+        video_id = request['custom_id'].replace('classify-', '')
+        with tracing.span('classify', video_id=video_id, mode='online') as span:
+            last_error = None
+            for attempt in range(MAX_ATTEMPTS):
+                await self.limiter.acquire(tokens)
+                start = time.perf_counter()
+                try:
+                    async with self.in_flight:
+                        start = time.perf_counter()
+                        completion = await self.client.chat.completions.create(**body)
+                    seconds = time.perf_counter() - start
+                    metrics.record_request('gpt', seconds, mode='online')
+                    tracing.record_span('gpt', seconds, attempt=attempt)
+                    if completion.usage:
+                        metrics.inc('cost_dollars_total', estimate_cost(
+                            completion.usage.prompt_tokens, completion.usage.completion_tokens, batch=False
+                        ), service='gpt')
+                    return {
+                        'custom_id': request['custom_id'],
+                        'response': {'status_code': 200, 'body': completion.model_dump()},
+                        'error': None
+                    }
+                except Exception as e:
+                    seconds = time.perf_counter() - start
+                    metrics.record_request('gpt', seconds, e, mode='online')
+                    tracing.record_span('gpt', seconds, status='error', attempt=attempt,
+                                        status_code=metrics.status_code(e), error=str(e))
+                    last_error = e
+                    if not is_retryable(e) or attempt == MAX_ATTEMPTS - 1:
+                        break
+
+                    delay = retry_after_seconds(e)
+                    if delay is not None:
+                        self.limiter.pause(delay)
+                        delay += random.uniform(0, BACKOFF_BASE)
+                    else:
+                        delay = backoff_delay(attempt)
+                    await asyncio.sleep(delay)
+
+            span['status'] = 'failed'
+            return {
+                'custom_id': request['custom_id'],
+                'response': None,
+                'error': {'message': str(last_error), 'type': type(last_error).__name__}
+            }
+
+def make_client() -> AsyncOpenAI:
+    """Async client; retries are handled here, not by the SDK."""
+    return AsyncOpenAI(
+        api_key=config.OPENAI_API_KEY,
+        base_url=config.OPENAI_BASE_URL,
+        max_retries=0,
+        timeout=REQUEST_TIMEOUT
+    )
+
+async def classify_all(requests: List[Dict]) -> List[Dict]:
+    """Send every request, returning batch-format result lines."""
+    limiter = AsyncRateLimiter(config.GPT_RPM, config.GPT_TPM)
+    results = []
+
+    async with make_client() as client:
+        classifier = AsyncClassifier(client, limiter)
+        tasks = [asyncio.create_task(classifier.classify(request)) for request in requests]
+        with tqdm(total=len(tasks), desc="Classifying") as progress:
+            for task in asyncio.as_completed(tasks):
+                results.append(await task)
+                progress.update(1)
+
+    return results
+
+def classify_online(batch_files: List[str]) -> pd.DataFrame:
+    """
+    Classify the requests in batch input files online. New answers are
+    cached like batch results.
+    """
+    requests = list(iter_requests(batch_files))
+    keys = {r['custom_id']: request_key(r['body']) for r in requests}
+    results = asyncio.run(classify_all(requests))
+    return process_batch_results(remember_results(results, keys))
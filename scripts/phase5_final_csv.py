@@ -9,7 +9,51 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 import pandas as pd
 import os
+from typing import Optional
 import config
+from scripts.store import read_table, write_table, table_exists, table_columns, video_ids
+
+TRANSCRIPT_COLUMNS = ['video_id', 'transcript_text', 'detected_language', 'audio_duration']
+CLASSIFICATION_COLUMNS = [
+    'video_id', 'product_name', 'product_category',
+    'intended_age_category', 'intended_spending_category',
+    'brand', 'product_type', 'classification_success'
+]
+
+def join_pipeline_data(df: pd.DataFrame, transcripts_df: Optional[pd.DataFrame] = None,
+                       class_df: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    """
+    Join phase 3 and phase 4 outputs onto the base table by video_id.
+    
+    The key is the same md5 video_id phases 2-4 use, computed in one pass over
+    source_url. Transcripts and classifications are indexed by video_id and
+    attached with a single left join, so base row order is preserved.
+    """
+    df = df.copy()
+    if 'video_id' not in df.columns:
+        df['video_id'] = video_ids(df['source_url'])
+    
+    sides = []
+    if transcripts_df is not None:
+        cols = [c for c in TRANSCRIPT_COLUMNS if c in transcripts_df.columns]
+        sides.append(transcripts_df[cols].drop_duplicates('video_id', keep='last').set_index('video_id'))
+    if class_df is not None:
+        cols = [c for c in CLASSIFICATION_COLUMNS if c in class_df.columns]
+        sides.append(class_df[cols].drop_duplicates('video_id', keep='last').set_index('video_id'))
+    if not sides:
+        return df
+    
+    side = sides[0]
+    for other in sides[1:]:
+        side = side.join(other, how='outer')
+    
+    # Phase 1 placeholders are replaced by the values from later phases
+    df = df.drop(columns=[c for c in side.columns if c in df.columns])
+    df = df.join(side, on='video_id')
+    
+    if 'transcript_text' in df.columns:
+        df['transcript'] = df['transcript_text'].fillna('')
+    return df
 
 def merge_all_data():
     """Merge data from all phases into final CSV."""
@@ -18,59 +62,38 @@ def merge_all_data():
     print("=" * 60)
     
     # Load initial data
-    print(f"\n📂 Loading initial CSV...")
-    if not os.path.exists(config.OUTPUT_CSV):
-        print(f"❌ Error: {config.OUTPUT_CSV} not found")
+    print(f"\n📂 Loading viral_database table...")
+    if not table_exists('viral_database'):
+        print(f"❌ Error: viral_database table not found")
         return
     
-    df = pd.read_csv(config.OUTPUT_CSV)
+    df = read_table('viral_database')
     print(f"   Base records: {len(df)}")
     
     # Load transcriptions
-    transcripts_path = config.PROJECT_ROOT / 'output' / 'transcriptions.csv'
-    if os.path.exists(transcripts_path):
+    transcripts_df = None
+    if table_exists('transcriptions'):
         print(f"\n📂 Loading transcriptions...")
-        transcripts_df = pd.read_csv(transcripts_path)
-        
-        # Merge transcripts
-        df = df.merge(
-            transcripts_df[['video_id', 'transcript_text', 'detected_language', 'audio_duration']],
-            left_on=df['source_url'].apply(lambda x: pd.util.hash_pandas_object(pd.Series([x]))[0] % 1000000000000),
-            right_on='video_id',
-            how='left',
-            suffixes=('', '_trans')
-        )
-        
-        # Update transcript column
-        df['transcript'] = df['transcript_text'].fillna('')
-        print(f"   Transcripts merged: {df['transcript_text'].notna().sum()}")
+        transcripts_df = read_table('transcriptions', columns=TRANSCRIPT_COLUMNS)
     else:
         print(f"\n⚠️  No transcriptions file found")
     
     # Load classifications
-    classifications_path = config.PROJECT_ROOT / 'output' / 'classifications.csv'
-    if os.path.exists(classifications_path):
+    class_df = None
+    if table_exists('classifications'):
         print(f"\n📂 Loading classifications...")
-        class_df = pd.read_csv(classifications_path)
-        
-        # Merge classifications  
-        if 'video_id' in df.columns and 'video_id' in class_df.columns:
-            df = df.merge(
-                class_df[[
-                    'video_id', 'product_name', 'product_category',
-                    'intended_age_category', 'intended_spending_category',
-                    'brand', 'product_type'
-                ]],
-                on='video_id',
-                how='left',
-                suffixes=('', '_class')
-            )
-            print(f"   Classifications merged: {class_df['classification_success'].sum()}")
-        else:
-            print(f"   ⚠️  Could not merge - missing video_id column")
+        class_df = read_table('classifications')
     else:
         print(f"\n⚠️  No classifications file found")
     
+    # Join everything on video_id in one indexed pass
+    print(f"\n🔗 Joining on video_id...")
+    df = join_pipeline_data(df, transcripts_df, class_df)
+    if transcripts_df is not None:
+        print(f"   Transcripts merged: {df['transcript_text'].notna().sum()}")
+    if class_df is not None:
+        print(f"   Classifications merged: {df['classification_success'].fillna(False).sum()}")
+    
     # Select and order final columns
     final_columns = [
         'caption',
@@ -101,7 +124,10 @@ def merge_all_data():
     for col in ['product_category', 'product_name', 'transcript', 
                 'intended_age_category', 'intended_spending_category']:
         if col in final_df.columns:
-            final_df[col] = final_df[col].fillna('')
+            values = final_df[col]
+            if isinstance(values.dtype, pd.CategoricalDtype) and '' not in values.cat.categories:
+                values = values.cat.add_categories('')
+            final_df[col] = values.fillna('')
     
     # Sort by view count
     final_df = final_df.sort_values('view_count', ascending=False)
@@ -109,6 +135,22 @@ def merge_all_data():
     # Save final CSV
     final_output = config.PROJECT_ROOT / 'output' / 'viral_database_FINAL.csv'
     final_df.to_csv(final_output, index=False, encoding='utf-8')
+    write_table(final_df, 'viral_database_final')
+    
+    # Classified posts are done; failed or unreached ones stay pending so
+    # phases 2-4 (and retry_transcriptions.py) pick them up again
+    cleared = still_pending = 0
+    if 'pending' in table_columns('viral_database'):
+        base = read_table('viral_database')
+        pending = base['pending'].fillna(False).astype(bool)
+        classified = set(df.loc[df['classification_success'].fillna(False).astype(bool), 'video_id']) \
+            if 'classification_success' in df.columns else set()
+        done = pending & video_ids(base['source_url']).isin(classified)
+        cleared = int(done.sum())
+        still_pending = int((pending & ~done).sum())
+        if cleared:
+            base.loc[done, 'pending'] = False
+            write_table(base, 'viral_database')
     
     # Print statistics
     print("\n" + "=" * 60)
@@ -128,15 +170,21 @@ def merge_all_data():
     if 'product_category' in final_df.columns:
         print(f"\n📦 Product Categories:")
         cat_counts = final_df[final_df['product_category'] != '']['product_category'].value_counts()
+        cat_counts = cat_counts[cat_counts > 0]  # Categoricals count unused categories too
         for cat, count in cat_counts.items():
             print(f"     {cat}: {count}")
     
     if 'intended_spending_category' in final_df.columns:
         print(f"\n💰 Spending Categories:")
         spend_counts = final_df[final_df['intended_spending_category'] != '']['intended_spending_category'].value_counts()
+        spend_counts = spend_counts[spend_counts > 0]
         for cat, count in spend_counts.items():
             print(f"     {cat}: {count}")
     
+    if cleared:
+        print(f"\n✔️  Marked {cleared} new posts as processed")
+    if still_pending:
+        print(f"   {still_pending} posts without a classification stay pending for the next run")
     print(f"\n📁 Output file: {final_output}")
     print(f"✨ Your viral marketing database is ready!")
     print("=" * 60)
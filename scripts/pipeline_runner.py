@@ -0,0 +1,157 @@
+"""
+Pipeline Runner: Streams each video through download, extraction and transcription
+Stages are connected by bounded queues, so the first transcript arrives minutes
+after start and the network, CPU and API stages all stay busy at the same time.
+"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import queue
+import threading
+import pandas as pd
+from tqdm import tqdm
+import config
+from scripts.store import upsert_table, table_exists
+from scripts.phase2_audio_extractor import record_item as record_audio
+from scripts.phase2_audio_extractor_parallel import process_single_video
+from scripts.phase3_transcriber_parallel import process_single_transcription, record_item as record_transcript
+from scripts.phase1b_caption_triage import read_videos_needing_audio
+
+# Workers per stage. Phase 2's adaptive limiters decide how many downloads
+# and transcodes actually run at once; this is the thread pool behind them.
+DOWNLOAD_WORKERS = config.DOWNLOAD_WORKERS_MAX  # yt-dlp + ffmpeg
+TRANSCRIBE_WORKERS = 8  # Whisper API calls
+
+# Items allowed to wait between stages. Keeps memory bounded and stops the
+# download stage from racing hours ahead of transcription.
+QUEUE_SIZE = 32
+
+_DONE = object()  # Sentinel marking the end of a stage's input
+
+class StageResults:
+    """Thread-safe list of per-item results for one stage."""
+
+    def __init__(self, desc: str, total: int, position: int):
+        self.items = []
+        self._lock = threading.Lock()
+        self._bar = tqdm(total=total, desc=desc, position=position)
+
+    def add(self, item: dict):
+        with self._lock:
+            self.items.append(item)
+            self._bar.update(1)
+
+    def close(self):
+        self._bar.close()
+
+def _run_stage(worker, inbox: queue.Queue, outbox, results: StageResults, forward):
+    """Pull items from inbox until the sentinel, pushing forwarded results to outbox."""
+    while True:
+        item = inbox.get()
+        if item is _DONE:
+            inbox.put(_DONE)  # Let sibling workers see it too
+            return
+        try:
+            result = worker(item)
+        except Exception as e:
+            print(f"\n⚠️  Error: {e}")
+            continue
+        results.add(result)
+        if outbox is not None and forward(result):
+            outbox.put(result)
+
+def _start_workers(count: int, *args) -> list:
+    threads = [threading.Thread(target=_run_stage, args=args, daemon=True) for _ in range(count)]
+    for t in threads:
+        t.start()
+    return threads
+
+def run_pipeline(classify: bool = True):
+    """Run phases 2 and 3 as one streaming pipeline, then hand off to phase 4."""
+    config.ensure_dirs()
+    print("=" * 60)
+    print("PIPELINE: Streaming Download → Extraction → Transcription")
+    print("=" * 60)
+
+    if not config.OPENAI_API_KEY or config.OPENAI_API_KEY == 'your_openai_api_key_here':
+        print("\n❌ Error: OpenAI API key not set!")
+        return
+
+    if not table_exists('viral_database'):
+        print(f"\n❌ Error: viral_database table not found. Run phase1_data_parser.py first.")
+        return
+
+    df = read_videos_needing_audio(columns=['source_url', 'platform'])
+    print(f"\n📂 Found {len(df)} videos that need audio")
+    if df.empty:
+        print(f"\n✅ Nothing to do - every video already has audio")
+        if classify:
+            from scripts.phase4_classifier import classify_products
+            classify_products()
+        return
+    print(f"   Download workers: {DOWNLOAD_WORKERS}")
+    print(f"   Transcription workers: {TRANSCRIBE_WORKERS}")
+    print(f"   Queue size: {QUEUE_SIZE}\n")
+
+    download_q = queue.Queue(maxsize=QUEUE_SIZE)
+    transcribe_q = queue.Queue(maxsize=QUEUE_SIZE)
+    audio_results = StageResults("Extracting", len(df), position=0)
+    transcripts = StageResults("Transcribing", None, position=1)
+
+    downloaders = _start_workers(
+        DOWNLOAD_WORKERS, lambda row: record_audio(process_single_video(row)), download_q, transcribe_q,
+        audio_results, lambda r: r['audio_extracted']
+    )
+    transcribers = _start_workers(
+        TRANSCRIBE_WORKERS, lambda item: record_transcript(process_single_transcription(item)), transcribe_q, None,
+        transcripts, None
+    )
+
+    # Feed rows; put() blocks while the download stage is saturated
+    for row in df.to_dict('records'):
+        download_q.put(row)
+    download_q.put(_DONE)
+
+    for t in downloaders:
+        t.join()
+    transcribe_q.put(_DONE)
+    for t in transcribers:
+        t.join()
+
+    audio_results.close()
+    transcripts.close()
+
+    # Save stage outputs in the same tables the standalone phases write
+    audio_df = pd.DataFrame(audio_results.items)
+    audio_path = upsert_table(audio_df, 'audio_results', key='video_id')[0] if len(audio_df) else None
+    transcripts_df = pd.DataFrame(transcripts.items)
+    transcripts_path = upsert_table(transcripts_df, 'transcriptions', key='video_id')[0] if len(transcripts_df) else None
+
+    extracted = int(audio_df['audio_extracted'].sum()) if len(audio_df) else 0
+    successful = int(transcripts_df['success'].sum()) if len(transcripts_df) else 0
+    total_cost = transcripts_df['transcription_cost'].sum() if len(transcripts_df) else 0
+
+    print("\n" + "=" * 60)
+    print("✅ PIPELINE COMPLETE - Extraction & Transcription")
+    print("=" * 60)
+    print(f"\n📊 Statistics:")
+    print(f"   Total videos: {len(audio_df)}")
+    print(f"   Audio extracted: {extracted}")
+    print(f"   Transcribed: {successful}")
+    print(f"   Transcription cost: ${total_cost:.2f}")
+    print(f"\n📝 Results saved to:")
+    if audio_path:
+        print(f"   {audio_path}")
+    if transcripts_path:
+        print(f"   {transcripts_path}")
+    print("=" * 60)
+
+    # Rows triaged as caption-only still go to classification
+    if classify:
+        from scripts.phase4_classifier import classify_products
+        classify_products()
+
+if __name__ == "__main__":
+    run_pipeline()
@@ -0,0 +1,269 @@
+"""
+Typed columnar store for the hand-offs between pipeline phases.
+Each phase writes a Parquet table under config.STORE_DIR and the next phase
+reads back only the columns and rows it needs, with dtypes intact.
+"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import os
+import hashlib
+import operator
+import pandas as pd
+import pyarrow.parquet as pq
+from typing import Dict, List, Optional, Sequence, Tuple, Any
+import config
+
+# Declared column types for each table. Columns not listed here (e.g. extra
+# fields GPT returns in a classification) are stored as-is. Low-cardinality
+# text is 'category', counts are UInt32 (Int64 if a value doesn't fit) and
+# durations/scores are Float32; money stays Float64.
+SCHEMAS: Dict[str, Dict[str, str]] = {
+    'viral_database': {
+        'caption': 'string',
+        'account_name': 'category',
+        'view_count': 'UInt32',
+        'source_url': 'string',
+        'video_url': 'string',
+        'platform': 'category',
+        'likes_count': 'UInt32',
+        'comments_count': 'UInt32',
+        'share_count': 'UInt32',
+        'video_duration': 'Float32',
+        'music_name': 'category',
+        'timestamp': 'string',
+        'product_category': 'category',
+        'product_name': 'string',
+        'transcript': 'string',
+        'intended_age_category': 'category',
+        'intended_spending_category': 'category',
+        'caption_score': 'Float32',
+        'needs_audio': 'boolean',
+        'post_key': 'string',
+        'pending': 'boolean',
+    },
+    'audio_results': {
+        'video_id': 'string',
+        'source_url': 'string',
+        'platform': 'category',
+        'video_downloaded': 'boolean',
+        'audio_extracted': 'boolean',
+        'audio_duration': 'Float32',
+        'original_duration': 'Float32',
+        'minutes_saved': 'Float32',
+        'audio_path': 'string',
+    },
+    'transcriptions': {
+        'video_id': 'string',
+        'source_url': 'string',
+        'platform': 'category',
+        'transcript_text': 'string',
+        'detected_language': 'category',
+        'audio_duration': 'Float32',
+        'transcription_cost': 'Float64',
+        'success': 'boolean',
+        'error': 'string',
+        'reused_from': 'string',
+    },
+    'classifications': {
+        'video_id': 'string',
+        'product_name': 'string',
+        'product_category': 'category',
+        'price_ugx': 'Float64',
+        'intended_age_category': 'category',
+        'intended_spending_category': 'category',
+        'product_type': 'string',
+        'brand': 'category',
+        'marketing_angle': 'string',
+        'niche': 'category',
+        'classification_success': 'boolean',
+        'error': 'string',
+    },
+}
+
+# Files the phases used to hand off before the store existed. They are still
+# read when a table hasn't been written yet, so in-flight runs can resume.
+LEGACY_FILES = {
+    'viral_database': config.OUTPUT_CSV,
+    'audio_results': Path('audio_extraction_results.json'),
+    'transcriptions': config.PROJECT_ROOT / 'output' / 'transcriptions.csv',
+    'classifications': config.PROJECT_ROOT / 'output' / 'classifications.csv',
+}
+
+_FILTER_OPS = {
+    '==': operator.eq, '=': operator.eq, '!=': operator.ne,
+    '<': operator.lt, '<=': operator.le, '>': operator.gt, '>=': operator.ge,
+}
+
+Filter = Tuple[str, str, Any]
+
+UINT32_MAX = 2**32 - 1
+
+def get_video_id(url: str) -> str:
+    """Generate a unique ID for a video URL (the join key used by every phase)."""
+    return hashlib.md5(url.encode()).hexdigest()[:12]
+
+def video_ids(urls: pd.Series) -> pd.Series:
+    """Compute get_video_id for a whole column in one pass."""
+    md5 = hashlib.md5
+    ids = [md5(url.encode()).hexdigest()[:12] if isinstance(url, str) else None
+           for url in urls.to_numpy(dtype=object)]
+    return pd.Series(ids, index=urls.index, dtype='string')
+
+def table_path(name: str) -> Path:
+    """Path of the Parquet file backing a table."""
+    return Path(config.STORE_DIR) / f"{name}.parquet"
+
+def table_exists(name: str) -> bool:
+    """True if the table (or its legacy hand-off file) exists."""
+    legacy = LEGACY_FILES.get(name)
+    return table_path(name).exists() or (legacy is not None and os.path.exists(legacy))
+
+def table_columns(name: str) -> List[str]:
+    """Column names of a table, without reading its data."""
+    path = table_path(name)
+    if path.exists():
+        return pq.read_schema(path).names
+    legacy = Path(LEGACY_FILES[name])
+    if legacy.suffix == '.json':
+        return list(pd.read_json(legacy, orient='records').columns)
+    return list(pd.read_csv(legacy, nrows=0).columns)
+
+def apply_schema(df: pd.DataFrame, name: str) -> pd.DataFrame:
+    """Cast the declared columns of a table to their schema dtypes."""
+    schema = SCHEMAS.get(name, {})
+    for col, dtype in schema.items():
+        if col not in df.columns:
+            continue
+        if dtype == 'UInt32':
+            values = pd.to_numeric(df[col], errors='coerce')
+            in_range = values.dropna().between(0, UINT32_MAX).all()
+            df[col] = values.astype(dtype if in_range else 'Int64')
+        elif dtype in ('Int64', 'Float64', 'Float32'):
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype(dtype)
+        elif dtype == 'boolean':
+            values = df[col]
+            if values.dtype == object or pd.api.types.is_string_dtype(values):
+                values = values.map({'True': True, 'False': False, 'true': True,
+                                     'false': False, True: True, False: False})
+            df[col] = values.astype('boolean')
+        else:
+            df[col] = df[col].astype(dtype)
+    return df
+
+def write_table(df: pd.DataFrame, name: str) -> Path:
+    """Write a DataFrame to the store, replacing the table atomically."""
+    path = table_path(name)
+    os.makedirs(path.parent, exist_ok=True)
+    df = apply_schema(df.copy(), name)
+
+    tmp_path = path.with_suffix('.parquet.tmp')
+    df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+    return path
+
+def upsert_table(df: pd.DataFrame, name: str, key: str,
+                 update_columns: Optional[List[str]] = None) -> Tuple[Path, int, int]:
+    """
+    Merge rows into a table by `key`.
+
+    Rows with a new key are appended; rows whose key already exists
+    overwrite that row's `update_columns` (every column if None) in place,
+    so existing row order never changes. Returns (path, inserted, updated).
+    An empty delta leaves the table untouched.
+    """
+    if df.empty:
+        return table_path(name), 0, 0
+    df = df.drop_duplicates(key).reset_index(drop=True)
+    if not table_exists(name):
+        return write_table(df, name), len(df), 0
+
+    existing = read_table(name)
+    incoming = df.set_index(key)
+    matched = existing[key].isin(incoming.index)
+    for col in update_columns or [c for c in df.columns if c != key]:
+        if col not in existing.columns:
+            existing[col] = pd.Series(pd.NA, index=existing.index, dtype=object)
+        elif isinstance(existing[col].dtype, pd.CategoricalDtype):
+            existing[col] = existing[col].astype(object)  # Incoming values may be new categories
+        elif existing[col].dtype == 'UInt32':
+            existing[col] = existing[col].astype('Int64')  # ...or outgrow 32 bits; write_table narrows again
+        existing.loc[matched, col] = incoming.loc[existing.loc[matched, key], col].to_numpy()
+
+    new_rows = df[~df[key].isin(existing[key])]
+    merged = pd.concat([existing, new_rows], ignore_index=True)
+    return write_table(merged, name), len(new_rows), int(matched.sum())
+
+def pending_filters() -> List[Filter]:
+    """
+    Row filter limiting a per-video table (keyed by video_id) to the videos
+    still pending in viral_database. Empty if the table has no pending flag.
+    """
+    if not table_exists('viral_database') or 'pending' not in table_columns('viral_database'):
+        return []
+    urls = read_table('viral_database', columns=['source_url'], filters=[('pending', '==', True)])['source_url']
+    return [('video_id', 'in', video_ids(urls).dropna().tolist())]
+
+def _filter_frame(df: pd.DataFrame, filters: Sequence[Filter]) -> pd.DataFrame:
+    """Apply (column, op, value) filters in memory."""
+    mask = pd.Series(True, index=df.index)
+    for col, op, value in filters:
+        if op == 'in':
+            mask &= df[col].isin(value)
+        elif op == 'not in':
+            mask &= ~df[col].isin(value)
+        else:
+            mask &= _FILTER_OPS[op](df[col], value).fillna(False).astype(bool)
+    return df[mask]
+
+def _read_legacy(name: str, columns: Optional[List[str]],
+                 filters: Optional[Sequence[Filter]]) -> pd.DataFrame:
+    """Read a table from its pre-store CSV/JSON hand-off file."""
+    path = Path(LEGACY_FILES[name])
+    needed = None
+    if columns is not None:
+        needed = list(dict.fromkeys(list(columns) + [f[0] for f in filters or []]))
+
+    if path.suffix == '.json':
+        df = pd.read_json(path, orient='records')
+        if needed is not None:
+            df = df[[c for c in needed if c in df.columns]]
+    else:
+        df = pd.read_csv(path, usecols=lambda c: needed is None or c in needed)
+
+    df = apply_schema(df, name)
+    if filters:
+        df = _filter_frame(df, filters)
+    if columns is not None:
+        df = df[[c for c in columns if c in df.columns]]
+    return df.reset_index(drop=True)
+
+def read_table(name: str, columns: Optional[List[str]] = None,
+               filters: Optional[Sequence[Filter]] = None) -> pd.DataFrame:
+    """
+    Read a table from the store.
+
+    Args:
+        name: Table name (see SCHEMAS)
+        columns: Only load these columns (None for all)
+        filters: Row filters as (column, op, value) tuples, e.g.
+                 [('success', '==', True)]. Pushed down into the Parquet reader.
+
+    Returns:
+        DataFrame with schema dtypes applied
+    """
+    path = table_path(name)
+    if not path.exists():
+        if name in LEGACY_FILES and os.path.exists(LEGACY_FILES[name]):
+            return _read_legacy(name, columns, filters)
+        raise FileNotFoundError(f"Table '{name}' not found in {config.STORE_DIR}")
+
+    if any(op == 'in' and len(value) == 0 for _, op, value in filters or []):
+        # Nothing can match, and pyarrow can't type an empty value set
+        df = pq.read_schema(path).empty_table().to_pandas()
+        return apply_schema(df[columns] if columns is not None else df, name)
+
+    df = pd.read_parquet(path, columns=columns, filters=list(filters) if filters else None)
+    return apply_schema(df, name)
@@ -0,0 +1,116 @@
+"""
+Token counting and transcript compaction for classification prompts.
+Counts use tiktoken when it is installed (exact for OpenAI models) and a
+character-based estimate otherwise. Long transcripts are cut down to a token
+budget by keeping the sentences that carry product information.
+"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import re
+import math
+from functools import lru_cache
+from typing import Dict, List, Optional
+import config
+from scripts.phase1b_caption_triage import caption_signals, WEIGHTS
+
+try:
+    import tiktoken
+except ImportError:  # Optional - fall back to estimates
+    tiktoken = None
+
+# Chat format overhead (per message, and for priming the reply)
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_REPLY = 3
+
+GAP_MARKER = '…'  # Marks where sentences were dropped
+
+@lru_cache(maxsize=None)
+def _encoding(model: str):
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding('o200k_base')
+
+def is_exact(model: str = config.GPT_MODEL) -> bool:
+    """True if counts come from the model's tokenizer rather than an estimate."""
+    return _encoding(model) is not None
+
+def count_tokens(text: str, model: str = config.GPT_MODEL) -> int:
+    """Number of tokens in a piece of text."""
+    if not text:
+        return 0
+    encoding = _encoding(model)
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return math.ceil(len(text) / 4)  # ~4 characters per token for English text
+
+def count_message_tokens(messages: List[Dict], model: str = config.GPT_MODEL) -> int:
+    """Prompt tokens for a chat completion request."""
+    return sum(TOKENS_PER_MESSAGE + count_tokens(m['content'], model) for m in messages) + TOKENS_PER_REPLY
+
+def _truncate(text: str, budget: int, model: str) -> str:
+    """Cut text to at most `budget` tokens."""
+    encoding = _encoding(model)
+    if encoding is not None:
+        return encoding.decode(encoding.encode(text)[:budget])
+    return text[:budget * 4]
+
+def split_sentences(text: str) -> List[str]:
+    """Split a transcript into sentences (Whisper punctuates its output)."""
+    return [s.strip() for s in re.split(r'(?<=[.!?])\s+|\n+', text) if s.strip()]
+
+def sentence_relevance(sentence: str) -> float:
+    """How much product information a sentence carries (same signals as caption triage)."""
+    return sum(WEIGHTS[name] for name, found in caption_signals(sentence).items() if found)
+
+def compact_transcript(text: Optional[str], budget: int = config.CLASSIFY_TRANSCRIPT_TOKEN_BUDGET,
+                       model: str = config.GPT_MODEL) -> str:
+    """
+    Fit a transcript into `budget` tokens.
+
+    Sentences that mention brands, models, years, prices or product types are
+    kept first, then the rest in order from the start (where the product is
+    usually introduced). Kept sentences stay in their original order, with
+    a marker wherever something was dropped. Transcripts under budget are
+    returned unchanged.
+    """
+    if not text or budget <= 0 or count_tokens(text, model) <= budget:
+        return text or ''
+
+    sentences = split_sentences(text)
+    costs = [count_tokens(s, model) + 1 for s in sentences]
+    ranked = sorted(range(len(sentences)), key=lambda i: (-sentence_relevance(sentences[i]), i))
+
+    kept = set()
+    used = 0
+    for i in ranked:
+        if used + costs[i] <= budget:
+            kept.add(i)
+            used += costs[i]
+
+    if not kept:
+        # A single sentence is over budget on its own
+        return _truncate(sentences[ranked[0]], budget, model)
+
+    parts = []
+    previous = -1
+    for i in sorted(kept):
+        if i != previous + 1:
+            parts.append(GAP_MARKER)
+        parts.append(sentences[i])
+        previous = i
+    if previous != len(sentences) - 1:
+        parts.append(GAP_MARKER)
+    return ' '.join(parts)
+
+def estimate_cost(input_tokens: int, output_tokens: int, model: str = config.GPT_MODEL,
+                  batch: bool = True) -> float:
+    """Dollar cost for a number of tokens (Batch API requests are billed at half price)."""
+    input_price, output_price = config.GPT_PRICING.get(model, config.GPT_PRICING['gpt-4o'])
+    cost = input_tokens / 1_000_000 * input_price + output_tokens / 1_000_000 * output_price
+    return cost * 0.5 if batch else cost
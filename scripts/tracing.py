@@ -0,0 +1,105 @@
+"""
+Per-video tracing: timed spans for each stage and attempt, keyed by video_id.
+Spans are appended to config.TRACE_FILE as JSON lines. Spans opened inside
+another span (same thread or asyncio task) record it as their parent and
+inherit its video_id, so low-level helpers don't need the id passed in.
+utils/trace_report.py turns the file into per-video timelines.
+"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import os
+import json
+import time
+import itertools
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional
+import config
+
+# Groups the spans of one run; set PIPELINE_RUN_ID to share it between processes
+RUN_ID = os.getenv('PIPELINE_RUN_ID') or f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+
+_current = contextvars.ContextVar('current_span', default=None)  # (span_id, video_id)
+_ids = itertools.count(1)
+_lock = threading.Lock()
+_file = None
+
+def _write(span: Dict):
+    global _file
+    line = json.dumps(span, ensure_ascii=False, default=str) + '\n'
+    with _lock:
+        if _file is None:
+            os.makedirs(os.path.dirname(config.TRACE_FILE), exist_ok=True)
+            _file = open(config.TRACE_FILE, 'a', encoding='utf-8', buffering=1)  # Line buffered
+        _file.write(line)
+
+def _next_id() -> str:
+    return f"{os.getpid()}-{next(_ids)}"
+
+def _new_span(span_id: str, name: str, start: float, seconds: float, status: str,
+              video_id: Optional[str], parent: Optional[str], attrs: Dict) -> Dict:
+    return {
+        'run': RUN_ID, 'video_id': video_id, 'span': span_id, 'parent': parent, 'name': name,
+        'start': round(start, 4), 'duration': round(seconds, 4), 'status': status, **attrs
+    }
+
+@contextmanager
+def span(name: str, video_id: Optional[str] = None, **attrs) -> Iterator[Dict]:
+    """
+    Time a block as a span. Yields the attrs dict so the block can add
+    attributes or set 'status' (default 'ok'; 'error' if it raises).
+    """
+    if not config.TRACING_ENABLED:
+        yield attrs
+        return
+
+    parent = _current.get()
+    video_id = video_id or (parent[1] if parent else None)
+    span_id = _next_id()
+    token = _current.set((span_id, video_id))
+    start = time.time()
+    status = 'ok'
+    try:
+        yield attrs
+    except BaseException as e:
+        status = 'error'
+        attrs.setdefault('error', str(e) or type(e).__name__)
+        raise
+    finally:
+        _current.reset(token)
+        status = attrs.pop('status', status)
+        _write(_new_span(span_id, name, start, time.time() - start, status, video_id,
+                         parent[0] if parent else None, attrs))
+
+def record_span(name: str, seconds: float, status: str = 'ok', video_id: Optional[str] = None,
+                start: Optional[float] = None, **attrs):
+    """
+    Record a span for code that times itself: by default one that just
+    finished after `seconds`, or one that began at `start` (epoch seconds).
+    """
+    if not config.TRACING_ENABLED:
+        return
+    parent = _current.get()
+    video_id = video_id or (parent[1] if parent else None)
+    start = time.time() - seconds if start is None else start
+    _write(_new_span(_next_id(), name, start, seconds, status, video_id,
+                     parent[0] if parent else None, attrs))
+
+def bind(fn: Callable) -> Callable:
+    """
+    Wrap fn to run under the current span when called from another thread
+    (thread pools don't carry context over the way asyncio tasks do).
+    """
+    current = _current.get()
+
+    def run(*args, **kwargs):
+        token = _current.set(current)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _current.reset(token)
+    return run
@@ -0,0 +1,180 @@
+"""
+Transcript ledger: a compact SQLite index of video_id -> status, error,
+language, duration and cost. Every transcript write updates it, so status
+queries, retry selection and resume checks are index lookups instead of a
+scan over every JSON file in config.TRANSCRIPTS_DIR.
+"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import os
+import json
+import time
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+import config
+
+_COLUMNS = ('video_id', 'status', 'error', 'language', 'duration', 'cost', 'updated_at')
+
+class TranscriptLedger:
+    """SQLite-backed transcript index, safe to share between threads."""
+
+    def __init__(self, db_path: str):
+        self.db_path = str(db_path)
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS transcripts (
+                    video_id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    error TEXT,
+                    language TEXT,
+                    duration REAL,
+                    cost REAL,
+                    updated_at REAL
+                )
+            ''')
+            self._conn.execute('CREATE INDEX IF NOT EXISTS idx_status ON transcripts (status)')
+        return self._conn
+
+    def record(self, video_id: str, result: Dict, cost: Optional[float] = None):
+        """Insert or update the entry for a transcript result."""
+        self.record_many([(video_id, result, cost)])
+
+    def record_many(self, entries: Iterable[Tuple[str, Dict, Optional[float]]]):
+        """Insert or update (video_id, result, cost) entries in one transaction."""
+        now = time.time()
+        rows = [(video_id, 'success' if result.get('success') else 'failed',
+                 result.get('error'), result.get('language'), result.get('duration'), cost, now)
+                for video_id, result, cost in entries]
+        with self._lock:
+            conn = self._connect()
+            conn.executemany(
+                'INSERT OR REPLACE INTO transcripts '
+                '(video_id, status, error, language, duration, cost, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                rows
+            )
+            conn.commit()
+
+    def lookup(self, video_id: str) -> Optional[Dict]:
+        """Entry for one video, or None if it has never been transcribed."""
+        with self._lock:
+            row = self._connect().execute(
+                f'SELECT {", ".join(_COLUMNS)} FROM transcripts WHERE video_id = ?',
+                (video_id,)
+            ).fetchone()
+        return dict(zip(_COLUMNS, row)) if row else None
+
+    def remove(self, video_ids: Iterable[str]):
+        """Drop entries (e.g. after deleting their transcript files)."""
+        with self._lock:
+            conn = self._connect()
+            conn.executemany('DELETE FROM transcripts WHERE video_id = ?',
+                             [(v,) for v in video_ids])
+            conn.commit()
+
+    def ids_with_status(self, status: str) -> List[str]:
+        """video_ids whose latest transcription has the given status."""
+        with self._lock:
+            rows = self._connect().execute(
+                'SELECT video_id FROM transcripts WHERE status = ?', (status,)
+            ).fetchall()
+        return [r[0] for r in rows]
+
+    def failed_ids(self) -> List[str]:
+        return self.ids_with_status('failed')
+
+    def status_counts(self) -> Dict[str, int]:
+        """Number of entries per status."""
+        with self._lock:
+            rows = self._connect().execute(
+                'SELECT status, COUNT(*) FROM transcripts GROUP BY status'
+            ).fetchall()
+        return dict(rows)
+
+    def totals(self) -> Dict[str, float]:
+        """Total transcribed duration (seconds) and cost of successful entries."""
+        with self._lock:
+            duration, cost = self._connect().execute(
+                "SELECT COALESCE(SUM(duration), 0), COALESCE(SUM(cost), 0) "
+                "FROM transcripts WHERE status = 'success'"
+            ).fetchone()
+        return {'duration': duration, 'cost': cost}
+
+    def count(self) -> int:
+        return sum(self.status_counts().values())
+
+    def backfill(self, transcripts_dir: str) -> int:
+        """
+        Index existing transcript JSON files (one-off, for pre-ledger output).
+
+        Files that can't be parsed are recorded as failed so retry picks them up.
+        Returns the number of files indexed.
+        """
+        entries = []
+        for filename in os.listdir(transcripts_dir):
+            if not filename.endswith('.json'):
+                continue
+            video_id = filename[:-len('.json')]
+            try:
+                with open(os.path.join(transcripts_dir, filename), 'r') as f:
+                    result = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                result = {'success': False, 'error': f'Corrupted transcript file: {e}'}
+            minutes = (result.get('duration') or 0) / 60
+            entries.append((video_id, result, minutes * 0.006 if result.get('success') else 0))
+        self.record_many(entries)
+        return len(entries)
+
+_ledger = TranscriptLedger(config.TRANSCRIPT_LEDGER_DB)
+
+def get_ledger() -> TranscriptLedger:
+    """The ledger for config.TRANSCRIPTS_DIR."""
+    return _ledger
+
+def backfill_if_empty() -> int:
+    """Index config.TRANSCRIPTS_DIR the first time the ledger is used."""
+    if _ledger.count() == 0 and os.path.isdir(config.TRANSCRIPTS_DIR):
+        return _ledger.backfill(config.TRANSCRIPTS_DIR)
+    return 0
+
+def load_cached_transcript(video_id: str, transcript_path: str) -> Optional[Dict]:
+    """
+    Return the stored transcript for a video, or None if it must be transcribed.
+
+    Failed results are answered from the ledger alone. Successful ones still
+    need the JSON for the text; files written before the ledger existed are
+    indexed the first time they are seen.
+    """
+    entry = _ledger.lookup(video_id)
+    if entry is not None and entry['status'] == 'failed':
+        return {
+            'text': '',
+            'language': entry['language'] or 'unknown',
+            'duration': entry['duration'] or 0,
+            'segments': [],
+            'success': False,
+            'error': entry['error']
+        }
+
+    try:
+        with open(transcript_path, 'r') as f:
+            result = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        if entry is not None:
+            _ledger.remove([video_id])  # File was deleted or damaged behind our back
+        return None
+
+    if entry is None:
+        _ledger.record(video_id, result)
+    return result
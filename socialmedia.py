@@ -0,0 +1,123 @@
+"""
+Command line entry point for the pipeline phases and the utils/ tools.
+
+    python socialmedia.py --help
+    python socialmedia.py transcribe --engine parallel
+    python socialmedia.py trace 41f86d2305f7
+
+Each subcommand imports only the modules it runs, so --help and the quick
+tools don't pay for pandas, openai or an API key.
+"""
+
+import os
+import sys
+import runpy
+import argparse
+import importlib
+from pathlib import Path
+
+ROOT = Path(__file__).parent
+sys.path.insert(0, str(ROOT))
+
+PHASE2 = {'serial': 'scripts.phase2_audio_extractor', 'parallel': 'scripts.phase2_audio_extractor_parallel'}
+PHASE3 = {  # engine -> (module, main function)
+    'serial': ('scripts.phase3_transcriber', 'process_transcriptions'),
+    'parallel': ('scripts.phase3_transcriber_parallel', 'process_transcriptions_parallel'),
+    'async': ('scripts.phase3_transcriber_async', 'process_transcriptions_async'),
+}
+
+def call(module: str, function: str, *args, **kwargs):
+    """Import a module and call one of its functions."""
+    return getattr(importlib.import_module(module), function)(*args, **kwargs)
+
+def run_script(path: str, *argv: str, **env: str):
+    """Run a utils/ or benchmarks/ script as if from the shell, with extra env vars."""
+    os.environ.update({k: v for k, v in env.items() if v is not None})
+    sys.argv = [str(ROOT / path), *argv]
+    runpy.run_path(str(ROOT / path), run_name='__main__')
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog='socialmedia',
+        description='Viral video marketing database: scrape exports in, classified products out.'
+    )
+    commands = parser.add_subparsers(dest='command', metavar='<command>', required=True)
+
+    # Pipeline phases
+    sub = commands.add_parser('parse', help='phase 1: parse the scraper exports into the store')
+    sub.set_defaults(handler=lambda args: call('scripts.phase1_data_parser', 'create_initial_csv'))
+
+    sub = commands.add_parser('triage', help='phase 1b: flag captions that already name the product')
+    sub.set_defaults(handler=lambda args: call('scripts.phase1b_caption_triage', 'triage_captions'))
+
+    sub = commands.add_parser('extract', help='phase 2: download videos and extract audio')
+    sub.add_argument('--parallel', action='store_true', help='concurrent downloads and transcodes')
+    sub.set_defaults(handler=lambda args: call(
+        PHASE2['parallel' if args.parallel else 'serial'],
+        'process_videos_parallel' if args.parallel else 'process_videos'
+    ))
+
+    sub = commands.add_parser('transcribe', help='phase 3: transcribe audio with Whisper')
+    sub.add_argument('--engine', choices=PHASE3, default='async',
+                     help='async (default, rate limited with retries), parallel (threads) or serial')
+    sub.set_defaults(handler=lambda args: call(*PHASE3[args.engine]))
+
+    sub = commands.add_parser('classify', help='phase 4: classify products with GPT (batch or online)')
+    sub.add_argument('--mode', choices=['auto', 'batch', 'online'], default=None,
+                     help='default: CLASSIFY_MODE (auto picks online for small runs)')
+    sub.set_defaults(handler=lambda args: call(
+        'scripts.phase4_classifier', 'classify_products', *([args.mode] if args.mode else [])
+    ))
+
+    sub = commands.add_parser('watch', help='phase 4: poll batches, collect results, then run phase 5')
+    sub.add_argument('--no-merge', action='store_true', help="don't run phase 5 when every batch is in")
+    sub.set_defaults(handler=lambda args: call('scripts.phase4_batch_watcher', 'watch_batches', not args.no_merge))
+
+    sub = commands.add_parser('merge', help='phase 5: merge every phase into the final CSV')
+    sub.set_defaults(handler=lambda args: call('scripts.phase5_final_csv', 'merge_all_data'))
+
+    sub = commands.add_parser('stream', help='phases 2-3 as one streaming pipeline, then phase 4')
+    sub.add_argument('--no-classify', action='store_true', help='stop after transcription')
+    sub.set_defaults(handler=lambda args: call('scripts.pipeline_runner', 'run_pipeline', not args.no_classify))
+
+    # Tools
+    sub = commands.add_parser('status', help='progress and remaining cost of the full dataset')
+    sub.set_defaults(handler=lambda args: run_script('utils/check_full_status.py'))
+
+    sub = commands.add_parser('retry', help='delete failed transcripts so phase 3 redoes them')
+    sub.set_defaults(handler=lambda args: run_script('utils/retry_transcriptions.py'))
+
+    sub = commands.add_parser('subset', help='budget-limited subset of the database')
+    sub.set_defaults(handler=lambda args: run_script('utils/create_subset.py'))
+
+    sub = commands.add_parser('lemax-subset', help='Lemax-focused subset of viral_database.csv')
+    sub.set_defaults(handler=lambda args: run_script('utils/create_lemax_subset.py'))
+
+    sub = commands.add_parser('trace', help='slowest videos, or one video\'s critical path')
+    sub.add_argument('video_id', nargs='?', help='show this video\'s timeline')
+    sub.add_argument('--top', help='videos to list (TRACE_TOP, default 10)')
+    sub.add_argument('--run', help="limit to one run id, or 'last' (TRACE_RUN)")
+    sub.set_defaults(handler=lambda args: run_script(
+        'utils/trace_report.py', *([args.video_id] if args.video_id else []), TRACE_TOP=args.top, TRACE_RUN=args.run
+    ))
+
+    sub = commands.add_parser('fake-openai', help='local OpenAI stand-in for offline load tests')
+    sub.add_argument('--port', help='FAKE_OPENAI_PORT (default 8080)')
+    sub.set_defaults(handler=lambda args: run_script('utils/fake_openai_server.py', FAKE_OPENAI_PORT=args.port))
+
+    sub = commands.add_parser('bench', help='benchmarks against benchmarks/baseline.json')
+    sub.add_argument('--sizes', help='comma-separated posts per platform (BENCH_SIZES)')
+    sub.add_argument('--update-baseline', action='store_true', help='store the results as the new baseline')
+    sub.set_defaults(handler=lambda args: run_script(
+        'benchmarks/run_benchmarks.py', BENCH_SIZES=args.sizes,
+        BENCH_UPDATE_BASELINE='1' if args.update_baseline else None
+    ))
+
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.handler(args)
+
+if __name__ == "__main__":
+    main()
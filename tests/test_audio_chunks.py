@@ -0,0 +1,57 @@
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from scripts.audio_chunks import plan_chunks, stitch_transcripts
+
+def chunk_result(*segments):
+    """A successful chunk transcript with (start, end, text) segments in chunk time."""
+    return {
+        'success': True,
+        'language': 'english',
+        'text': ' '.join(text for _, _, text in segments),
+        'segments': [{'id': i, 'start': start, 'end': end, 'text': text}
+                     for i, (start, end, text) in enumerate(segments)],
+    }
+
+def test_plan_chunks_overlap():
+    chunks = plan_chunks(300, chunk_length=120, overlap=5)
+    assert [c['start'] for c in chunks] == [0, 115, 230]
+    assert chunks[-1]['start'] + chunks[-1]['length'] == 300
+
+def test_stitch_keeps_speech_split_differently_across_the_cut():
+    # Chunks 0-120 and 115-235 are cut at 117.5. Chunk 0 hears 116-120 as one
+    # segment, chunk 1 hears 115-119 (its 0-4); both straddle the cut.
+    chunks = [{'start': 0.0, 'length': 120.0}, {'start': 115.0, 'length': 120.0}]
+    results = [
+        chunk_result((0, 116, 'intro'), (116, 120, 'across the cut')),
+        chunk_result((0, 4, 'across the cut'), (4, 20, 'after')),
+    ]
+
+    stitched = stitch_transcripts(chunks, results)
+
+    assert stitched['success']
+    assert [(s['start'], s['end']) for s in stitched['segments']] == [(0, 116), (116, 120), (119, 135)]
+    assert stitched['text'] == 'intro across the cut after'
+    assert [s['id'] for s in stitched['segments']] == [0, 1, 2]
+
+def test_stitch_assigns_by_start_time():
+    chunks = [{'start': 0.0, 'length': 120.0}, {'start': 115.0, 'length': 120.0}]
+    results = [
+        chunk_result((110, 117, 'kept from chunk 0'), (117.6, 120, 'after the cut')),
+        chunk_result((1, 2, 'before the cut'), (2.6, 10, 'kept from chunk 1')),
+    ]
+
+    stitched = stitch_transcripts(chunks, results)
+
+    assert stitched['text'] == 'kept from chunk 0 kept from chunk 1'
+    assert [s['start'] for s in stitched['segments']] == [110, 117.6]
+
+def test_stitch_fails_with_any_chunk():
+    chunks = [{'start': 0.0, 'length': 120.0}, {'start': 115.0, 'length': 120.0}]
+    results = [chunk_result((0, 5, 'ok')), {'success': False, 'error': 'timeout'}]
+
+    stitched = stitch_transcripts(chunks, results)
+
+    assert not stitched['success']
+    assert stitched['error'] == 'Chunk 2/2: timeout'
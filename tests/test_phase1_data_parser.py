@@ -0,0 +1,36 @@
+import sys
+import json
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest
+from scripts.phase1_data_parser import iter_json_array
+
+DOCUMENTS = [
+    '[1.5e3]',
+    '[1.5e3, -2, 3.25E-2 ,true,null, "a,b", {"x": [1, 2.5]}, 10]',
+    '[{"caption": "has ] and , inside"}, {"view_count": 12}]',
+    '  [ ]',
+]
+
+@pytest.mark.parametrize('document', DOCUMENTS)
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 5, 7, 64])
+def test_elements_split_across_chunks(tmp_path, document, chunk_size):
+    path = tmp_path / 'export.json'
+    path.write_text(document)
+
+    assert list(iter_json_array(str(path), chunk_size=chunk_size)) == json.loads(document)
+
+def test_fields_projection(tmp_path):
+    path = tmp_path / 'export.json'
+    path.write_text('[{"a": 1, "b": 2}, {"b": 3}]')
+
+    assert list(iter_json_array(str(path), fields=['a'])) == [{'a': 1}, {}]
+
+@pytest.mark.parametrize('document', ['[1.5e3', '[{"a": 1}', '{"a": 1}'])
+def test_malformed(tmp_path, document):
+    path = tmp_path / 'export.json'
+    path.write_text(document)
+
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_json_array(str(path), chunk_size=3))
@@ -5,15 +5,22 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 import pandas as pd
 import os
 import config
+from scripts.store import read_table, table_exists
+from scripts.transcript_ledger import get_ledger, backfill_if_empty
 
 # Full dataset
-full_df = pd.read_csv(config.OUTPUT_CSV)
+full_df = read_table('viral_database', columns=['account_name'])
 
-# Check audio files
-audio_files = set([f.replace('.mp3', '') for f in os.listdir(config.AUDIO_DIR) if f.endswith('.mp3')])
+# Check audio files (phase 2 results table)
+audio_count = 0
+if table_exists('audio_results'):
+    audio_count = len(read_table('audio_results', columns=['video_id'],
+                                 filters=[('audio_extracted', '==', True)]))
 
-# Check transcripts
-transcript_files = set([f.replace('.json', '') for f in os.listdir(config.TRANSCRIPTS_DIR) if f.endswith('.json')])
+# Check transcripts (ledger index - no directory scan)
+backfill_if_empty()
+transcript_counts = get_ledger().status_counts()
+transcript_count = sum(transcript_counts.values())
 
 print('='*60)
 print('FULL DATASET PROCESSING STATUS')
@@ -25,21 +32,24 @@ for acc, count in full_df['account_name'].value_counts().head(10).items():
     print(f'   {acc}: {count} videos')
 
 print(f'\n🎵 Audio extraction:')
-print(f'   Completed: {len(audio_files)} / {len(full_df)}')
-print(f'   Remaining: {len(full_df) - len(audio_files)}')
+print(f'   Completed: {audio_count} / {len(full_df)}')
+print(f'   Remaining: {len(full_df) - audio_count}')
 
 print(f'\n📝 Transcriptions:')
-print(f'   Completed: {len(transcript_files)} / {len(full_df)}')
-print(f'   Remaining: {len(full_df) - len(transcript_files)}')
+print(f'   Completed: {transcript_count} / {len(full_df)}')
+print(f'   Successful: {transcript_counts.get("success", 0)}')
+print(f'   Failed: {transcript_counts.get("failed", 0)}')
+print(f'   Remaining: {len(full_df) - transcript_count}')
 
 print(f'\n💰 Cost estimate for remaining:')
-remaining_videos = len(full_df) - len(transcript_files)
+remaining_videos = len(full_df) - transcript_count
 est_whisper = remaining_videos * 2.5 * 0.006  # ~2.5 min avg
 est_gpt4 = remaining_videos * 0.002  # GPT-4o-mini batch
 print(f'   Whisper (~2.5 min/video): ${est_whisper:.2f}')
 print(f'   GPT-4 batch: ${est_gpt4:.2f}')
 print(f'   Total remaining: ${est_whisper + est_gpt4:.2f}')
-print(f'   Already spent: ~$3.68')
-print(f'   Grand total: ${3.68 + est_whisper + est_gpt4:.2f}')
+spent = get_ledger().totals()['cost']
+print(f'   Already spent (Whisper): ${spent:.2f}')
+print(f'   Grand total: ${spent + est_whisper + est_gpt4:.2f}')
 
 print('='*60)
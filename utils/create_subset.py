@@ -7,6 +7,7 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 import pandas as pd
 import config
+from scripts.store import read_table
 
 # Configuration
 BUDGET = 9.0
@@ -16,7 +17,7 @@ MAX_VIDEOS = int(BUDGET / COST_PER_VIDEO)
 print(f"Creating subset of {MAX_VIDEOS} videos (Budget: ${BUDGET})")
 
 # Load full dataset
-df = pd.read_csv(config.OUTPUT_CSV)
+df = read_table('viral_database')
 print(f"Total videos available: {len(df)}")
 
 # Select top videos by view count
@@ -34,5 +35,5 @@ print(f"   Estimated cost: ${len(subset_df) * COST_PER_VIDEO:.2f}")
 
 # Show account breakdown
 print(f"\n📊 Account breakdown:")
-for acc, count in subset_df['account_name'].value_counts().head(10).items():
+for acc, count in subset_df['account_name'].value_counts().loc[lambda c: c > 0].head(10).items():
     print(f"   {acc}: {count} videos")
@@ -0,0 +1,397 @@
+"""
+Local stand-in for the OpenAI endpoints the pipeline uses, for offline load tests.
+Serves audio.transcriptions (verbose_json with segments), files, batches and
+chat.completions with configurable latency and injected 429/500 errors.
+Answers are deterministic: the same audio or prompt always gets the same
+transcript or classification. Batches progress over FAKE_BATCH_SECONDS.
+
+    python utils/fake_openai_server.py
+    OPENAI_BASE_URL=http://127.0.0.1:8080/v1 OPENAI_API_KEY=fake python scripts/phase3_transcriber_async.py
+
+GET /stats returns request counts by endpoint and status.
+"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import os
+import re
+import json
+import math
+import time
+import random
+import hashlib
+import threading
+from collections import Counter
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Dict, Optional, Tuple
+
+HOST = os.getenv('FAKE_OPENAI_HOST', '127.0.0.1')
+PORT = int(os.getenv('FAKE_OPENAI_PORT', 8080))
+LATENCY_MS = float(os.getenv('FAKE_LATENCY_MS', 200))  # Median latency per request
+LATENCY_SIGMA = float(os.getenv('FAKE_LATENCY_SIGMA', 0.5))  # Log-normal spread (0 = fixed latency)
+TRANSCRIBE_SPEED = float(os.getenv('FAKE_TRANSCRIBE_SPEED', 30))  # Audio seconds transcribed per second
+RATE_LIMIT_RATE = float(os.getenv('FAKE_RATE_LIMIT_RATE', 0.05))  # Share of requests answered with 429
+ERROR_RATE = float(os.getenv('FAKE_ERROR_RATE', 0.01))  # Share answered with 500 (and failed batch lines)
+RETRY_AFTER_MS = int(os.getenv('FAKE_RETRY_AFTER_MS', 500))  # retry-after sent with a 429
+BATCH_SECONDS = float(os.getenv('FAKE_BATCH_SECONDS', 60))  # Time for a batch to go from created to completed
+AUDIO_BITRATE = 32_000  # Phase 2 writes 32 kbps MP3s; used to infer duration from size
+
+SENTENCES = [
+    "This is the brand new {product}.", "Price is {price} million shillings, negotiable.",
+    "Call us today or visit our showroom in Kampala.", "It comes with full service history.",
+    "Trash or gold? Let me know in the comments.", "Very clean, low mileage, first owner.",
+    "We deliver anywhere in Uganda.", "Check out the interior on this one.",
+    "Tukusanyukidde, omuwendo gwa {price} obukadde.", "Link in bio for more details.",
+]
+PRODUCTS = [
+    ('Toyota', 'Toyota Land Cruiser 300', 'vehicle', 'automotive', 450_000_000),
+    ('Lexus', 'Lexus LX600', 'vehicle', 'automotive', 650_000_000),
+    ('Mercedes', 'Mercedes GLE450', 'vehicle', 'automotive', 380_000_000),
+    ('Toyota', 'Toyota Prado TX', 'vehicle', 'automotive', 180_000_000),
+    ('Samsung', 'Samsung Galaxy S24 Ultra', 'electronics', 'electronics', 5_200_000),
+    ('Apple', 'iPhone 15 Pro Max', 'electronics', 'electronics', 5_800_000),
+    ('Generic', 'LED Sign Board 60x40', 'led_sign', 'lighting', 850_000),
+    ('DJI', 'DJI Mini 4 Pro', 'gadget', 'gadgets', 3_500_000),
+]
+
+_rng = random.Random(os.getenv('FAKE_SEED'))
+_rng_lock = threading.Lock()
+
+def _digest(data: bytes) -> random.Random:
+    """A generator seeded from content, so answers only depend on the input."""
+    return random.Random(hashlib.sha256(data).digest())
+
+def sample_latency(extra_seconds: float = 0.0) -> float:
+    with _rng_lock:
+        jitter = _rng.lognormvariate(0, LATENCY_SIGMA) if LATENCY_SIGMA > 0 else 1.0
+    return LATENCY_MS / 1000 * jitter + extra_seconds
+
+def injected_error() -> Optional[int]:
+    """429 or 500 for a share of requests, otherwise None."""
+    with _rng_lock:
+        roll = _rng.random()
+    if roll < RATE_LIMIT_RATE:
+        return 429
+    if roll < RATE_LIMIT_RATE + ERROR_RATE:
+        return 500
+    return None
+
+def fake_transcript(audio: bytes) -> Dict:
+    """verbose_json transcription for an audio file, with ~5s segments."""
+    rng = _digest(audio)
+    duration = max(len(audio) * 8 / AUDIO_BITRATE, 1.0)
+    language = 'swahili' if rng.random() < 0.1 else 'english'
+    _, product, _, _, price = rng.choice(PRODUCTS)
+    segments = []
+    start = 0.0
+    while start < duration:
+        end = min(start + rng.uniform(3, 7), duration)
+        text = ' ' + rng.choice(SENTENCES).format(product=product, price=price // 1_000_000)
+        segments.append({
+            'id': len(segments), 'seek': int(start * 100), 'start': round(start, 2), 'end': round(end, 2),
+            'text': text, 'tokens': [], 'temperature': 0.0, 'avg_logprob': round(-rng.uniform(0.1, 0.6), 3),
+            'compression_ratio': 1.2, 'no_speech_prob': round(rng.uniform(0, 0.1), 3),
+        })
+        start = end
+    return {
+        'task': 'transcribe', 'language': language, 'duration': round(duration, 2),
+        'text': ''.join(s['text'] for s in segments).strip(), 'segments': segments,
+    }
+
+def fake_classification(body: Dict) -> Dict:
+    """Chat completion answering the phase 4 prompt; picks a product the prompt mentions if any."""
+    prompt = ' '.join(m.get('content') or '' for m in body.get('messages', []))
+    rng = _digest(json.dumps(body, sort_keys=True).encode('utf-8'))
+    caption = prompt.split('Caption:', 1)[-1].lower()
+    mentioned = [p for p in PRODUCTS if p[0].lower() in caption or p[1].split()[1].lower() in caption]
+    brand, name, product_type, niche, price = rng.choice(mentioned or PRODUCTS)
+    answer = {
+        'product_name': name, 'price_ugx': price,
+        'product_category': 'high-end' if price >= 400_000_000 else 'medium-end' if price >= 150_000_000 else 'low-end',
+        'intended_age_category': rng.choice(['18-25', '25-35', '35-45', '45-55']),
+        'intended_spending_category': rng.choice(['mid-range', 'premium', 'luxury']),
+        'product_type': product_type, 'brand': brand, 'key_features': ['clean', 'negotiable'],
+        'marketing_angle': rng.choice(['Price reveal', 'Walkaround', 'Trash or gold reaction']), 'niche': niche,
+    }
+    content = json.dumps(answer)
+    prompt_tokens = math.ceil(len(prompt) / 4)
+    completion_tokens = math.ceil(len(content) / 4)
+    return {
+        'id': f"chatcmpl-{rng.getrandbits(64):016x}", 'object': 'chat.completion', 'created': int(time.time()),
+        'model': body.get('model', 'gpt-4o-mini'),
+        'choices': [{'index': 0, 'finish_reason': 'stop', 'logprobs': None,
+                     'message': {'role': 'assistant', 'content': content, 'refusal': None}}],
+        'usage': {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                  'total_tokens': prompt_tokens + completion_tokens},
+    }
+
+class FakeOpenAIState:
+    """Uploaded files, batches and request counts, shared by all handler threads."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.files: Dict[str, Dict] = {}
+        self.contents: Dict[str, bytes] = {}
+        self.batches: Dict[str, Dict] = {}
+        self.counts = Counter()
+
+    def add_file(self, data: bytes, filename: str, purpose: str) -> Dict:
+        with self.lock:
+            return self._store_file(data, filename, purpose)
+
+    def _store_file(self, data: bytes, filename: str, purpose: str) -> Dict:
+        file_id = f"file-{len(self.files) + 1:06d}"
+        self.files[file_id] = {
+            'id': file_id, 'object': 'file', 'bytes': len(data), 'created_at': int(time.time()),
+            'filename': filename, 'purpose': purpose, 'status': 'processed',
+        }
+        self.contents[file_id] = data
+        return self.files[file_id]
+
+    def create_batch(self, request: Dict) -> Optional[Dict]:
+        with self.lock:
+            if request.get('input_file_id') not in self.contents:
+                return None
+            total = sum(1 for line in self.contents[request['input_file_id']].splitlines() if line.strip())
+            batch_id = f"batch_{len(self.batches) + 1:06d}"
+            now = int(time.time())
+            self.batches[batch_id] = {
+                'id': batch_id, 'object': 'batch', 'endpoint': request.get('endpoint'), 'errors': None,
+                'input_file_id': request['input_file_id'], 'completion_window': request.get('completion_window'),
+                'status': 'validating', 'output_file_id': None, 'error_file_id': None,
+                'created_at': now, 'in_progress_at': None, 'expires_at': now + 86400, 'finalizing_at': None,
+                'completed_at': None, 'failed_at': None, 'expired_at': None, 'cancelling_at': None,
+                'cancelled_at': None, 'request_counts': {'total': total, 'completed': 0, 'failed': 0},
+                'metadata': request.get('metadata'), '_started': time.monotonic(),
+            }
+        return self.batch(batch_id)
+
+    def batch(self, batch_id: str) -> Optional[Dict]:
+        """Batch object with its status advanced to the current time."""
+        with self.lock:
+            batch = self.batches.get(batch_id)
+            if batch is None:
+                return None
+            if batch['status'] not in ('completed', 'cancelled'):
+                self._advance(batch)
+            return {k: v for k, v in batch.items() if not k.startswith('_')}
+
+    def cancel_batch(self, batch_id: str) -> Optional[Dict]:
+        with self.lock:
+            batch = self.batches.get(batch_id)
+            if batch is not None and batch['status'] != 'completed':
+                batch['status'] = 'cancelled'
+                batch['cancelling_at'] = batch['cancelled_at'] = int(time.time())
+        return self.batch(batch_id)
+
+    def _advance(self, batch: Dict):
+        """Validating for the first 5% of BATCH_SECONDS, then requests complete at an even rate."""
+        progress = (time.monotonic() - batch['_started']) / BATCH_SECONDS if BATCH_SECONDS > 0 else 1.0
+        now = int(time.time())
+        if progress < 0.05:
+            return
+        if batch['in_progress_at'] is None:
+            batch['status'], batch['in_progress_at'] = 'in_progress', now
+        counts = batch['request_counts']
+        counts['completed'] = min(int(counts['total'] * progress), counts['total'])
+        if progress >= 1.0:
+            self._finish(batch)
+            batch['status'], batch['finalizing_at'], batch['completed_at'] = 'completed', now, now
+
+    def _finish(self, batch: Dict):
+        """Answer every request line, writing output and error files (called with the lock held)."""
+        output, errors = [], []
+        for line in self.contents[batch['input_file_id']].splitlines():
+            if not line.strip():
+                continue
+            request = json.loads(line)
+            request_id = f"req_{hashlib.sha256(line).hexdigest()[:24]}"
+            if _digest(line).random() < ERROR_RATE:
+                errors.append({'id': request_id, 'custom_id': request['custom_id'], 'response': {
+                    'status_code': 500, 'request_id': request_id,
+                    'body': {'error': {'message': 'The server had an error processing your request.',
+                                       'type': 'server_error'}}}, 'error': None})
+            else:
+                output.append({'id': request_id, 'custom_id': request['custom_id'], 'response': {
+                    'status_code': 200, 'request_id': request_id, 'body': fake_classification(request['body'])},
+                    'error': None})
+        counts = batch['request_counts']
+        counts['completed'], counts['failed'] = len(output), len(errors)
+        for key, lines in (('output_file_id', output), ('error_file_id', errors)):
+            if lines:
+                data = ''.join(json.dumps(l) + '\n' for l in lines).encode('utf-8')
+                batch[key] = self._store_file(data, f"{batch['id']}_{key[:-8]}.jsonl", 'batch_output')['id']
+
+STATE = FakeOpenAIState()
+
+def parse_multipart(content_type: str, body: bytes) -> Dict[str, Tuple[Optional[str], bytes]]:
+    """Form fields of a multipart/form-data body: name -> (filename, data)."""
+    message = BytesParser(policy=HTTP).parsebytes(
+        f"Content-Type: {content_type}\r\n\r\n".encode('latin-1') + body
+    )
+    fields = {}
+    for part in message.iter_parts():
+        name = part.get_param('name', header='content-disposition')
+        fields[name] = (part.get_filename(), part.get_payload(decode=True) or b'')
+    return fields
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    """Routes /v1/* requests to the fake endpoints."""
+
+    protocol_version = 'HTTP/1.1'  # Keep-alive, like the real API
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status: int, payload, headers: Optional[Dict] = None):
+        data = payload if isinstance(payload, bytes) else json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json' if not isinstance(payload, bytes)
+                         else 'application/octet-stream')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_error_json(self, status: int, message: str, error_type: str):
+        headers = {}
+        if status == 429:
+            headers = {'retry-after-ms': str(RETRY_AFTER_MS), 'retry-after': str(math.ceil(RETRY_AFTER_MS / 1000))}
+        self.send_json(status, {'error': {'message': message, 'type': error_type, 'code': None}}, headers)
+
+    def do_GET(self):
+        self.handle_api('GET')
+
+    def do_POST(self):
+        self.handle_api('POST')
+
+    def handle_api(self, method: str):
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        path = self.path.split('?', 1)[0].rstrip('/')
+        endpoint = re.sub(r'/(file|batch)[-_]\w+', r'/{\1_id}', path)
+
+        if path == '/stats':
+            with STATE.lock:
+                stats = {'requests': dict(STATE.counts), 'files': len(STATE.files), 'batches': len(STATE.batches)}
+            self.send_json(200, stats)
+            return
+
+        error = injected_error()
+        if error is None and endpoint == '/v1/audio/transcriptions':
+            fields = parse_multipart(self.headers.get('Content-Type', ''), body)
+            audio = fields.get('file', (None, b''))[1]
+            time.sleep(sample_latency(len(audio) * 8 / AUDIO_BITRATE / TRANSCRIBE_SPEED))
+        else:
+            time.sleep(sample_latency())
+
+        if error == 429:
+            status = 429
+            self.send_error_json(429, 'Rate limit reached for requests. Please try again later.', 'requests')
+        elif error == 500:
+            status = 500
+            self.send_error_json(500, 'The server had an error while processing your request.', 'server_error')
+        else:
+            status = self.route(method, path, endpoint, body)
+        with STATE.lock:
+            STATE.counts[f"{method} {endpoint} {status}"] += 1
+
+    def route(self, method: str, path: str, endpoint: str, body: bytes) -> int:
+        """Answer a request that wasn't failed on purpose. Returns the status sent."""
+        resource_id = path.split('/')[3] if path.count('/') >= 3 else None
+
+        if (method, endpoint) == ('POST', '/v1/audio/transcriptions'):
+            fields = parse_multipart(self.headers.get('Content-Type', ''), body)
+            transcript = fake_transcript(fields.get('file', (None, b''))[1])
+            response_format = fields.get('response_format', (None, b'json'))[1].decode()
+            if response_format == 'text':
+                self.send_json(200, transcript['text'].encode('utf-8'))
+            elif response_format == 'verbose_json':
+                self.send_json(200, transcript)
+            else:
+                self.send_json(200, {'text': transcript['text']})
+            return 200
+
+        if (method, endpoint) == ('POST', '/v1/chat/completions'):
+            self.send_json(200, fake_classification(json.loads(body)))
+            return 200
+
+        if (method, endpoint) == ('POST', '/v1/files'):
+            fields = parse_multipart(self.headers.get('Content-Type', ''), body)
+            filename, data = fields.get('file', ('upload.jsonl', b''))
+            purpose = fields.get('purpose', (None, b'batch'))[1].decode()
+            self.send_json(200, STATE.add_file(data, filename, purpose))
+            return 200
+
+        if method == 'GET' and endpoint in ('/v1/files/{file_id}', '/v1/files/{file_id}/content'):
+            with STATE.lock:
+                found = STATE.files.get(resource_id)
+                content = STATE.contents.get(resource_id)
+            if found is None:
+                self.send_error_json(404, f"No such File object: {resource_id}", 'invalid_request_error')
+                return 404
+            self.send_json(200, content if endpoint.endswith('/content') else found)
+            return 200
+
+        if (method, endpoint) == ('POST', '/v1/batches'):
+            batch = STATE.create_batch(json.loads(body))
+            if batch is None:
+                self.send_error_json(400, 'Unknown input_file_id', 'invalid_request_error')
+                return 400
+            self.send_json(200, batch)
+            return 200
+
+        if (method, endpoint) == ('GET', '/v1/batches'):
+            with STATE.lock:
+                batch_ids = list(STATE.batches)
+            data = [STATE.batch(batch_id) for batch_id in reversed(batch_ids)]
+            self.send_json(200, {'object': 'list', 'data': data, 'has_more': False,
+                                 'first_id': data[0]['id'] if data else None,
+                                 'last_id': data[-1]['id'] if data else None})
+            return 200
+
+        if endpoint in ('/v1/batches/{batch_id}', '/v1/batches/{batch_id}/cancel'):
+            batch = STATE.cancel_batch(resource_id) if endpoint.endswith('/cancel') else STATE.batch(resource_id)
+            if batch is None:
+                self.send_error_json(404, f"No such Batch object: {resource_id}", 'invalid_request_error')
+                return 404
+            self.send_json(200, batch)
+            return 200
+
+        self.send_error_json(404, f"Unknown endpoint: {method} {path}", 'invalid_request_error')
+        return 404
+
+class FakeOpenAIServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 512  # Load tests open hundreds of connections at once; the default backlog is 5
+
+def make_server(host: str = HOST, port: int = PORT) -> ThreadingHTTPServer:
+    return FakeOpenAIServer((host, port), FakeOpenAIHandler)
+
+def start(host: str = HOST, port: int = PORT) -> ThreadingHTTPServer:
+    """Run the server on a background thread (port 0 picks a free port)."""
+    server = make_server(host, port)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+if __name__ == "__main__":
+    server = make_server()
+    host, port = server.server_address[:2]
+    print("=" * 60)
+    print("FAKE OPENAI SERVER")
+    print("=" * 60)
+    print(f"\n🧪 Listening on http://{host}:{port}/v1")
+    print(f"   Latency: {LATENCY_MS:g}ms median (sigma {LATENCY_SIGMA:g}), "
+          f"transcription at {TRANSCRIBE_SPEED:g}x real time")
+    print(f"   Injected errors: {RATE_LIMIT_RATE:.0%} 429, {ERROR_RATE:.0%} 500")
+    print(f"   Batches complete after {BATCH_SECONDS:g}s")
+    print(f"\n   export OPENAI_BASE_URL=http://{host}:{port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\n⏹️  Stopped. Requests served: {sum(STATE.counts.values())}")
+        for key, count in sorted(STATE.counts.items()):
+            print(f"   {key}: {count}")
@@ -6,43 +6,40 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 import os
-import pandas as pd
-from openai import OpenAI
 import config
-import json
+from scripts.store import read_table, table_exists
+from scripts.transcript_ledger import get_ledger, backfill_if_empty
 
 print("=" * 60)
 print("CLEANING UP FAILED TRANSCRIPTIONS")
 print("=" * 60)
 
-# Get all transcript files
-transcript_files = []
-for f in os.listdir('transcripts'):
-    if f.endswith('.json'):
-        transcript_files.append(f)
+ledger = get_ledger()
 
-# Check for errors and delete failed transcripts
+# Index transcripts written before the ledger existed (one-off)
+backfill_if_empty()
+
+# Failed (and corrupted) transcripts come straight from the ledger index
+failed = ledger.failed_ids()
+
+# Delete them so the next run redoes them
 deleted = 0
-for filename in transcript_files:
-    filepath = f'transcripts/{filename}'
-    try:
-        with open(filepath, 'r') as f:
-            data = json.load(f)
-            if not data.get('success', True):
-                os.remove(filepath)
-                deleted += 1
-                print(f"Deleted failed: {filename}")
-    except:
-        # If we can't read it, delete it
+for video_id in failed:
+    filepath = os.path.join(config.TRANSCRIPTS_DIR, f"{video_id}.json")
+    if os.path.exists(filepath):
         os.remove(filepath)
-        deleted += 1
-        print(f"Deleted corrupted: {filename}")
+    deleted += 1
+    print(f"Deleted failed: {video_id}.json")
+ledger.remove(failed)
 
 print(f"\n✅ Cleaned up {deleted} failed transcriptions")
 
 # Count remaining
-audio_count = len([f for f in os.listdir('extracted_audio') if f.endswith('.mp3')])
-transcript_count = len([f for f in os.listdir('transcripts') if f.endswith('.json')])
+audio_count = 0
+if table_exists('audio_results'):
+    audio_count = len(read_table('audio_results', columns=['video_id'],
+                                 filters=[('audio_extracted', '==', True)]))
+transcript_count = ledger.status_counts().get('success', 0)
 remaining = audio_count - transcript_count
 
 print(f"\n📊 Status:")
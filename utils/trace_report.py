@@ -0,0 +1,160 @@
+"""
+Per-video timelines from the trace file (output/traces.jsonl).
+
+    python utils/trace_report.py              # slowest TRACE_TOP videos
+    python utils/trace_report.py <video_id>   # critical path of one video
+
+TRACE_RUN limits the report to one run id ('last' for the most recent run);
+by default spans from every run are used, so a video's phases 2-4 line up
+even when they ran as separate processes.
+"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import os
+import json
+from collections import defaultdict
+from typing import Dict, List, Optional
+import config
+
+TOP = int(os.getenv('TRACE_TOP', 10))
+RUN = os.getenv('TRACE_RUN', '')
+MIN_GAP = 0.05  # Shorter gaps between spans aren't worth a line
+
+STANDARD_KEYS = {'run', 'video_id', 'span', 'parent', 'name', 'start', 'duration', 'status'}
+
+def load_spans(path: Path = config.TRACE_FILE, run: str = RUN) -> List[Dict]:
+    """Spans with a video_id, optionally limited to one run."""
+    spans = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                span = json.loads(line)
+                if span.get('video_id'):
+                    spans.append(span)
+    if run == 'last' and spans:
+        run = max(spans, key=lambda s: s['start'])['run']
+    if run:
+        spans = [s for s in spans if s['run'] == run]
+    return spans
+
+def group_by_video(spans: List[Dict]) -> Dict[str, List[Dict]]:
+    videos = defaultdict(list)
+    for span in spans:
+        videos[span['video_id']].append(span)
+    return videos
+
+def build_tree(spans: List[Dict]):
+    """(roots, children by span id), both sorted by start time."""
+    ids = {s['span'] for s in spans}
+    children = defaultdict(list)
+    roots = []
+    for span in sorted(spans, key=lambda s: s['start']):
+        if span['parent'] in ids:
+            children[span['parent']].append(span)
+        else:
+            roots.append(span)  # Top-level, or its parent belongs to another video
+    return roots, children
+
+def summarize(spans: List[Dict]) -> Dict:
+    """Busy time (sum of top-level spans), elapsed time and the slowest stage of one video."""
+    roots, _ = build_tree(spans)
+    start = min(s['start'] for s in roots)
+    end = max(s['start'] + s['duration'] for s in roots)
+    slowest = max(roots, key=lambda s: s['duration'])
+    return {
+        'busy': sum(s['duration'] for s in roots),
+        'elapsed': end - start,
+        'slowest': slowest['name'],
+        'slowest_seconds': slowest['duration'],
+        'failed': any(s['status'] in ('error', 'failed') for s in roots),
+    }
+
+def describe(span: Dict) -> str:
+    extra = ' '.join(f"{k}={str(v)[:60]}" for k, v in span.items() if k not in STANDARD_KEYS and v not in (None, ''))
+    status = '' if span['status'] == 'ok' else f" [{span['status']}]"
+    return f"{span['name']}{status}{' ' + extra if extra else ''}"
+
+def print_spans(spans: List[Dict], children: Dict[str, List[Dict]], origin: float, depth: int = 0):
+    """Spans in time order with their children indented; gaps between siblings show as waiting."""
+    indent = '   ' * depth
+    previous_end = None
+    for span in spans:
+        if previous_end is not None and span['start'] - previous_end >= MIN_GAP:
+            print(f"   {previous_end - origin:>9.2f}s {span['start'] - previous_end:>9.2f}s  {indent}… waiting")
+        print(f"   {span['start'] - origin:>9.2f}s {span['duration']:>9.2f}s  {indent}{describe(span)}")
+        print_spans(children.get(span['span'], []), children, origin, depth + 1)
+        previous_end = max(previous_end or 0, span['start'] + span['duration'])
+
+def critical_path(roots: List[Dict], children: Dict[str, List[Dict]]) -> List[str]:
+    """Each top-level stage followed down through its longest child."""
+    path = []
+    for root in roots:
+        steps, span = [], root
+        while span is not None:
+            steps.append(span['name'])
+            span = max(children.get(span['span'], []), key=lambda s: s['duration'], default=None)
+        path.append(f"{' › '.join(steps)} ({root['duration']:.2f}s)")
+    return path
+
+def report_video(video_id: str, spans: List[Dict]):
+    """Print one video's timeline and critical path."""
+    print("=" * 60)
+    print(f"TRACE: {video_id}")
+    print("=" * 60)
+    if not spans:
+        print(f"\n❌ No spans for {video_id}")
+        return
+
+    roots, children = build_tree(spans)
+    summary = summarize(spans)
+    origin = roots[0]['start']
+    print(f"\n⏱️  Busy {summary['busy']:.2f}s over {summary['elapsed']:.2f}s elapsed "
+          f"({len(spans)} spans, {len({s['run'] for s in spans})} runs)")
+    print(f"\n   {'offset':>10} {'duration':>10}  span")
+    print_spans(roots, children, origin)
+
+    print(f"\n🔥 Critical path:")
+    for step in critical_path(roots, children):
+        print(f"   {step}")
+    print("=" * 60)
+
+def report_slowest(videos: Dict[str, List[Dict]], top: int = TOP):
+    """Print the videos with the most busy time."""
+    summaries = sorted(((video_id, summarize(spans)) for video_id, spans in videos.items()),
+                       key=lambda item: item[1]['busy'], reverse=True)
+    print("=" * 60)
+    print(f"TRACE: {min(top, len(summaries))} slowest of {len(summaries)} videos")
+    print("=" * 60)
+    print(f"\n{'video_id':<28}{'busy':>9}{'elapsed':>10}  slowest stage")
+    for video_id, summary in summaries[:top]:
+        flag = '  ❌' if summary['failed'] else ''
+        print(f"{video_id:<28}{summary['busy']:>8.2f}s{summary['elapsed']:>9.2f}s  "
+              f"{summary['slowest']} ({summary['slowest_seconds']:.2f}s){flag}")
+
+    by_stage = defaultdict(float)
+    for spans in videos.values():
+        for root in build_tree(spans)[0]:
+            by_stage[root['name']] += root['duration']
+    print(f"\n📊 Busy time by stage:")
+    for name, seconds in sorted(by_stage.items(), key=lambda item: item[1], reverse=True):
+        print(f"   {name}: {seconds:.1f}s")
+    print(f"\n   Run with a video_id for its critical path")
+    print("=" * 60)
+
+def main(video_id: Optional[str] = None):
+    if not config.TRACE_FILE.exists():
+        print(f"❌ No trace file at {config.TRACE_FILE}. Run a phase with TRACING_ENABLED=true first.")
+        return
+    videos = group_by_video(load_spans())
+    if video_id:
+        report_video(video_id, videos.get(video_id, []))
+    elif videos:
+        report_slowest(videos)
+    else:
+        print("❌ No spans found" + (f" for run {RUN}" if RUN else ""))
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else None)